@@ -0,0 +1,84 @@
+"""
+Benchmark: the answer cache in front of a simulated agent.
+
+--queries questions are drawn from a pool of --distinct ones (repeated questions are the common case:
+"list key findings", "summarize pages 5-10", ...) and answered by a fake agent that sleeps --agent-ms
+and returns a typical multi-message transcript. The run is repeated without a cache and with the
+memory, disk and mongomock stores; the script reports wall time, hit rate and the latency of a hit.
+
+Usage:
+    python benchmarks/bench_answer_cache.py --queries 200 --distinct 20 --agent-ms 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdfparser_agent import answer_cache
+from pdfparser_agent.core import _answer_key
+
+
+def transcript(query):
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    messages = [HumanMessage(query)]
+    for turn in range(4):
+        call_id = f"call{turn}"
+        messages.append(AIMessage("", tool_calls=[{"name": "goto", "args": {"page": turn + 1}, "id": call_id}]))
+        messages.append(ToolMessage("|001| " + "page text " * 300, tool_call_id=call_id))
+    messages.append(AIMessage("Key findings: " + "finding " * 100))
+    return {"messages": messages}
+
+
+def stores(directory):
+    yield "no cache", None
+    yield "memory", answer_cache.MemoryAnswerStore()
+    yield "disk", answer_cache.DiskAnswerStore(os.path.join(directory, "answers"))
+    try:
+        import mongomock
+    except ImportError:
+        return
+    yield "mongomock", answer_cache.MongoAnswerStore(mongomock.MongoClient()["bench"].answer_cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--agent-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [f"Summarize pages {i}-{i + 5}" for i in rng.choices(range(args.distinct), k=args.queries)]
+
+    def agent(query):
+        time.sleep(args.agent_ms / 1000)
+        return transcript(query)
+
+    print(f"{args.queries} queries, {args.distinct} distinct, agent {args.agent_ms:.0f} ms")
+    print(f"{'store':<10} {'seconds':>8} {'hit rate':>9} {'hit ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, store in stores(tmp):
+            answer_cache.set_answer_cache(answer_cache.AnswerCache(store) if store is not None else None)
+            hit_seconds = []
+            start = time.perf_counter()
+            for query in queries:
+                key = _answer_key("0" * 64, "ProcessBudget.LOW", query, "bench-model")
+                cache = answer_cache.get_answer_cache()
+                hits = cache.counts["hit"] if cache else 0
+                t = time.perf_counter()
+                answer_cache.cached_answer(key, lambda: agent(query))
+                if cache and cache.counts["hit"] > hits:
+                    hit_seconds.append(time.perf_counter() - t)
+            seconds = time.perf_counter() - start
+            stats = cache.stats() if cache else {"hit_rate": 0.0}
+            hit_ms = sum(hit_seconds) / len(hit_seconds) * 1000 if hit_seconds else 0.0
+            print(f"{name:<10} {seconds:>8.2f} {stats['hit_rate']:>9.2%} {hit_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: concurrent page fetches through the threaded sync path (db.py) vs. one event loop (async_db.py).
+
+Runs on the configured storage backend (STORAGE_BACKEND; the default needs a reachable MongoDB at MONGO_URI,
+e.g. `docker compose up -d`). The PDF is ingested once through the content-addressed cache; every request
+then fetches one page through db.get_page_lines / async_db.get_page_lines, the calls the tools make, with the
+in-process line cache disabled so that each one reaches the store.
+
+Usage:
+    python benchmarks/bench_async.py report.pdf --requests 2000 --concurrency 1 8 32 128
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdfparser_agent import async_db, db
+from pdfparser_agent.core import PDFDocument
+
+
+def run_threaded(document_id, pages, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda page: db.get_page_lines(document_id, page), pages))
+        return time.perf_counter() - start
+
+
+async def run_async(document_id, pages, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page):
+        async with semaphore:
+            return await async_db.get_page_lines(document_id, page)
+
+    await async_db.get_store()
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(page) for page in pages))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_path")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    doc = PDFDocument(args.pdf_path)
+    db.LINE_CACHE_DOCUMENTS = 0
+    page_count = db.get_document_stats(doc.document_id)["page_count"]
+    rng = random.Random(0)
+    pages = [rng.randint(1, page_count) for _ in range(args.requests)]
+
+    print(f"{args.requests} page fetches over {page_count} pages")
+    print(f"{'concurrency':>11} {'threads req/s':>14} {'asyncio req/s':>14}")
+    threaded = [run_threaded(doc.document_id, pages, c) for c in args.concurrency]
+
+    async def run_all():
+        # One loop for every run: the async client is bound to the loop it was created on
+        return [await run_async(doc.document_id, pages, c) for c in args.concurrency]
+
+    single_loop = asyncio.run(run_all())
+    for concurrency, t, a in zip(args.concurrency, threaded, single_loop):
+        print(f"{concurrency:>11} {args.requests / t:>14.0f} {args.requests / a:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: cross-document search over a sharded corpus index, by shard and worker count.
+
+--documents PDFs of --pages pages are ingested once into the store, then indexed into one corpus
+per --shards value. Every corpus answers the same --queries two-term queries with each --workers
+value (0: shards searched one after another in this process) and must return the same ranking
+whatever the layout. Finally one document gets a page edited and re-added, which re-extracts and
+re-indexes only that page.
+
+Usage:
+    python benchmarks/bench_corpus.py --documents 40 --pages 30 --shards 1 4 8 --workers 0 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import summarize, use_backend
+from synthetic_pdf import page_lines, write_pages, write_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--backend", choices=["mongomock", "sqlite"], default="sqlite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_backend(args.backend, tmp)
+        from pdfparser_agent.core import PDFDocument
+        from pdfparser_agent.corpus import Corpus
+        rng = random.Random(1)
+        paths, texts = [], []
+        for n in range(args.documents):
+            path = os.path.join(tmp, f"doc-{n:03d}.pdf")
+            texts.append(write_pdf(path, args.pages, seed=n))
+            PDFDocument(path)
+            paths.append(path)
+        words = sorted({word.lower() for pages in texts for lines in pages for line in lines for word in line.split()})
+        queries = [" ".join(rng.sample(words, 2)) for _ in range(args.queries)]
+        print(f"{args.documents} documents x {args.pages} pages, {args.backend}, {args.queries} queries, k={args.k}")
+        print(f"{'shards':>6} {'workers':>7} {'index s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+
+        reference = None
+        for shards in args.shards:
+            corpus = Corpus(f"s{shards}", root=tmp, shards=shards)
+            start = time.perf_counter()
+            for path in paths:
+                corpus.add(path)
+            indexing = time.perf_counter() - start
+            for workers in args.workers:
+                corpus.close()
+                corpus.workers = min(workers, shards)
+                corpus.search(queries[0], k=args.k)
+                timings, results = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    results.append([(hit["document_id"], hit["page"], hit["score"]) for hit in corpus.search(query, k=args.k)])
+                    timings.append(time.perf_counter() - start)
+                if reference is None:
+                    reference = results
+                elif results != reference:
+                    raise SystemExit(f"{shards} shards, {workers} workers ranked differently")
+                stats = summarize(timings)
+                print(f"{shards:>6} {workers:>7} {indexing:>8.2f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f}")
+            corpus.close()
+
+        pages = texts[0]
+        pages[args.pages // 2] = page_lines(rng)
+        write_pages(paths[0], pages)
+        start = time.perf_counter()
+        entry = corpus.add(paths[0])
+        print(f"re-add after a 1-page edit: {entry['status']}, {entry['pages_indexed']} pages indexed, "
+              f"{time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: pdfplumber extraction throughput vs. number of worker processes.
+
+Usage:
+    python benchmarks/bench_extraction.py report.pdf --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdfparser_agent.processing.pdf_processing import _count_pages, process_pdf_pypdf_pdfplumber
+
+
+def run(pdf_path, workers_list, repeat):
+    page_count = _count_pages(pdf_path)
+    baseline = None
+    baseline_time = None
+    print(f"{pdf_path}: {page_count} pages")
+    print(f"{'workers':>8} {'seconds':>10} {'pages/s':>10} {'speedup':>8}")
+    for workers in workers_list:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = process_pdf_pypdf_pdfplumber(pdf_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if baseline is None:
+            baseline, baseline_time = result, best
+        elif result != baseline:
+            # Parallel runs must reproduce the sequential line numbering exactly
+            raise SystemExit(f"workers={workers}: output differs from workers={workers_list[0]}")
+        print(f"{workers:>8} {best:>10.2f} {page_count / best:>10.1f} {baseline_time / best:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_path", help="PDF file to extract")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per worker count; the best time is reported")
+    args = parser.parse_args()
+    run(args.pdf_path, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: import cost of the package entry points, each measured in a fresh interpreter.
+
+Also checks that the light entry points do not drag in the heavy dependencies (agent stack,
+pymongo, requests). Exits non-zero when a light entry point exceeds --budget-ms or loads one of
+them, so it can guard startup time in CI.
+
+Usage:
+    python benchmarks/bench_import.py --repeat 5 --budget-ms 200
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+HEAVY_MODULES = ["langgraph", "langchain_google_genai", "pymongo", "requests", "PyPDF2", "pdfplumber"]
+
+# (name, statement, light): light entry points are held to the budget and must not load HEAVY_MODULES
+CASES = [
+    ("import pdfparser_agent", "import pdfparser_agent", True),
+    ("extraction API", "from pdfparser_agent.processing.pdf_processing import iter_pdf_pypdf_pdfplumber", True),
+    ("cli module", "import pdfparser_agent.cli", True),
+    ("search + sessions", "import pdfparser_agent.search, pdfparser_agent.sessions", True),
+    ("db module", "import pdfparser_agent.db", True),
+    ("PDFDocument", "from pdfparser_agent import PDFDocument", False),
+    ("tools", "from pdfparser_agent import goto, doc_task", False),
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(statement, repeat):
+    best, loaded = None, []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        best = result["ms"] if best is None else min(best, result["ms"])
+        loaded = result["loaded"]
+    return best, loaded
+
+
+def measure_cli_help(repeat):
+    """Wall time of a whole `pdfparser-agent --help` process, interpreter startup included."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "pdfparser_agent.cli", "--help"], cwd=ROOT, capture_output=True, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best time is reported")
+    parser.add_argument("--budget-ms", type=float, default=200, help="Import budget for the light entry points")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results, failures = [], []
+    for name, statement, light in CASES:
+        ms, loaded = measure(statement, args.repeat)
+        results.append({"case": name, "ms": round(ms, 1), "light": light, "heavy_loaded": loaded})
+        if light and ms > args.budget_ms:
+            failures.append(f"{name}: {ms:.0f} ms > {args.budget_ms:.0f} ms")
+        if light and loaded:
+            failures.append(f"{name}: imports {', '.join(loaded)}")
+    cli_ms = measure_cli_help(args.repeat)
+    results.append({"case": "pdfparser-agent --help (process)", "ms": round(cli_ms, 1), "light": True, "heavy_loaded": []})
+    if cli_ms > args.budget_ms:
+        failures.append(f"pdfparser-agent --help: {cli_ms:.0f} ms > {args.budget_ms:.0f} ms")
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results, "failures": failures}, indent=2))
+    else:
+        print(f"{'case':<36} {'ms':>8}  heavy modules loaded")
+        for r in results:
+            print(f"{r['case']:<36} {r['ms']:>8.1f}  {', '.join(r['heavy_loaded']) or '-'}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: a document held as CachedDocument line dicts vs. served from a memory-mapped .pdfidx file.
+
+Synthetic lines (no PDF, no database) are loaded both ways; the script reports the Python heap each
+representation holds (tracemalloc), the time to load / open it and the latency of random page,
+line and range lookups.
+
+Usage:
+    python benchmarks/bench_pdfidx.py --lines 200000 --lines-per-page 40 --calls 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import WORDS
+from pdfparser_agent.db import CachedDocument
+from pdfparser_agent.pdfidx import PDFIndex, write_index
+
+
+def synthetic_lines(line_count, lines_per_page, seed=0):
+    rng = random.Random(seed)
+    for i in range(line_count):
+        yield {
+            "page_number": i // lines_per_page + 1,
+            "line_num_on_page": i % lines_per_page + 1,
+            "global_line_number": i + 1,
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))),
+        }
+
+
+def held(build):
+    """(object, seconds to build it, bytes of Python heap it keeps alive)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, seconds, size
+
+
+def lookups(doc, calls, seed=1):
+    rng = random.Random(seed)
+    page_count, line_count = doc.page_count, doc.line_count
+    cases = {
+        "page_lines": lambda: doc.page_lines(rng.randint(1, page_count)),
+        "line": lambda: doc.line(rng.randint(1, line_count)),
+        "line_range_40": lambda: doc.line_range(*(lambda s: (s, s + 39))(rng.randint(1, line_count))),
+    }
+    results = {}
+    for name, call in cases.items():
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        results[name] = (time.perf_counter() - start) / calls * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdfidx")
+        start = time.perf_counter()
+        write_index(path, synthetic_lines(args.lines, args.lines_per_page))
+        write_seconds = time.perf_counter() - start
+        # Generating the lines stands in for fetching them from the database
+        cached, cached_seconds, cached_bytes = held(lambda: CachedDocument(list(synthetic_lines(args.lines, args.lines_per_page))))
+        index, index_seconds, index_bytes = held(lambda: PDFIndex(path))
+
+        print(f"{args.lines} lines, {cached.page_count} pages; .pdfidx file {os.path.getsize(path) / 1e6:.1f} MB, written in {write_seconds:.2f} s")
+        print(f"{'':<16} {'heap MB':>10} {'load s':>8} {'page us':>9} {'line us':>9} {'range us':>9}")
+        for name, doc, seconds, size in (("CachedDocument", cached, cached_seconds, cached_bytes), ("PDFIndex", index, index_seconds, index_bytes)):
+            lat = lookups(doc, args.calls)
+            print(f"{name:<16} {size / 1e6:>10.2f} {seconds:>8.3f} {lat['page_lines']:>9.1f} {lat['line']:>9.1f} {lat['line_range_40']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: LLM turns and storage round-trips of a page-range task, one goto per page vs. one read_range.
+
+A task like "summarize each page from 5 to 10" is replayed as the tool calls a react agent makes: before,
+one goto per page (each a separate LLM turn); after, a single read_range call. Every tool call costs
+one simulated LLM turn of --llm-ms, plus the final answer turn. Storage calls are counted on the store,
+with the in-process line cache off by default (--line-cache turns it on), which is what a worker
+serving many documents sees.
+
+Usage:
+    python benchmarks/bench_read_range.py --pages 40 --start 5 --end 10 --llm-ms 800 --backend sqlite
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import use_backend
+from synthetic_pdf import write_pdf
+from pdfparser_agent import db, tools
+
+
+class CountingStore:
+    """Forwards to a store and counts the calls, one per round-trip."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+def run(calls, llm_seconds):
+    """(turns, tool seconds, characters returned, wall seconds with simulated LLM turns)."""
+    tool_seconds, chars = 0.0, 0
+    for call in calls:
+        start = time.perf_counter()
+        chars += len(call())
+        tool_seconds += time.perf_counter() - start
+    turns = len(calls) + 1
+    return turns, tool_seconds, chars, tool_seconds + turns * llm_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--start", type=int, default=5)
+    parser.add_argument("--end", type=int, default=10)
+    parser.add_argument("--llm-ms", type=float, default=800, help="Simulated latency of one LLM turn")
+    parser.add_argument("--max-chars", type=int, default=0, help="Render budget per call (0: unbounded, so both read the same text)")
+    parser.add_argument("--backend", choices=["mongomock", "sqlite"], default="mongomock")
+    parser.add_argument("--line-cache", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_backend(args.backend, tmp)
+        if not args.line_cache:
+            db.LINE_CACHE_DOCUMENTS = 0
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        write_pdf(pdf_path, args.pages)
+        from pdfparser_agent.core import PDFDocument
+        doc = PDFDocument(pdf_path, user_id="bench")
+        store = CountingStore(db.get_store())
+        db.set_store(store)
+
+        pages = range(args.start, args.end + 1)
+        scenarios = {
+            "goto per page": [lambda p=p: tools.goto(doc, "bench", page=p, max_chars=args.max_chars) for p in pages],
+            "read_range": [lambda: tools.read_range(doc, "bench", start_page=args.start, end_page=args.end, max_chars=args.max_chars)],
+        }
+        print(f"pages {args.start}-{args.end} of {args.pages}, {args.backend}, line cache {'on' if args.line_cache else 'off'}, LLM turn {args.llm_ms:.0f} ms")
+        print(f"{'':<14} {'LLM turns':>9} {'round-trips':>11} {'tool ms':>8} {'chars':>7} {'est. s':>7}")
+        for name, calls in scenarios.items():
+            db.invalidate_line_cache()
+            store.calls = 0
+            turns, tool_seconds, chars, seconds = run(calls, args.llm_ms / 1000)
+            print(f"{name:<14} {turns:>9} {store.calls:>11} {tool_seconds * 1000:>8.1f} {chars:>7} {seconds:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
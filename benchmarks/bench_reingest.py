@@ -0,0 +1,95 @@
+"""
+Benchmark: ingesting a new revision of a PDF in full vs. updating the stored document in place.
+
+A --pages page PDF is ingested, then a revision is written with --changed pages edited and
+--inserted pages inserted after the first page. The revision is ingested once from scratch and once
+through PDFDocument.update, which fingerprints every page and re-extracts only the pages that changed.
+Reports wall time, pages extracted, line rows written and, on stores with term postings (Mongo), the
+postings indexed; both runs must store the same lines.
+
+Usage:
+    python benchmarks/bench_reingest.py --pages 100 --changed 3 --inserted 1 --backend sqlite
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import use_backend
+from synthetic_pdf import page_lines, write_pages, write_pdf
+from pdfparser_agent import db
+
+
+def written_rows(store):
+    """Wrap the store's line and term writes to count the rows and postings they write."""
+    counts = {"rows": 0, "postings": 0, "replacing": False}
+    insert_lines, replace_pages, insert_terms = store.insert_lines, store.replace_pages, store.insert_terms
+
+    def counted_insert(document_id, lines):
+        # A store may insert the new pages of a revision through insert_lines
+        if not counts["replacing"]:
+            counts["rows"] += len(lines)
+        return insert_lines(document_id, lines)
+
+    def counted_replace(document_id, removed, moves, lines):
+        counts["rows"] += len(lines)
+        counts["replacing"] = True
+        try:
+            return replace_pages(document_id, removed, moves, lines)
+        finally:
+            counts["replacing"] = False
+    def counted_terms(entries):
+        counts["postings"] += sum(len(entry["postings"]) for entry in entries)
+        return insert_terms(entries)
+    store.insert_lines, store.replace_pages, store.insert_terms = counted_insert, counted_replace, counted_terms
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--changed", type=int, default=3)
+    parser.add_argument("--inserted", type=int, default=1)
+    parser.add_argument("--backend", choices=["mongomock", "sqlite"], default="mongomock")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_backend(args.backend, tmp)
+        from pdfparser_agent.core import PDFDocument
+        rng = random.Random(1)
+        old_path, new_path = os.path.join(tmp, "v1.pdf"), os.path.join(tmp, "v2.pdf")
+        texts = write_pdf(old_path, args.pages)
+        for page in rng.sample(range(args.pages), args.changed):
+            texts[page] = page_lines(rng)
+        texts[1:1] = [page_lines(rng) for _ in range(args.inserted)]
+        write_pages(new_path, texts)
+
+        doc = PDFDocument(old_path, user_id="bench")
+        counts = written_rows(db.get_store())
+        print(f"{args.pages} pages, {args.changed} changed, {args.inserted} inserted, {args.backend}")
+        print(f"{'':<12} {'seconds':>8} {'pages extracted':>15} {'rows written':>12} {'postings':>9}")
+
+        start = time.perf_counter()
+        full = PDFDocument(new_path, user_id="bench", use_cache=False)
+        seconds = time.perf_counter() - start
+        print(f"{'full ingest':<12} {seconds:>8.2f} {len(texts):>15} {counts['rows']:>12} {counts['postings']:>9}")
+        expected = db.get_lines(full.document_id)
+        full.invalidate()
+
+        counts["rows"] = counts["postings"] = 0
+        start = time.perf_counter()
+        revision = doc.update(new_path)
+        seconds = time.perf_counter() - start
+        print(f"{'update':<12} {seconds:>8.2f} {revision['pages_extracted']:>15} {counts['rows']:>12} {counts['postings']:>9}")
+        if db.get_lines(doc.document_id) != expected:
+            raise SystemExit("update stored different lines than a full ingest")
+
+
+if __name__ == "__main__":
+    main()
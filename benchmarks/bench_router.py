@@ -0,0 +1,65 @@
+"""
+Benchmark: per-page processor routing on a synthetic PDF with scanned pages.
+
+Every --scanned-every-th page is an image without a text layer. The budget's processor for those pages
+is replaced by one that sleeps --latency-ms (a remote OCR call), and the PDF is ingested
+  - with ProcessBudget.LOW (every page on pdfplumber, no profiling),
+  - routed with PAGE_PROCESSOR_CONCURRENCY=1 and =--concurrency, on a cold page cache,
+  - routed again on the warm page cache.
+
+Usage:
+    python benchmarks/bench_router.py --pages 200 --scanned-every 5 --latency-ms 200 --concurrency 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import write_pdf
+from pdfparser_agent.processing import page_router
+from pdfparser_agent.processing.pdf_processing import ProcessBudget, load_pdf_with_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--scanned-every", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="pdfplumber extraction processes")
+    args = parser.parse_args()
+
+    calls = []
+
+    def slow_ocr(pdf_path, page_num):
+        calls.append(page_num)
+        time.sleep(args.latency_ms / 1000)
+        return [f"ocr page {page_num}"]
+
+    page_router.register_processor("adobeocr", slow_ocr)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scanned.pdf")
+        write_pdf(pdf_path, args.pages, scanned_every=args.scanned_every)
+        runs = [("low budget", ProcessBudget.LOW, 1, None)]
+        for concurrency in sorted({1, args.concurrency}):
+            runs.append((f"high, {concurrency} in flight, cold", ProcessBudget.HIGH, concurrency, os.path.join(tmp, f"pages{concurrency}")))
+        runs.append((f"high, {args.concurrency} in flight, warm", ProcessBudget.HIGH, args.concurrency, os.path.join(tmp, f"pages{args.concurrency}")))
+
+        print(f"{args.pages} pages, {args.pages // args.scanned_every} scanned, {args.latency_ms:.0f} ms per OCR call")
+        print(f"{'run':<32} {'seconds':>8} {'ocr calls':>10} {'lines':>7}")
+        for name, budget, concurrency, cache_dir in runs:
+            page_router.PAGE_PROCESSOR_CONCURRENCY = concurrency
+            page_router.PAGE_CACHE_DIR = cache_dir or ""
+            calls.clear()
+            start = time.perf_counter()
+            lines = load_pdf_with_budget(pdf_path, budget, workers=args.workers)
+            print(f"{name:<32} {time.perf_counter() - start:>8.2f} {len(calls):>10} {len(lines):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: inverted-index search vs. the linear scan next_search_match used to run on every call.
+
+Runs in memory on a synthetic document, no MongoDB required.
+
+Usage:
+    python benchmarks/bench_search.py --lines 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pdfparser_agent.search import SearchIndex, scan_lines
+
+WORDS = (
+    "climate change emissions warming global temperature carbon policy energy renewable adaptation "
+    "mitigation risk ocean ice sea level report summary assessment scenario pathway finance impact "
+    "ecosystem biodiversity agriculture water health urban infrastructure transition"
+).split()
+
+
+def synthetic_lines(line_count, lines_per_page=50, seed=0):
+    rng = random.Random(seed)
+    rare = [f"term{i}" for i in range(5000)]
+    return [
+        {
+            "page_number": g // lines_per_page + 1,
+            "global_line_number": g + 1,
+            "text": " ".join(rng.choice(WORDS if rng.random() < 0.5 else rare) for _ in range(rng.randint(4, 14))).capitalize(),
+        }
+        for g in range(line_count)
+    ]
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(line_count, repeat):
+    lines = synthetic_lines(line_count)
+    text = {l["global_line_number"]: l["text"] for l in lines}
+    build_time, index = timed(lambda: SearchIndex.from_lines(lines), 1)
+    print(f"{line_count} lines, {len(index.postings)} terms, index built in {build_time * 1000:.0f} ms")
+    queries = [
+        ("term4242", {"whole_word": True}),
+        ("term4242", {}),
+        ("carbon policy", {}),
+        ("Climate", {"case_sensitive": True}),
+        ("limat", {}),
+    ]
+    print(f"{'query':<28} {'matches':>8} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+    for term, options in queries:
+        scan_time, expected = timed(lambda: scan_lines(lines, term, **options), repeat)
+        index_time, found = timed(lambda: index.search(term, text.__getitem__, **options), repeat)
+        if found != expected:
+            raise SystemExit(f"{term!r} {options}: index and scan disagree")
+        label = f"{term!r} {','.join(options) or 'default'}"
+        print(f"{label:<28} {len(found):>8} {scan_time * 1000:>9.2f} {index_time * 1000:>9.2f} {scan_time / index_time:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.lines, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: one-shot query setup vs. a warm `pdfparser-agent serve` server, with a fake LLM.
+
+The fake chat model answers every query with one goto(page=1) tool call and a final message,
+sleeping --llm-ms per turn, so the numbers show server overhead rather than model latency.
+  cold   a fresh process's work per query: import the agent stack (timed in a subprocess),
+         open the document and build the agent, then query
+  warm   the same query over HTTP against a running server
+  load   --clients threads sending --requests queries each; with --concurrency and --queue below
+         the offered load, the surplus is refused with 503 instead of queueing without bound
+  deadline  queries with a timeout shorter than one LLM turn are answered 504
+The answer cache is bypassed throughout.
+
+The fake model is pdfparser_agent.testing.fake_llm, which also works for manual testing:
+    pdfparser-agent serve --llm pdfparser_agent.testing:fake_llm report.pdf
+
+Usage:
+    python benchmarks/bench_serve.py --llm-ms 50 --clients 16 --requests 5 --concurrency 4 --queue 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import summarize, use_backend
+from synthetic_pdf import write_pdf
+from pdfparser_agent.testing import fake_llm
+
+def post(url, body, timeout=60):
+    """(status, parsed body) of a JSON POST."""
+    request = urllib.request.Request(url, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def import_seconds():
+    """Wall time of a fresh interpreter importing what a one-shot query needs."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import pdfparser_agent.core, pdfparser_agent.tools, langgraph.prebuilt"],
+                   check=True, cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--llm-ms", type=float, default=50, help="Simulated latency of one LLM turn")
+    parser.add_argument("--queries", type=int, default=10, help="Sequential queries for the cold/warm comparison")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5, help="Queries per client in the load run")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=4)
+    parser.add_argument("--backend", choices=["mongomock", "sqlite"], default="sqlite")
+    args = parser.parse_args()
+
+    latency = args.llm_ms / 1000
+
+    def llm_factory(model_name=None):
+        return fake_llm(model_name, latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        use_backend(args.backend, tmp)
+        from pdfparser_agent.core import PDFParserAgent
+        from pdfparser_agent.server import make_server
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        write_pdf(pdf_path, args.pages)
+
+        cold = []
+        imports = import_seconds()
+        for i in range(args.queries):
+            start = time.perf_counter()
+            PDFParserAgent(pdf_path, llm=llm_factory()).query(f"question {i}", use_cache=False)
+            cold.append(imports + time.perf_counter() - start)
+
+        server = make_server("127.0.0.1", 0, llm_factory=llm_factory, concurrency=args.concurrency, queue_size=args.queue)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:%d" % server.server_address[1]
+        try:
+            post(url + "/documents", {"pdf_path": pdf_path})
+            warm = []
+            for i in range(args.queries):
+                start = time.perf_counter()
+                status, body = post(url + "/query", {"pdf_path": pdf_path, "query": f"question {i}", "use_cache": False})
+                assert status == 200, body
+                warm.append(time.perf_counter() - start)
+            print(f"{args.pages} pages, {args.backend}, LLM turn {args.llm_ms:.0f} ms (2 turns per query)")
+            print(f"cold  p50 {summarize(cold)['p50_ms']:>8.1f} ms  (imports {imports * 1000:.0f} ms)")
+            print(f"warm  p50 {summarize(warm)['p50_ms']:>8.1f} ms")
+
+            statuses, latencies, lock = {}, [], threading.Lock()
+
+            def client(n):
+                for i in range(args.requests):
+                    start = time.perf_counter()
+                    status, _ = post(url + "/query", {"pdf_path": pdf_path, "query": f"load {n} {i}", "use_cache": False})
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+                        if status == 200:
+                            latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - start
+            stats = summarize(latencies) if latencies else {"p50_ms": 0, "p95_ms": 0}
+            print(f"load  {args.clients} clients x {args.requests}, concurrency {args.concurrency}, queue {args.queue}: "
+                  f"{statuses}, {statuses.get(200, 0) / seconds:.1f} answers/s, p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms")
+
+            status, body = post(url + "/query", {"pdf_path": pdf_path, "query": "slow", "use_cache": False, "timeout": args.llm_ms / 2000})
+            print(f"deadline  timeout {args.llm_ms / 2:.0f} ms -> {status} {body}")
+            with urllib.request.urlopen(url + "/health") as response:
+                print("health", json.load(response)["queries"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Benchmark suite: extraction, ingestion and tool latency on synthetic PDFs.
+
+For each size a synthetic PDF is generated (see synthetic_pdf.py) and measured for
+  - extraction: process_pdf_pypdf_pdfplumber throughput per worker count
+  - ingestion: PDFDocument end to end (hash, extract, insert lines and terms), cold and reopened
+    through the content-hash cache
+  - tools: latency of goto, next_search_match, scroll_down / scroll_up and clip_memory / use_memory,
+    with the first (cold line cache) call reported separately from the warm ones
+No LLM is involved. --backend picks the storage: an in-process mongomock database (default, so the
+numbers measure our side of every query, not the server's), the MongoDB at MONGO_URI, or an
+embedded SQLite file in the temporary directory. --no-line-cache sends every tool read to the backend.
+
+Results are written as JSON; --compare prints the ratio of every timing between two result files.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 10 500 5000 --output results.json
+    python benchmarks/bench_suite.py --backend sqlite --no-line-cache --output sqlite.json
+    python benchmarks/bench_suite.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import write_pdf, WORDS
+
+USER_ID = "bench"
+
+
+def use_mongo_stand_in():
+    """Point db.py at an in-process mongomock database instead of MONGO_URI."""
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock is not installed: pip install mongomock, or pass --backend mongo to use MONGO_URI")
+    from pdfparser_agent import db
+    db.set_database(mongomock.MongoClient()[db.MONGO_DB])
+
+
+def use_backend(backend, directory):
+    from pdfparser_agent import db
+    if backend == "mongomock":
+        use_mongo_stand_in()
+    elif backend == "sqlite":
+        from pdfparser_agent.sqlite_store import SQLiteStore
+        db.set_store(SQLiteStore(os.path.join(directory, "bench.sqlite3")))
+    else:
+        db.STORAGE_BACKEND = backend
+
+
+def summarize(samples):
+    """Timing statistics in milliseconds for a list of durations in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "calls": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "min_ms": round(ms[0], 3),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench_extraction(pdf_path, page_count, workers_list):
+    from pdfparser_agent.processing.pdf_processing import process_pdf_pypdf_pdfplumber
+    results = {}
+    for workers in workers_list:
+        seconds, lines = timed(lambda: process_pdf_pypdf_pdfplumber(pdf_path, workers=workers))
+        results[f"workers_{workers}"] = {"seconds": round(seconds, 3), "pages_per_s": round(page_count / seconds, 1), "lines": len(lines)}
+    return results
+
+
+def bench_ingestion(pdf_path, workers):
+    from pdfparser_agent.core import PDFDocument
+    cold, doc = timed(lambda: PDFDocument(pdf_path, user_id=USER_ID, workers=workers))
+    reopen, _ = timed(lambda: PDFDocument(pdf_path, user_id=USER_ID, workers=workers))
+    return doc, {"cold_s": round(cold, 3), "reopen_s": round(reopen, 3)}
+
+
+def bench_tool(name, call, args_list):
+    """Run call(*args) for every args tuple; the first call starts from a cold line cache."""
+    from pdfparser_agent.db import invalidate_line_cache
+    invalidate_line_cache()
+    samples = []
+    for args in args_list:
+        seconds, _ = timed(lambda: call(*args))
+        samples.append(seconds)
+    result = summarize(samples[1:] or samples)
+    result["cold_ms"] = round(samples[0] * 1000, 3)
+    return name, result
+
+
+def bench_tools(doc, page_count, calls, seed=0):
+    from pdfparser_agent import tools
+    from pdfparser_agent.db import get_document_stats
+    from pdfparser_agent.memory import clip_memory_store
+    from pdfparser_agent.sessions import search_cursors, viewports
+
+    rng = random.Random(seed)
+    line_count = get_document_stats(doc.document_id)["line_count"]
+    search_cursors.clear()
+    viewports.clear()
+    clip_memory_store.clear(USER_ID, doc.document_id)
+
+    def clip(start):
+        tools.clip_memory(doc, USER_ID, start, min(line_count, start + 19))
+
+    def scroll_and_back(n):
+        tools.scroll_down(doc, USER_ID, n)
+        tools.scroll_up(doc, USER_ID, n)
+
+    cases = [
+        ("goto_page", lambda page: tools.goto(doc, USER_ID, page=page), [(rng.randint(1, page_count),) for _ in range(calls)]),
+        ("goto_line", lambda line: tools.goto(doc, USER_ID, line=line), [(rng.randint(1, line_count),) for _ in range(calls)]),
+        # A fresh term per call measures the search itself rather than the cursor
+        ("search_rare_word", lambda term: tools.next_search_match(doc, USER_ID, term, whole_word=True),
+         [(f"term{rng.randrange(5000)}",) for _ in range(calls)]),
+        ("search_substring", lambda term: tools.next_search_match(doc, USER_ID, term),
+         [(rng.choice(WORDS)[1:5],) for _ in range(calls)]),
+        ("search_next", lambda term: tools.next_search_match(doc, USER_ID, term), [("carbon",)] * calls),
+        ("scroll_down_up_40", scroll_and_back, [(40,)] * calls),
+        ("clip_memory_20_lines", clip, [(rng.randint(1, line_count),) for _ in range(calls)]),
+        ("use_memory", lambda: tools.use_memory(doc, USER_ID, "summarize"), [()] * calls),
+    ]
+    results = dict(bench_tool(name, call, args_list) for name, call, args_list in cases)
+    clip_memory_store.clear(USER_ID, doc.document_id)
+    return results
+
+
+def run(sizes, workers_list, ingest_workers, calls, pdf_dir):
+    os.makedirs(pdf_dir, exist_ok=True)
+    results = {}
+    for pages in sizes:
+        pdf_path = os.path.join(pdf_dir, f"synthetic_{pages}.pdf")
+        if not os.path.exists(pdf_path):
+            write_pdf(pdf_path, pages)
+        print(f"--- {pages} pages", file=sys.stderr)
+        entry = {"pages": pages, "bytes": os.path.getsize(pdf_path)}
+        entry["extraction"] = bench_extraction(pdf_path, pages, workers_list)
+        doc, entry["ingestion"] = bench_ingestion(pdf_path, ingest_workers)
+        try:
+            entry["tools"] = bench_tools(doc, pages, calls)
+        finally:
+            doc.invalidate()
+        print(json.dumps(entry, indent=2), file=sys.stderr)
+        results[str(pages)] = entry
+    return results
+
+
+def metadata(backend):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": backend,
+    }
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and prefix.endswith(("_ms", "_s", "seconds")):
+        yield prefix, value
+
+
+def compare(before_path, after_path):
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = dict(_flatten(json.load(f)["results"]))
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = dict(_flatten(json.load(f)["results"]))
+    print(f"{'metric':<58} {'before':>10} {'after':>10} {'ratio':>7}")
+    for key in before:
+        if key in after:
+            ratio = after[key] / before[key] if before[key] else float("inf")
+            print(f"{key:<58} {before[key]:>10.3f} {after[key]:>10.3f} {ratio:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 500, 5000], help="Page counts to generate")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="Extraction worker counts")
+    parser.add_argument("--ingest-workers", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=50, help="Calls per tool")
+    parser.add_argument("--pdf-dir", help="Directory to keep the generated PDFs in (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--backend", choices=["mongomock", "mongo", "sqlite"], default="mongomock",
+                        help="Storage backend (mongo: the server at MONGO_URI)")
+    parser.add_argument("--no-line-cache", action="store_true", help="Disable the in-process line cache")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.no_line_cache:
+        from pdfparser_agent import db
+        db.LINE_CACHE_DOCUMENTS = 0
+    workers_list = sorted(set(args.workers))
+    with tempfile.TemporaryDirectory() as tmp:
+        use_backend(args.backend, tmp)
+        results = run(args.sizes, workers_list, args.ingest_workers, args.calls, args.pdf_dir or tmp)
+    meta = metadata(args.backend)
+    meta["line_cache"] = not args.no_line_cache
+    report = {"meta": meta, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
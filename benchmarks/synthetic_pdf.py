@@ -0,0 +1,105 @@
+"""
+Deterministic synthetic PDFs for the benchmarks.
+
+Writes a minimal PDF by hand (one Helvetica text stream per page, no third-party writer needed), so
+the same seed and page count always produce the same bytes and therefore the same content hash.
+With scanned_every=N every Nth page is a page-sized image without a text layer instead, the way
+a scanned page looks to the page router.
+
+Usage:
+    python benchmarks/synthetic_pdf.py out.pdf --pages 500
+"""
+
+import argparse
+import random
+
+WORDS = (
+    "climate change emissions warming global temperature carbon policy energy renewable adaptation "
+    "mitigation risk ocean ice sea level report summary assessment scenario pathway finance impact "
+    "ecosystem biodiversity agriculture water health urban infrastructure transition"
+).split()
+RARE_WORDS = [f"term{i}" for i in range(5000)]
+LINES_PER_PAGE = 40
+
+
+def page_lines(rng, lines_per_page=LINES_PER_PAGE):
+    return [
+        " ".join(rng.choice(WORDS if rng.random() < 0.5 else RARE_WORDS) for _ in range(rng.randint(4, 14))).capitalize()
+        for _ in range(lines_per_page)
+    ]
+
+
+def _content_stream(lines):
+    ops = ["BT", "/F1 10 Tf", "12 TL", "50 770 Td"]
+    for line in lines:
+        ops.append("(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+SCAN_STREAM = b"q 612 0 0 792 0 0 cm /Im1 Do Q"
+# A 1x1 grey image, stretched over the whole page
+SCAN_IMAGE = b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray /BitsPerComponent 8 /Length 1 >>\nstream\n\x80\nendstream"
+
+
+def write_pdf(path, pages, lines_per_page=LINES_PER_PAGE, seed=0, scanned_every=0):
+    """Write a `pages`-page PDF to path. Returns the extracted text it should yield, one list of lines per page."""
+    rng = random.Random(seed)
+    texts = [page_lines(rng, lines_per_page) for _ in range(pages)]
+    if scanned_every:
+        texts = [[] if page % scanned_every == 0 else lines for page, lines in enumerate(texts, 1)]
+    write_pages(path, texts, scanned_every)
+    return texts
+
+
+def write_pages(path, texts, scanned_every=0):
+    """Write a PDF with the given lines on each page (every scanned_every-th page as a scan instead)."""
+    pages = len(texts)
+    # Objects: 1 catalog, 2 page tree, 3 font, [4 scan image,] then (page, content) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    if scanned_every:
+        objects.append(SCAN_IMAGE)
+    kids = []
+    for page, lines in enumerate(texts, 1):
+        page_id, content_id = len(objects) + 1, len(objects) + 2
+        kids.append(f"{page_id} 0 R")
+        scanned = scanned_every and page % scanned_every == 0
+        resources = "/XObject << /Im1 4 0 R >>" if scanned else "/Font << /F1 3 0 R >>"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << {resources} >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        stream = SCAN_STREAM if scanned else _content_stream(lines)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Output PDF path")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--lines-per-page", type=int, default=LINES_PER_PAGE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanned-every", type=int, default=0, help="Make every Nth page an image without text")
+    args = parser.parse_args()
+    write_pdf(args.path, args.pages, args.lines_per_page, args.seed, args.scanned_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,26 +8,53 @@ __version__ = "0.1.0"
 __author__ = "Priyesh Srivastava"
 __email__ = "priyesh@example.com"
 
-from .core import PDFDocument, PDFParserAgent
-from .tools import (
-    next_search_match,
-    goto,
-    scroll_up,
-    scroll_down,
-    clip_memory,
-    use_memory,
-    doc_task,
-    ProcessBudget,
-    DocTaskConfig,
-)
+# Public names and the submodule defining each. They are imported on first access (PEP 562), so
+# `import pdfparser_agent` and extraction-only users never load the agent stack or pymongo.
+_EXPORTS = {
+    "PDFDocument": "core",
+    "PDFParserAgent": "core",
+    "AsyncPDFDocument": "core",
+    "AsyncPDFParserAgent": "core",
+    "Corpus": "corpus",
+    "CorpusAgent": "corpus",
+    "next_search_match": "tools",
+    "goto": "tools",
+    "scroll_up": "tools",
+    "scroll_down": "tools",
+    "read_range": "tools",
+    "clip_memory": "tools",
+    "use_memory": "tools",
+    "doc_task": "tools",
+    "ProcessBudget": "tools",
+    "DocTaskConfig": "tools",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 
 __all__ = [
     "PDFDocument",
     "PDFParserAgent",
+    "AsyncPDFDocument",
+    "AsyncPDFParserAgent",
+    "Corpus",
+    "CorpusAgent",
     "next_search_match",
     "goto",
     "scroll_up",
     "scroll_down",
+    "read_range",
     "clip_memory",
     "use_memory",
     "doc_task",
@@ -0,0 +1,347 @@
+"""
+Answer cache for agent queries.
+
+A query against a document runs a multi-turn agent loop, and the same questions are asked of the
+same reports again and again. Finished answers are cached under a key made of the document (content
+hash and processing budget), the normalized query, the model (its name and a hash of the chat
+model's configuration, see model_key) and a hash of the system prompt, so an answer is only reused
+for the same text, question, model and instructions.
+
+Entries expire ANSWER_CACHE_TTL seconds after they were stored and each store holds at most
+ANSWER_CACHE_MAX_ENTRIES answers, evicting the least recently used. ANSWER_CACHE selects the store:
+    off      no caching (default): agent answers vary between runs, so reusing them is opt-in
+    memory   per process
+    disk     JSON files in ANSWER_CACHE_DIR, shared by the processes of one machine
+    mongo    the answer_cache collection of MONGO_DB, shared by every worker
+Answers are stored as JSON, agent messages through langchain's message dicts. Every call can skip
+the cache with use_cache=False; hits, misses and bypasses are counted per cache and in the active
+query's instrumentation report.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .instrumentation import set_label
+from .sessions import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE = os.environ.get("ANSWER_CACHE", "off")
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_DIR = os.environ.get(
+    "ANSWER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdfparser-agent", "answers")
+)
+
+HIT, MISS, BYPASS = "hit", "miss", "bypass"
+
+
+def normalize_query(query: str) -> str:
+    """Unicode-normalized, case-folded query with runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def model_key(model_name: str, llm: Any) -> str:
+    """
+    model_name plus a hash of the configuration of the chat model that answers: a chat model's class
+    and identifying parameters, the spec string a model is resolved from, or a configuration dict.
+    """
+    if isinstance(llm, str):
+        config = {"model": llm}
+    elif isinstance(llm, dict):
+        config = llm
+    else:
+        config = dict(getattr(llm, "_identifying_params", {}), type=type(llm).__name__)
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{model_name}@{digest[:16]}"
+
+
+def answer_key(document: str, query: str, model: str, system_prompt: str) -> str:
+    """Cache key of an answer; document identifies the text the agent reads (content hash and budget)."""
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    parts = [document, normalize_query(query), model, prompt_hash]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+# --- Answer encoding ---
+def _encode(result: Any) -> Optional[str]:
+    """result as JSON, agent messages included; None if it cannot be stored."""
+    def default(value):
+        from langchain_core.messages import BaseMessage, message_to_dict
+        if isinstance(value, BaseMessage):
+            return {"__message__": message_to_dict(value)}
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    try:
+        return json.dumps(result, default=default)
+    except (TypeError, ValueError, ImportError):
+        logger.debug("Answer of type %s not cached", type(result).__name__, exc_info=True)
+        return None
+
+
+def _decode(text: str) -> Any:
+    def hook(value):
+        if "__message__" in value:
+            from langchain_core.messages import messages_from_dict
+            return messages_from_dict([value["__message__"]])[0]
+        return value
+    return json.loads(text, object_hook=hook)
+
+
+# --- Stores ---
+class MemoryAnswerStore:
+    """Answers held in this process."""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL):
+        self._entries = TTLCache(max_entries, ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: str, expires_at: float):
+        self._entries.set(key, (expires_at, value))
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DiskAnswerStore:
+    """
+    One JSON file per answer in directory. A file's mtime is its last use, so eviction needs no index;
+    files only appear under their final name once complete.
+    """
+
+    def __init__(self, directory: str = ANSWER_CACHE_DIR, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            self._unlink(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def set(self, key: str, value: str, expires_at: float):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                self._unlink(entry.path)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class MongoAnswerStore:
+    """
+    Answers in a MongoDB collection shared by all workers. A TTL index drops expired entries; the
+    least recently used ones beyond max_entries are deleted after each insert.
+    """
+
+    def __init__(self, collection=None, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        if collection is None:
+            from .db import get_db
+            collection = get_db().answer_cache
+        self.collection = collection
+        self.max_entries = max_entries
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        collection.create_index("last_used")
+
+    def get(self, key: str) -> Optional[str]:
+        from datetime import datetime, timezone
+        now = datetime.now(timezone.utc)
+        entry = self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}}, {"$set": {"last_used": now}}, projection={"value": 1}
+        )
+        return None if entry is None else entry["value"]
+
+    def set(self, key: str, value: str, expires_at: float):
+        from datetime import datetime, timezone
+        now = datetime.now(timezone.utc)
+        self.collection.replace_one(
+            {"_id": key},
+            {"value": value, "expires_at": datetime.fromtimestamp(expires_at, timezone.utc), "last_used": now},
+            upsert=True,
+        )
+        excess = self.collection.estimated_document_count() - self.max_entries
+        if excess > 0:
+            oldest = [entry["_id"] for entry in self.collection.find({}, {"_id": 1}).sort("last_used", 1).limit(excess)]
+            self.collection.delete_many({"_id": {"$in": oldest}})
+
+    def clear(self):
+        self.collection.delete_many({})
+
+
+# --- Cache ---
+class AnswerCache:
+    """Answers in a store, with hit/miss counters. Store failures are logged and treated as misses."""
+
+    def __init__(self, store, ttl: float = ANSWER_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.counts = {HIT: 0, MISS: 0, BYPASS: 0, "stored": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def get(self, key: str) -> Any:
+        try:
+            text = self.store.get(key)
+        except Exception:
+            logger.warning("Answer cache lookup failed", exc_info=True)
+            self._count("errors")
+            return None
+        return None if text is None else _decode(text)
+
+    def set(self, key: str, result: Any):
+        text = _encode(result)
+        if text is None:
+            return
+        try:
+            self.store.set(key, text, time.time() + self.ttl)
+        except Exception:
+            logger.warning("Answer cache store failed", exc_info=True)
+            self._count("errors")
+            return
+        self._count("stored")
+
+    def answer(self, key: str, compute: Callable[[], Any], use_cache: bool = True) -> Any:
+        """The cached answer for key, or compute() stored under it. use_cache=False neither reads nor writes."""
+        if not use_cache:
+            self._record(BYPASS)
+            return compute()
+        result = self.get(key)
+        if result is not None:
+            self._record(HIT)
+            return result
+        self._record(MISS)
+        result = compute()
+        self.set(key, result)
+        return result
+
+    async def aanswer(self, key: str, compute: Callable[[], Awaitable[Any]], use_cache: bool = True) -> Any:
+        """answer() for a coroutine function; the store is used on the default executor."""
+        if not use_cache:
+            self._record(BYPASS)
+            return await compute()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.get, key)
+        if result is not None:
+            self._record(HIT)
+            return result
+        self._record(MISS)
+        result = await compute()
+        await loop.run_in_executor(None, self.set, key, result)
+        return result
+
+    def _record(self, outcome: str):
+        self._count(outcome)
+        set_label("answer_cache", outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts[HIT] + counts[MISS]
+        counts["hit_rate"] = round(counts[HIT] / lookups, 4) if lookups else 0.0
+        return counts
+
+    def clear(self):
+        self.store.clear()
+
+
+def _cache_from_env() -> Optional[AnswerCache]:
+    if ANSWER_CACHE == "memory":
+        return AnswerCache(MemoryAnswerStore())
+    if ANSWER_CACHE == "disk":
+        return AnswerCache(DiskAnswerStore())
+    if ANSWER_CACHE == "mongo":
+        return AnswerCache(MongoAnswerStore())
+    if ANSWER_CACHE not in ("", "off"):
+        logger.warning("Unknown ANSWER_CACHE=%r, answer cache disabled", ANSWER_CACHE)
+    return None
+
+
+_cache = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """The process-wide answer cache (created from ANSWER_CACHE on first use), or None when disabled."""
+    global _cache, _configured
+    with _cache_lock:
+        if not _configured:
+            _cache = _cache_from_env()
+            _configured = True
+        return _cache
+
+
+def set_answer_cache(cache: Optional[AnswerCache]):
+    """Use cache for all queries; None disables answer caching."""
+    global _cache, _configured
+    with _cache_lock:
+        _cache = cache
+        _configured = True
+
+
+def cached_answer(key: str, compute: Callable[[], Any], use_cache: bool = True) -> Any:
+    cache = get_answer_cache()
+    if cache is None:
+        return compute()
+    return cache.answer(key, compute, use_cache)
+
+
+async def acached_answer(key: str, compute: Callable[[], Awaitable[Any]], use_cache: bool = True) -> Any:
+    cache = get_answer_cache()
+    if cache is None:
+        return await compute()
+    return await cache.aanswer(key, compute, use_cache)
@@ -0,0 +1,308 @@
+"""
+asyncio counterpart of db.py.
+
+Works on the same store as db.py. A Mongo store that db.py connected from MONGO_URI is reached
+through pymongo's native AsyncMongoClient; any other store (SQLite, or a database installed with
+db.set_database) runs its calls on the default executor, so with STORAGE_BACKEND=sqlite sync and
+async callers read and write the same file. The in-process line cache is shared with db.py, so sync
+and async callers in one process never load a document twice.
+
+An awaitable Mongo database (e.g. the mongomock stand-in of the tests) can be installed with set_database.
+"""
+
+import asyncio
+import functools
+import time
+import uuid
+
+from .db import (
+    CachedDocument,
+    IngestLeaseLost,
+    _new_document,
+    _lease,
+    _lease_expired,
+    _takeover_fields,
+    _term_entries,
+    _cache_lookup,
+    _cache_store,
+    _revalidation_due,
+    _revalidated,
+    _open_document_index,
+    _write_document_index,
+    invalidate_line_cache,
+)
+from . import db as _sync_db
+from .instrumentation import instrumented
+from .pdfidx import record_index_path, remove_index
+
+# Installed with set_store / set_database; otherwise derived from db.py's store
+_store = None
+# (db.py store, async store following it)
+_derived = (None, None)
+
+
+class ExecutorStore:
+    """Awaitable view of a synchronous store (see db.get_store) that runs every call on the default executor."""
+
+    def __init__(self, store):
+        self.store = store
+        self.name = store.name
+        self.term_postings = store.term_postings
+
+    async def open(self):
+        pass
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.get_running_loop().run_in_executor(None, functools.partial(method, *args, **kwargs))
+        return call
+
+
+def set_store(store):
+    """Use the given async store (an AsyncMongoStore or ExecutorStore) instead of following db.py's store."""
+    global _store
+    _store = store
+    invalidate_line_cache()
+
+
+def set_database(database):
+    """Use the given async Mongo database (e.g. a Mongo stand-in) instead of following db.py's store."""
+    from .mongo_store import AsyncMongoStore
+    set_store(AsyncMongoStore(database))
+
+
+async def get_store():
+    """The async store: the installed one, or one over the store db.py is configured with (see module docstring)."""
+    global _derived
+    store = _store
+    if store is None:
+        sync_store = _sync_db._store
+        if sync_store is None:
+            sync_store = await asyncio.get_running_loop().run_in_executor(None, _sync_db.get_store)
+        followed, store = _derived
+        if followed is not sync_store:
+            if getattr(sync_store, "uri", None):
+                from .mongo_store import AsyncMongoStore
+                store = AsyncMongoStore.connect(sync_store.uri, sync_store.database_name)
+            else:
+                store = ExecutorStore(sync_store)
+            _derived = (sync_store, store)
+    await store.open()
+    return store
+
+
+async def get_database():
+    """The awaitable Mongo database behind the async store; only meaningful with the mongo backend."""
+    store = await get_store()
+    if not hasattr(store, "db"):
+        raise RuntimeError(f"get_database() needs an async Mongo store, the store is {store.name!r}")
+    return store.db
+
+
+@instrumented("db")
+async def insert_document_metadata(document_path, processing_type, user_id, content_hash=None):
+    store = await get_store()
+    return await store.insert_document(_new_document(document_path, processing_type, user_id, content_hash))
+
+
+@instrumented("db")
+async def claim_document(document_path, processing_type, user_id, content_hash):
+    """See db.claim_document."""
+    token = uuid.uuid4().hex
+    doc = _new_document(document_path, processing_type, user_id, content_hash)
+    doc.update(_lease(token))
+    del doc["content_hash"], doc["processing_type"]
+    store = await get_store()
+    record = await store.claim_document(doc, content_hash, processing_type)
+    if _lease_expired(record) and await store.update_owned_document(record["_id"], record.get("ingest_token"), _takeover_fields(token)):
+        await store.delete_lines(record["_id"])
+        record = await store.get_document(record["_id"])
+    return record, record.get("ingest_token") == token
+
+
+@instrumented("db")
+async def renew_ingest_lease(document_id, token):
+    """See db.renew_ingest_lease."""
+    store = await get_store()
+    if not await store.update_owned_document(document_id, token, {"lease_expires": time.time() + _sync_db.INGEST_LEASE}):
+        raise IngestLeaseLost(f"Ingestion of document {document_id} was taken over after its lease expired")
+
+
+@instrumented("db")
+async def wait_for_document(document_id, timeout=600, poll_interval=0.5, on_progress=None):
+    """See db.wait_for_document."""
+    deadline = time.monotonic() + timeout
+    while True:
+        record = await get_document(document_id)
+        if record is None or _lease_expired(record):
+            return None
+        if record.get("status") != "loading":
+            return record
+        if on_progress:
+            on_progress(record)
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Document {document_id} is still being ingested after {timeout}s")
+        await asyncio.sleep(poll_interval)
+
+
+@instrumented("db")
+async def invalidate_document(document_id):
+    """See db.invalidate_document."""
+    invalidate_line_cache(document_id)
+    store = await get_store()
+    record = await store.get_document(document_id)
+    if record is not None:
+        remove_index(record_index_path(record))
+    await store.delete_document(document_id)
+
+
+@instrumented("db")
+async def insert_document_lines(document_id, lines):
+    if lines:
+        store = await get_store()
+        await store.insert_lines(document_id, lines)
+        invalidate_line_cache(document_id)
+
+
+@instrumented("db")
+async def insert_document_terms(document_id, lines):
+    entries = _term_entries(document_id, lines)
+    if entries:
+        store = await get_store()
+        await store.insert_terms(entries)
+
+
+@instrumented("db")
+async def update_document_progress(document_id, pages_ready, status="loading", **stats):
+    update = {"pages_ready": pages_ready, "status": status}
+    update.update((name, value) for name, value in stats.items() if value is not None)
+    store = await get_store()
+    await store.update_document(document_id, update)
+
+
+@instrumented("db")
+async def get_lines(document_id):
+    """Every stored line of the document ordered by global line number, bypassing the line cache."""
+    store = await get_store()
+    return await store.get_lines(document_id)
+
+
+@instrumented("db")
+async def get_document(document_id):
+    store = await get_store()
+    return await store.get_document(document_id)
+
+
+# --- Shared in-process line cache ---
+async def _current_cache_lookup(document_id):
+    """See db._current_cache_lookup."""
+    cached = _cache_lookup(document_id)
+    if cached is None or not _revalidation_due(cached):
+        return cached
+    store = await get_store()
+    return _revalidated(document_id, cached, await store.get_document(document_id, fields=["revision"]))
+
+
+@instrumented("db")
+async def get_cached_document(document_id):
+    """See db.get_cached_document."""
+    cached = await _current_cache_lookup(document_id)
+    if cached is not None or _sync_db.LINE_CACHE_DOCUMENTS <= 0:
+        return cached
+    record = await get_document(document_id)
+    if record is None or record.get("status", "ready") != "ready":
+        return None
+    cached = _open_document_index(record)
+    if cached is None:
+        lines = await get_lines(document_id)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, _write_document_index, record, lines) or CachedDocument(lines, record.get("page_count"))
+    _cache_store(document_id, cached, record)
+    return cached
+
+
+@instrumented("db")
+async def get_search_index(document_id):
+    """See db.get_search_index."""
+    cached = await get_cached_document(document_id)
+    store = await get_store()
+    if cached is None:
+        return await store.search_index(document_id, None)
+    if cached.search_index is None:
+        cached.search_index = await store.search_index(document_id, cached)
+    return cached.search_index
+
+
+@instrumented("db")
+async def get_page_lines(document_id, page_number):
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        return cached.page_lines(page_number)
+    store = await get_store()
+    return await store.get_page_lines(document_id, page_number)
+
+
+@instrumented("db")
+async def get_page_range(document_id, start_page, end_page):
+    """See db.get_page_range."""
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        return cached.page_range(start_page, end_page)
+    store = await get_store()
+    return await store.get_page_range(document_id, start_page, end_page)
+
+
+@instrumented("db")
+async def get_line(document_id, global_line_number):
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        return cached.line(global_line_number)
+    store = await get_store()
+    return await store.get_line(document_id, global_line_number)
+
+
+@instrumented("db")
+async def get_line_range(document_id, start, end):
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        return cached.line_range(start, end)
+    store = await get_store()
+    return await store.get_line_ranges(document_id, [(start, end)])
+
+
+@instrumented("db")
+async def get_line_ranges(document_id, ranges):
+    """See db.get_line_ranges."""
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        seen = {}
+        for start, end in ranges:
+            for line in cached.line_range(start, end):
+                seen[line["global_line_number"]] = line
+        return [seen[g] for g in sorted(seen)]
+    if not ranges:
+        return []
+    store = await get_store()
+    return await store.get_line_ranges(document_id, ranges)
+
+
+@instrumented("db")
+async def get_all_lines(document_id):
+    cached = await get_cached_document(document_id)
+    if cached is not None:
+        return cached.lines
+    return await get_lines(document_id)
+
+
+@instrumented("db")
+async def get_document_stats(document_id):
+    cached = await _current_cache_lookup(document_id)
+    if cached is not None:
+        return cached.stats()
+    store = await get_store()
+    record = await store.get_document(document_id, fields=["page_count", "line_count"])
+    if record is not None and "page_count" in record and "line_count" in record:
+        return {"page_count": record["page_count"], "line_count": record["line_count"]}
+    return await store.line_stats(document_id)
@@ -0,0 +1,217 @@
+"""
+Async versions of the PDF navigation tools, backed by async_db.
+
+Output, search cursors, viewports and the clip memory store are shared with tools.py, so a session may mix
+sync and async calls.
+"""
+
+from typing import List, Optional, Tuple
+
+from .async_db import (
+    get_page_lines,
+    get_page_range,
+    get_line,
+    get_line_range,
+    get_line_ranges,
+    get_all_lines,
+    get_document_stats,
+    get_cached_document,
+    get_search_index,
+)
+from .search import scan_lines
+from .instrumentation import instrumented
+from .sessions import SearchCursor, search_cursors, get_viewport
+from .memory import clip_memory_store, text_size
+from .rendering import parse_continuation
+from .tools import (
+    _bind_signature,
+    _document_id,
+    _page_not_ready,
+    _format_page,
+    _render_page,
+    _page_from,
+    _range_plan,
+    _split_pages,
+    _render_pages,
+    _move_viewport,
+    _show_lines,
+    _clip_message,
+    _materialize_clips,
+    _memory_offset,
+)
+
+
+# --- Markdown Output Helper ---
+async def render_page_markdown(document_id: str, user_id: str, page_num: int, highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None, highlight_total: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    not_ready = _page_not_ready(document_id, page_num)
+    if not_ready:
+        return not_ready
+    document_id = _document_id(document_id)
+    lines = await get_page_lines(document_id, page_num)
+    total_pages = (await get_document_stats(document_id))["page_count"]
+    return _format_page(page_num, total_pages, lines, highlight_lines, highlight_match, highlight_total, max_chars)
+
+
+async def _show_page(document, user_id: str, page_num: int, start: Optional[int] = None, max_chars: Optional[int] = None, **highlight) -> str:
+    not_ready = _page_not_ready(document, page_num)
+    if not_ready:
+        return not_ready
+    doc_id = _document_id(document)
+    lines = _page_from(await get_page_lines(doc_id, page_num), start)
+    text, shown = _render_page(page_num, (await get_document_stats(doc_id))["page_count"], lines, max_chars=max_chars, continued=start is not None, **highlight)
+    _move_viewport(user_id, doc_id, shown)
+    return text
+
+
+# --- Tool: next_search_match ---
+async def _find_matches(document_id: str, search_term: str, case_sensitive: bool = False, whole_word: bool = False) -> List[Tuple[int, int]]:
+    index = await get_search_index(document_id)
+    if index is not None:
+        cached = await get_cached_document(document_id)
+        matches = index.search(search_term, cached.text_of, case_sensitive, whole_word)
+        if matches is not None:
+            return matches
+    return scan_lines(await get_all_lines(document_id), search_term, case_sensitive, whole_word)
+
+
+@instrumented("tool")
+async def next_search_match(document_id: str, user_id: str, search_term: str, match_number: Optional[int] = None, case_sensitive: bool = False, whole_word: bool = False) -> str:
+    """
+    Find the next match for a search term in the loaded PDF and render the page with the match highlighted.
+    Without match_number this returns the match after the one returned last for the same term (the first match on a new search).
+    Matching is case-insensitive substring matching unless case_sensitive or whole_word is set.
+    """
+    key = (user_id, str(_document_id(document_id)), search_term, case_sensitive, whole_word)
+    cursor = search_cursors.get(key)
+    if cursor is None:
+        cursor = SearchCursor(await _find_matches(_document_id(document_id), search_term, case_sensitive, whole_word))
+        if not getattr(document_id, "is_loading", False):
+            search_cursors.set(key, cursor)
+    matches = cursor.matches
+    if not matches:
+        return "No matches found."
+    idx = match_number-1 if match_number else cursor.position + 1
+    if idx >= len(matches):
+        return f"Only {len(matches)} matches found."
+    cursor.position = idx
+    page_num, global_line = matches[idx]
+    return await _show_page(document_id, user_id, page_num, highlight_lines=[global_line], highlight_match=idx+1, highlight_total=len(matches))
+
+
+# --- Tool: goto ---
+@instrumented("tool")
+async def goto(document_id: str, user_id: str, page: int = None, line: int = None, continuation: Optional[str] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Go to a specific page or line number in the PDF and render it in markdown. Takes either page or line as input,
+    or the continuation token of a result that was cut short to show the rest of it. max_chars caps the output size.
+    """
+    if continuation is not None:
+        try:
+            kind, args = parse_continuation(continuation)
+        except ValueError:
+            return "Invalid continuation token."
+        if kind == "page":
+            return await _show_page(document_id, user_id, args[0], start=args[1], max_chars=max_chars)
+        if kind == "lines":
+            doc_id = _document_id(document_id)
+            return _show_lines(doc_id, user_id, f"Lines {args[0]}-{args[1]}", await get_line_range(doc_id, *args), max_chars)
+        return await use_memory(document_id, user_id, "", continuation=continuation, max_chars=max_chars)
+    if page is not None:
+        return await _show_page(document_id, user_id, page, max_chars=max_chars)
+    if line is not None:
+        l = await get_line(_document_id(document_id), line)
+        if l:
+            return await _show_page(document_id, user_id, l["page_number"], highlight_lines=[line], max_chars=max_chars)
+    return "Invalid target."
+
+
+# --- Tool: read_range ---
+@instrumented("tool")
+async def read_range(document_id: str, user_id: str, start_page: int = None, end_page: int = None, start_line: int = None, end_line: int = None, max_chars_per_page: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Read several pages (start_page to end_page) or a span of lines (start_line to end_line) in one call, instead of
+    one goto per page. max_chars_per_page caps the text of each page; pages that are cut end with a continuation token.
+    """
+    doc_id = _document_id(document_id)
+    if start_page is not None:
+        total_pages = (await get_document_stats(doc_id))["page_count"]
+        plan = _range_plan(document_id, start_page, end_page, total_pages, max_chars)
+        if isinstance(plan, str):
+            return plan
+        end_page, last = plan
+        pages = _split_pages(await get_page_range(doc_id, start_page, last), start_page, last)
+        text, shown = _render_pages(pages, total_pages, end_page, max_chars, max_chars_per_page)
+        _move_viewport(user_id, doc_id, shown)
+        return text
+    if start_line is not None and end_line is not None and start_line <= end_line:
+        return _show_lines(doc_id, user_id, f"Lines {start_line}-{end_line}", await get_line_range(doc_id, start_line, end_line), max_chars)
+    return "Invalid range: give start_page (and end_page) or start_line and end_line."
+
+
+# --- Tool: scroll_up ---
+@instrumented("tool")
+async def scroll_up(document_id: str, user_id: str, n: int, max_chars: Optional[int] = None) -> str:
+    """
+    Scroll up n lines: show the n lines above the current view (the last n lines of the document if nothing has been viewed yet).
+    """
+    doc_id = _document_id(document_id)
+    viewport = get_viewport(user_id, doc_id)
+    if viewport is None:
+        end = (await get_document_stats(doc_id))["line_count"]
+    else:
+        end = viewport[0] - 1
+    if end < 1:
+        return "Already at the top of the document."
+    return _show_lines(doc_id, user_id, f"Scrolled Up {n} lines", await get_line_range(doc_id, max(1, end - n + 1), end), max_chars)
+
+
+# --- Tool: scroll_down ---
+@instrumented("tool")
+async def scroll_down(document_id: str, user_id: str, n: int, max_chars: Optional[int] = None) -> str:
+    """
+    Scroll down n lines: show the n lines below the current view (the first n lines of the document if nothing has been viewed yet).
+    """
+    doc_id = _document_id(document_id)
+    viewport = get_viewport(user_id, doc_id)
+    start = 1 if viewport is None else viewport[1] + 1
+    lines = await get_line_range(doc_id, start, start + n - 1)
+    if not lines:
+        return "Already at the end of the document."
+    return _show_lines(doc_id, user_id, f"Scrolled Down {n} lines", lines, max_chars)
+
+
+# --- Tool: clip_memory ---
+@instrumented("tool")
+async def clip_memory(document_id: str, user_id: str, line_num_start: int, line_num_end: int) -> str:
+    """
+    Clip lines from line_num_start to line_num_end and store in memory (per user/document).
+    """
+    clip = await get_line_range(_document_id(document_id), line_num_start, line_num_end)
+    if not clip:
+        return f"No lines between {line_num_start} and {line_num_end}."
+    evicted = clip_memory_store.add(user_id, _document_id(document_id), line_num_start, line_num_end, text_size(clip))
+    return _clip_message(line_num_start, line_num_end, evicted)
+
+
+# --- Tool: use_memory ---
+@instrumented("tool")
+async def use_memory(document_id: str, user_id: str, prompt: str, continuation: Optional[str] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Use the clipped memory to answer a prompt (simulated). Pass the continuation token of a cut short result to see the rest.
+    """
+    offset = _memory_offset(continuation)
+    if offset is None:
+        return "Invalid continuation token."
+    clips = clip_memory_store.clips(user_id, _document_id(document_id))
+    if not clips:
+        return "No memory clipped."
+    lines = await get_line_ranges(_document_id(document_id), [(c.start, c.end) for c in clips])
+    return _materialize_clips(clips, lines, offset, max_chars)
+
+
+# --- Tool Wrappers for Agent Registration ---
+def make_tool_with_doc(tool_func, doc):
+    """Create a coroutine wrapper that binds the document to the async tool."""
+    async def wrapper(*args, **kwargs):
+        return await tool_func(doc, *args, **kwargs)
+    return _bind_signature(wrapper, tool_func)
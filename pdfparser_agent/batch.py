@@ -0,0 +1,205 @@
+"""
+Batch doc_task runner.
+
+Each DocTaskConfig flows through three pipelined stages, download -> ingest -> agent, each served by
+its own pool of threads and connected by bounded queues. While item N is in the LLM phase, item N+1
+is already being ingested and item N+2 downloaded; the bounded queues keep a fast stage from running
+arbitrarily far ahead of a slow one. Results stream out as soon as each item finishes.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Union
+
+from .answer_cache import cached_answer
+from .tools import DocTaskConfig, _build_doc_agent, _doc_task_key, _download_pdf, _remove_download
+
+_DONE = object()
+
+
+class BatchItem:
+    """One config moving through the pipeline, with its timings and the first error it hit."""
+
+    def __init__(self, index: int, config: Optional[DocTaskConfig], raw_config: Optional[Dict[str, Any]] = None):
+        self.index = index
+        self.config = config
+        # Invalid configs travel through the pipeline as already-failed items
+        self.raw_config = raw_config if config is None else None
+        self.pdf_path = None
+        self.document = None
+        self.output = None
+        self.error = None
+        self.failed_stage = None
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def to_result(self) -> Dict[str, Any]:
+        self.timings["total"] = round(time.perf_counter() - self.started, 3)
+        if self.config is not None:
+            source = self.config.model_dump()
+        else:
+            source = self.raw_config if isinstance(self.raw_config, dict) else {}
+        result = {
+            "index": self.index,
+            "pdf_url": str(source.get("pdf_url")),
+            "task": source.get("task"),
+            "status": "error" if self.error else "ok",
+            "timings": self.timings,
+        }
+        if self.error:
+            result["error"] = self.error
+            result["stage"] = self.failed_stage
+        else:
+            result["document_id"] = str(self.document.document_id)
+            result["output"] = self.output
+        return result
+
+
+def _final_message(agent_result: Any) -> Any:
+    """The text of the agent's last message, or the raw result if it has no messages."""
+    messages = agent_result.get("messages") if isinstance(agent_result, dict) else None
+    if messages:
+        return getattr(messages[-1], "content", messages[-1])
+    return agent_result
+
+
+# --- Stages ---
+def _download(item: BatchItem):
+    item.pdf_path = _download_pdf(item.config.pdf_url)
+
+
+def _ingest(item: BatchItem, ingest_workers: int = 1):
+    from .core import PDFDocument
+    item.document = PDFDocument(item.pdf_path, budget=item.config.process_budget_pagewise, workers=ingest_workers)
+
+
+def _run_agent(item: BatchItem):
+    config, document = item.config, item.document
+    try:
+        def run_task():
+            agent = _build_doc_agent(document, config.model_name)
+            return agent.invoke({"messages": [{"role": "user", "content": config.task}]})
+
+        key = _doc_task_key(document.content_hash, document.processing_type, config.task, config.model_name, config.structured_output_schema)
+        item.output = _final_message(cached_answer(key, run_task))
+    finally:
+        _remove_download(item.pdf_path)
+
+
+def _start_stage(name, func, inbox, outbox, concurrency, done_count=1):
+    """
+    Run func over inbox items on `concurrency` threads and forward every item to outbox.
+    Once all workers have seen their _DONE, put done_count _DONE markers (one per next-stage worker).
+    """
+    def worker():
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            if item.error is None:
+                start = time.perf_counter()
+                try:
+                    func(item)
+                except Exception as e:
+                    item.error = f"{type(e).__name__}: {e}"
+                    item.failed_stage = name
+                    if item.pdf_path:
+                        _remove_download(item.pdf_path)
+                item.timings[name] = round(time.perf_counter() - start, 3)
+            outbox.put(item)
+
+    def closer(threads):
+        for thread in threads:
+            thread.join()
+        for _ in range(done_count):
+            outbox.put(_DONE)
+
+    threads = [threading.Thread(target=worker, name=f"batch-{name}-{i}", daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    threading.Thread(target=closer, args=(threads,), daemon=True).start()
+
+
+def iter_batch(
+    configs: Iterable[Union[DocTaskConfig, Dict[str, Any]]],
+    download_concurrency: int = 4,
+    ingest_concurrency: int = 2,
+    agent_concurrency: int = 4,
+    ingest_workers: int = 1,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run doc_task over many configs and yield one result dict per config, in completion order.
+    Results carry the config's index, per-stage timings in seconds and either the agent output or the error.
+    """
+    stages = [
+        ("download", _download, download_concurrency),
+        ("ingest", lambda item: _ingest(item, ingest_workers), ingest_concurrency),
+        ("agent", _run_agent, agent_concurrency),
+    ]
+    # Each stage's inbox holds at most two items per worker: enough to keep it busy, not enough to pile up
+    inboxes = [queue.Queue(maxsize=concurrency * 2) for _, _, concurrency in stages]
+    results = queue.Queue()
+    for i, (name, func, concurrency) in enumerate(stages):
+        if i + 1 < len(stages):
+            _start_stage(name, func, inboxes[i], inboxes[i + 1], concurrency, done_count=stages[i + 1][2])
+        else:
+            _start_stage(name, func, inboxes[i], results, concurrency)
+
+    feed_errors = []
+
+    def feed():
+        try:
+            for index, config in enumerate(configs):
+                try:
+                    item = BatchItem(index, config if isinstance(config, DocTaskConfig) else DocTaskConfig(**config))
+                except Exception as e:
+                    item = BatchItem(index, None, raw_config=config)
+                    item.error = f"{type(e).__name__}: {e}"
+                    item.failed_stage = "config"
+                inboxes[0].put(item)
+        except Exception as e:
+            # The config source itself broke (e.g. unreadable JSONL): drain what is in flight, then raise
+            feed_errors.append(e)
+        finally:
+            for _ in range(download_concurrency):
+                inboxes[0].put(_DONE)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        yield item.to_result()
+    feeder.join()
+    if feed_errors:
+        raise feed_errors[0]
+
+
+def run_batch(configs: Iterable[Union[DocTaskConfig, Dict[str, Any]]], output: Optional[TextIO] = None, **options) -> Dict[str, int]:
+    """Run iter_batch and write each result to output as a JSON line. Returns ok/error counts."""
+    output = output or sys.stdout
+    counts = {"ok": 0, "error": 0}
+    for result in iter_batch(configs, **options):
+        counts[result["status"]] += 1
+        output.write(json.dumps(result, default=str) + "\n")
+        output.flush()
+    return counts
+
+
+def load_configs(path: str) -> Iterator[Dict[str, Any]]:
+    """Read DocTaskConfig dicts from a JSONL file (or a JSON array), lazily for JSONL."""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == "[":
+            yield from json.loads(first + f.read())
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -6,11 +6,18 @@ import argparse
 import sys
 import os
 from pathlib import Path
-from .core import PDFParserAgent
 
 
-def main():
+def main(argv=None):
     """Main CLI entry point."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["batch"]:
+        return batch_main(argv[1:])
+    if argv[:1] == ["serve"]:
+        return serve_main(argv[1:])
+    if argv[:1] == ["corpus"]:
+        return corpus_main(argv[1:])
+    
     parser = argparse.ArgumentParser(
         description="PDF Parser Agent - A next-generation PDF reader fully orchestrated by AI Agents",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -19,12 +26,22 @@ Examples:
   pdfparser-agent document.pdf "What is the main topic of this document?"
   pdfparser-agent document.pdf "Show me page 5"
   pdfparser-agent document.pdf "Search for 'climate change' in the document"
+  pdfparser-agent document.pdf --search "climate change"
+  pdfparser-agent --document-id 66f0c0ffee0ddba11c0ffee0 --lines 120-160
+  pdfparser-agent batch tasks.jsonl -o results.jsonl
+  pdfparser-agent serve --port 8765 report.pdf
+  pdfparser-agent corpus add reports/*.pdf
+  pdfparser-agent corpus search "carbon budget" --documents "2023-*.pdf"
+
+--page, --search and --lines never build the agent: the PDF is looked up by content hash (and only
+ingested if it is new), or --document-id names an ingested document directly.
         """
     )
     
     parser.add_argument(
         "pdf_path",
-        help="Path to the PDF file to analyze"
+        nargs="?",
+        help="Path to the PDF file to analyze (optional with --document-id)"
     )
     
     parser.add_argument(
@@ -45,25 +62,68 @@ Examples:
         help="Get a specific page number"
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        "--search",
+        metavar="TERM",
+        help="List every line matching TERM, or with --match N render the page of the Nth match"
+    )
+    
+    parser.add_argument(
+        "--match",
+        type=int,
+        help="With --search, render the page of this match (1-based)"
+    )
+    
+    parser.add_argument("--case-sensitive", action="store_true", help="With --search, match case")
+    parser.add_argument("--whole-word", action="store_true", help="With --search, match whole words only")
+    
+    parser.add_argument(
+        "--lines",
+        type=_line_span,
+        metavar="A-B",
+        help="Print lines A to B (global line numbers)"
+    )
+    
+    parser.add_argument(
+        "--document-id",
+        help="Use this already ingested document instead of looking the PDF up by hash"
+    )
+    
+    parser.add_argument(
+        "--no-answer-cache",
+        action="store_true",
+        help="Always run the agent instead of returning a cached answer to the same query"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to extract pages during ingestion (default: 1)"
+    )
+    
+    args = parser.parse_args(argv)
+    
+    if args.page is not None or args.search is not None or args.lines is not None:
+        return lookup_main(args)
+    if args.pdf_path is None:
+        parser.error("pdf_path is required unless --page, --search or --lines is used with --document-id")
     
     # Check if PDF file exists
     if not os.path.exists(args.pdf_path):
         print(f"Error: PDF file '{args.pdf_path}' not found.")
         sys.exit(1)
     
+    # Imported only once arguments are valid, so --help and usage errors stay instant
+    from .core import PDFParserAgent
+
     try:
         # Initialize the agent
-        agent = PDFParserAgent(args.pdf_path, model_name=args.model)
-        
-        # If page is specified, get that page
-        if args.page:
-            print(agent.get_page(args.page))
-            return
+        agent = PDFParserAgent(args.pdf_path, model_name=args.model, workers=args.workers)
         
         # If query is provided, run it
         if args.query:
-            result = agent.query(args.query)
+            result = agent.query(args.query, use_cache=not args.no_answer_cache)
             print(result)
             return
         
@@ -85,7 +145,7 @@ Examples:
                 elif not query:
                     continue
                 
-                result = agent.query(query)
+                result = agent.query(query, use_cache=not args.no_answer_cache)
                 print("\nResult:")
                 print(result)
                 print("-" * 50)
@@ -101,6 +161,233 @@ Examples:
         sys.exit(1)
 
 
+def _line_span(value):
+    """Parse "A-B" (or a single "A") into an inclusive (start, end) line span."""
+    start, _, end = value.partition("-")
+    try:
+        span = (int(start), int(end or start))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected A-B, got {value!r}")
+    if span[0] < 1 or span[1] < span[0]:
+        raise argparse.ArgumentTypeError(f"invalid line span {value!r}")
+    return span
+
+
+def _open_document(args):
+    """The document id to read from: --document-id as given, or the PDF looked up (or ingested once) by hash."""
+    from .db import get_document
+    if args.document_id:
+        record = get_document(args.document_id)
+        if record is None:
+            print(f"Error: document '{args.document_id}' not found.")
+            sys.exit(1)
+        if record.get("status", "ready") != "ready":
+            print(f"Error: document '{args.document_id}' is {record['status']}.")
+            sys.exit(1)
+        return args.document_id
+    if args.pdf_path is None:
+        print("Error: give a PDF path or --document-id.")
+        sys.exit(1)
+    if not os.path.exists(args.pdf_path):
+        print(f"Error: PDF file '{args.pdf_path}' not found.")
+        sys.exit(1)
+    from .core import PDFDocument
+    return PDFDocument(args.pdf_path, workers=args.workers).document_id
+
+
+def lookup_main(args):
+    """--page / --search / --lines: read an ingested document directly, without building the agent."""
+    from . import db, tools
+    from .db import get_line_range, get_line_ranges
+    
+    if args.search is None:
+        # A one-off page or line read: a few indexed queries beat loading the whole document into the line cache
+        db.LINE_CACHE_DOCUMENTS = 0
+    try:
+        document_id = _open_document(args)
+    except Exception as e:
+        print(f"Error opening document: {e}")
+        sys.exit(1)
+    user_id = "cli"
+    
+    if args.page is not None:
+        print(tools.render_page_markdown(document_id, user_id, args.page, max_chars=0))
+    if args.lines is not None:
+        start, end = args.lines
+        print(tools._render_lines(f"Lines {start}-{end}", get_line_range(document_id, start, end), max_chars=0))
+    if args.search is not None:
+        if args.match is not None:
+            print(tools.next_search_match(document_id, user_id, args.search, args.match, args.case_sensitive, args.whole_word))
+            return
+        matches = tools._find_matches(document_id, args.search, args.case_sensitive, args.whole_word)
+        text = {l["global_line_number"]: l["text"] for l in get_line_ranges(document_id, [(g, g) for _, g in matches])}
+        for page_num, global_line in matches:
+            print(f"{page_num}:{global_line}: {text.get(global_line, '')}")
+        if not matches:
+            sys.exit(1)
+
+
+def batch_main(argv):
+    """Entry point of `pdfparser-agent batch`: run doc_task over a file of DocTaskConfig objects."""
+    from .batch import load_configs, run_batch
+    
+    parser = argparse.ArgumentParser(
+        prog="pdfparser-agent batch",
+        description="Run doc_task over many PDFs with pipelined download, ingestion and agent stages"
+    )
+    parser.add_argument(
+        "configs",
+        help="JSONL file (or JSON array) of DocTaskConfig objects"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write JSONL results here instead of stdout"
+    )
+    parser.add_argument("--download-concurrency", type=int, default=4, help="Parallel downloads (default: 4)")
+    parser.add_argument("--ingest-concurrency", type=int, default=2, help="Parallel ingestions (default: 2)")
+    parser.add_argument("--agent-concurrency", type=int, default=4, help="Parallel agent runs (default: 4)")
+    parser.add_argument("--workers", type=int, default=1, help="Extraction processes per ingestion (default: 1)")
+    args = parser.parse_args(argv)
+    
+    if not os.path.exists(args.configs):
+        print(f"Error: config file '{args.configs}' not found.")
+        sys.exit(1)
+    
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        counts = run_batch(
+            load_configs(args.configs),
+            output,
+            download_concurrency=args.download_concurrency,
+            ingest_concurrency=args.ingest_concurrency,
+            agent_concurrency=args.agent_concurrency,
+            ingest_workers=args.workers,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Batch finished: {counts['ok']} ok, {counts['error']} failed", file=sys.stderr)
+    if counts["error"]:
+        sys.exit(2)
+
+
+def serve_main(argv):
+    """Entry point of `pdfparser-agent serve`: answer queries over HTTP from a pool of warm agents."""
+    from .server import SERVE_CONCURRENCY, SERVE_HOST, SERVE_MAX_AGENTS, SERVE_PORT, SERVE_QUEUE, SERVE_TIMEOUT
+    
+    parser = argparse.ArgumentParser(
+        prog="pdfparser-agent serve",
+        description="Serve queries over HTTP (POST /query, POST /documents, GET /health) with warm agents and documents"
+    )
+    parser.add_argument("pdf_paths", nargs="*", help="PDFs to ingest and warm up before accepting requests")
+    parser.add_argument("--host", default=SERVE_HOST, help=f"Address to bind (default: {SERVE_HOST})")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help=f"Port to bind (default: {SERVE_PORT})")
+    parser.add_argument("--model", default="ollama:llama3.2", help="Model of requests that name none (default: ollama:llama3.2)")
+    parser.add_argument("--llm", metavar="MODULE:CALLABLE", help="Chat model factory, called with the model name (e.g. a fake model for testing)")
+    parser.add_argument("--concurrency", type=int, default=SERVE_CONCURRENCY, help=f"Queries run at once (default: {SERVE_CONCURRENCY})")
+    parser.add_argument("--queue", type=int, default=SERVE_QUEUE, help=f"Queries waiting for a slot before new ones get 503 (default: {SERVE_QUEUE})")
+    parser.add_argument("--timeout", type=float, default=SERVE_TIMEOUT, help=f"Default per-query deadline in seconds (default: {SERVE_TIMEOUT:g})")
+    parser.add_argument("--max-agents", type=int, default=SERVE_MAX_AGENTS, help=f"Warm agents kept (default: {SERVE_MAX_AGENTS})")
+    parser.add_argument("--workers", type=int, default=1, help="Extraction processes per ingestion (default: 1)")
+    args = parser.parse_args(argv)
+    
+    for pdf_path in args.pdf_paths:
+        if not os.path.exists(pdf_path):
+            print(f"Error: PDF file '{pdf_path}' not found.")
+            sys.exit(1)
+    
+    from .server import load_llm_factory, make_server
+    try:
+        llm_factory = load_llm_factory(args.llm) if args.llm else None
+    except (ImportError, AttributeError, ValueError) as e:
+        print(f"Error: cannot load --llm {args.llm}: {e}")
+        sys.exit(1)
+    server = make_server(
+        args.host, args.port, args.model, llm_factory,
+        concurrency=args.concurrency, queue_size=args.queue, timeout=args.timeout,
+        max_agents=args.max_agents, workers=args.workers,
+    )
+    for pdf_path in args.pdf_paths:
+        server.service.pool.get(pdf_path, args.model)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def corpus_main(argv):
+    """Entry point of `pdfparser-agent corpus`: maintain, search and query a multi-document corpus."""
+    from .corpus import CORPUS_SHARDS, CORPUS_WORKERS
+    
+    parser = argparse.ArgumentParser(
+        prog="pdfparser-agent corpus",
+        description="Add PDFs to a named corpus with a sharded full-text index, then search or query across them"
+    )
+    parser.add_argument("--name", default="default", help="Corpus name (default: default)")
+    parser.add_argument("--shards", type=int, help=f"Shards of a new corpus (default: {CORPUS_SHARDS})")
+    parser.add_argument("--workers", type=int, default=CORPUS_WORKERS, help=f"Processes searching the shards, 0 for none (default: {CORPUS_WORKERS})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Ingest PDFs, or update ones added before whose file changed")
+    add.add_argument("pdf_paths", nargs="+")
+    add.add_argument("--ingest-workers", type=int, default=1, help="Extraction processes per ingestion (default: 1)")
+    remove = commands.add_parser("remove", help="Drop documents from the corpus")
+    remove.add_argument("documents", nargs="+", help="Document ids or file name patterns")
+    listing = commands.add_parser("list", help="List the documents")
+    listing.add_argument("documents", nargs="*", help="Document ids or file name patterns (default: all)")
+    search = commands.add_parser("search", help="Rank pages across documents")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=10, help="Hits to show (default: 10)")
+    search.add_argument("--documents", nargs="+", metavar="SELECTOR", help="Only search these document ids or file name patterns")
+    query = commands.add_parser("query", help="Ask the corpus agent")
+    query.add_argument("query")
+    query.add_argument("--model", default="ollama:llama3.2", help="Model to use for the agent (default: ollama:llama3.2)")
+    query.add_argument("--no-answer-cache", action="store_true", help="Always run the agent")
+    args = parser.parse_args(argv)
+    
+    from .corpus import Corpus, CorpusAgent
+    try:
+        corpus = Corpus(args.name, shards=args.shards, workers=args.workers,
+                        ingest_workers=getattr(args, "ingest_workers", 1))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    with corpus:
+        if args.command == "add":
+            failed = 0
+            for pdf_path in args.pdf_paths:
+                if not os.path.exists(pdf_path):
+                    print(f"Error: PDF file '{pdf_path}' not found.")
+                    failed += 1
+                    continue
+                try:
+                    entry = corpus.add(pdf_path)
+                except Exception as e:
+                    print(f"Error adding '{pdf_path}': {e}")
+                    failed += 1
+                    continue
+                print(f"{entry['status']:<9} {entry['file']} ({entry['document_id']}): {entry['page_count']} pages, {entry['pages_indexed']} indexed")
+            if failed:
+                sys.exit(2)
+        elif args.command == "remove":
+            removed = corpus.remove(args.documents)
+            print(f"Removed {len(removed)} files")
+        elif args.command == "list":
+            for entry in corpus.documents(args.documents or None):
+                print(f"{entry['document_id']}\t{entry['page_count']}\t{entry['path']}")
+        elif args.command == "search":
+            hits = corpus.search(args.query, k=args.k, documents=args.documents)
+            for hit in hits:
+                print(f"{hit['file']}:{hit['page']}:{hit['line']}: {hit['text']}")
+            if not hits:
+                sys.exit(1)
+        else:
+            print(CorpusAgent(corpus, model_name=args.model).query(args.query, use_cache=not args.no_answer_cache))
+
+
 def print_help():
     """Print help information for interactive mode."""
     help_text = """
@@ -3,66 +3,412 @@ Core classes for PDF parsing and agent functionality.
 """
 
 import os
-import PyPDF2
+import asyncio
+import difflib
+import threading
+import time
+from datetime import datetime
 from typing import List, Optional, Tuple, Dict, Any
-from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from pdfparser_agent.processing.pdf_processing import load_pdf_with_budget, ProcessBudget
-from pdfparser_agent.db import insert_document_metadata, insert_document_lines
+from pdfparser_agent.processing.pdf_processing import (
+    ProcessBudget,
+    _count_pages,
+    extract_pages_with_budget,
+    hash_pdf,
+    iter_pdf_with_budget,
+    page_fingerprints,
+)
+from pdfparser_agent import async_db
+from pdfparser_agent.instrumentation import instrumented, record_query
+from pdfparser_agent.answer_cache import answer_key, cached_answer, acached_answer, model_key
+from pdfparser_agent.pdfidx import PDFIndex, PDFIndexWriter, index_path, open_index, record_index_path, remove_index
+from pdfparser_agent.sessions import forget_document
+from pdfparser_agent.db import (
+    INGEST_LEASE,
+    IngestLeaseLost,
+    insert_document_metadata,
+    insert_document_lines,
+    insert_document_terms,
+    update_document_progress,
+    update_document,
+    replace_document_pages,
+    claim_document,
+    renew_ingest_lease,
+    find_document_ids,
+    get_document,
+    wait_for_document,
+    invalidate_document,
+    invalidate_line_cache,
+)
+
+
+AGENT_PROMPT = (
+    "You are a PDF parser agent. Your job is to scan through the PDF and provide output strictly based on the user's instructions. "
+    "Use the available tools to navigate and extract content from the PDF; read consecutive pages or line spans with one read_range call "
+    "rather than one goto per page. Use memory to store important information for later use. "
+    "Do not provide the user with anything except the PDF content in the required markdown format."
+)
+
+
+# Chat model agents run on when none is given
+DEFAULT_LLM = {"type": "ChatGoogleGenerativeAI", "model": "gemini-2.5-pro", "temperature": 1.0}
+
+
+def _create_llm():
+    # Imported on first use: the agent stack takes seconds to import and most entry points never need it
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=DEFAULT_LLM["model"],
+        temperature=DEFAULT_LLM["temperature"],
+        max_retries=2,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        tool_call = True
+        )
+
+
+def _llm_key(model_name: str, llm=None) -> str:
+    """The model part of an answer cache key for an agent on llm (None: the default chat model)."""
+    return model_key(model_name, DEFAULT_LLM if llm is None else llm)
+
+
+def _answer_key(content_hash: str, processing_type: str, query: str, model: str, system_prompt: str = AGENT_PROMPT) -> str:
+    """
+    Answer cache key of query against the text a budget extracts from the file with content_hash; model
+    comes from _llm_key (or model_key), system_prompt is the prompt the agent runs with.
+    """
+    return answer_key(f"{content_hash}:{processing_type}", query, model, system_prompt)
+
+
+def _line_record(line: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an extracted line onto its document_lines fields."""
+    return {
+        "page_number": line.get("page_num"),
+        "line_num_on_page": line.get("line_num_on_page"),
+        "global_line_number": line.get("global_line_num"),
+        "text": line.get("text")
+    }
+
+
+def _page_runs(pages: List[int]) -> List[Tuple[int, int]]:
+    """Sorted page numbers as (first_page, last_page) runs of consecutive pages."""
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page - 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+def _line_starts(counts: List[int]) -> List[int]:
+    """Lines before each page, given the line count of every page."""
+    starts, total = [], 0
+    for count in counts:
+        starts.append(total)
+        total += count
+    return starts
+
+
+def _open_index_writer(path: Optional[str]) -> Optional[PDFIndexWriter]:
+    if not path:
+        return None
+    try:
+        return PDFIndexWriter(path)
+    except OSError:
+        # The index file is optional: without it readers load the lines and try to write it themselves
+        return None
 
 
 class PDFDocument:
-    """A class to manage PDF document parsing and navigation."""
-    def __init__(self, file_path: str, budget: ProcessBudget = ProcessBudget.LOW, user_id: str = None):
+    """
+    A class to manage PDF document parsing and navigation.
+
+    Lines are streamed from the extractor and written to MongoDB in batches of roughly batch_size
+    lines, so only one batch is held in memory. pages_ready tracks how many leading pages are already
+    stored; with background=True ingestion runs on a thread and tools can serve those pages early.
+
+    With use_cache=True ingestions are content-addressed: the file's SHA-256 and the budget identify
+    a documents record, and reopening the same file reuses its document_id instead of re-parsing.
+    Concurrent first-opens agree on a single owner that ingests while the others wait for it.
+
+    The owner also streams the lines into a .pdfidx file (see pdfidx.py) that the tools then serve
+    from through mmap instead of holding the lines in memory.
+
+    Every page's fingerprint and line count are stored with the record, so update() can move the
+    document to a new revision of the file by re-extracting only the pages that changed.
+
+    Passing document_id reopens that stored ingestion as it is, without reading file_path (e.g. to
+    update() it after the file changed on disk).
+    """
+    def __init__(self, file_path: str, budget: ProcessBudget = ProcessBudget.LOW, user_id: str = None,
+                 workers: int = 1, batch_size: int = 1000, background: bool = False,
+                 use_cache: bool = True, wait_timeout: float = 600, document_id: str = None):
         self.file_path = file_path
         self.user_id = user_id
         self.document_id = None
         self.processing_type = str(budget)
-        self.processing_result = None
-        self._load_pdf(budget)
+        self.budget = budget
+        self.workers = workers
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.wait_timeout = wait_timeout
+        self.content_hash = None
+        self.status = "loading"
+        self.pages_ready = 0
+        self.error = None
+        # ingest_token of the record while this instance owns its ingestion (see db.claim_document)
+        self._ingest_token = None
+        self._ready = threading.Event()
+        if document_id is not None:
+            record = get_document(document_id)
+            if record is None:
+                raise KeyError(f"Unknown document {document_id}")
+            self.document_id, self.content_hash = document_id, record.get("content_hash")
+            self._mirror(record)
+            self._ready.set()
+        elif background:
+            owner = self._create_record(budget)
+            threading.Thread(target=self._ingest if owner else self._follow, args=(budget,), daemon=True).start()
+        else:
+            self._load_pdf(budget)
 
-    def _load_pdf(self, budget: ProcessBudget = ProcessBudget.LOW):
-        """Load and parse the PDF file using the selected processing method based on budget, and store in MongoDB."""
-        # Store metadata and get document_id
-        self.document_id = insert_document_metadata(
+    def _create_record(self, budget: ProcessBudget) -> bool:
+        """Store metadata and get document_id. Returns True when this instance has to ingest the lines."""
+        if not self.use_cache:
+            self.document_id = insert_document_metadata(
+                document_path=self.file_path,
+                processing_type=str(budget),
+                user_id=self.user_id or "anonymous"
+            )
+            return True
+        if self.content_hash is None:
+            self.content_hash = hash_pdf(self.file_path)
+        record, owner = claim_document(
             document_path=self.file_path,
             processing_type=str(budget),
-            user_id=self.user_id or "anonymous"
+            user_id=self.user_id or "anonymous",
+            content_hash=self.content_hash
         )
-        # Process PDF
-        processing_result = load_pdf_with_budget(self.file_path, budget)
-        self.processing_result = processing_result
-        # Store processed lines in MongoDB if structured (list of dicts)
-        if isinstance(processing_result, list) and processing_result and isinstance(processing_result[0], dict):
-            insert_document_lines(self.document_id, [
-                {
-                    "page_number": l.get("page_num"),
-                    "line_num_on_page": l.get("line_num_on_page"),
-                    "global_line_number": l.get("global_line_num"),
-                    "text": l.get("text")
-                } for l in processing_result
-            ])
+        self.document_id = record["_id"]
+        if owner:
+            self._ingest_token = record["ingest_token"]
+        else:
+            self._mirror(record)
+        return owner
 
+    @instrumented("ingest")
+    def _load_pdf(self, budget: ProcessBudget = ProcessBudget.LOW):
+        """Load and parse the PDF file using the selected processing method based on budget, and store in MongoDB."""
+        if self._create_record(budget):
+            self._ingest(budget)
+        else:
+            self._follow(budget)
+        if self.error is not None:
+            raise self.error
 
+    def _mirror(self, record: Dict[str, Any]):
+        self.status = record.get("status", "ready")
+        self.pages_ready = record.get("pages_ready", 0)
+
+    def _follow(self, budget: ProcessBudget):
+        """Reuse another open's ingestion of the same file, mirroring its progress until it is ready."""
+        try:
+            while True:
+                record = wait_for_document(self.document_id, timeout=self.wait_timeout, on_progress=self._mirror)
+                if record is not None:
+                    self._mirror(record)
+                    return
+                # The owner failed and dropped its record: claim again, possibly becoming the owner
+                if self._create_record(budget):
+                    return self._ingest(budget)
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+        finally:
+            self._ready.set()
+
+    def _ingest(self, budget: ProcessBudget):
+        """Stream pages from the extractor into document_lines, flushing one batch at a time."""
+        batch = []
+        page_num = 0
+        line_count = 0
+        page_line_counts = []
+        index_writer = _open_index_writer(index_path(self.content_hash, self.processing_type))
+        try:
+            page_hashes = page_fingerprints(self.file_path)
+            for page_num, page_lines in enumerate(iter_pdf_with_budget(self.file_path, budget, workers=self.workers, content_hash=self.content_hash), 1):
+                records = [_line_record(l) for l in page_lines]
+                batch.extend(records)
+                if index_writer:
+                    index_writer.add_page(records)
+                line_count += len(page_lines)
+                page_line_counts.append(len(page_lines))
+                # Batches only ever hold whole pages, so a flush completes every page up to page_num
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, page_num)
+                    batch = []
+            if index_writer:
+                # Complete before the record turns ready, so no reader falls back to loading the lines
+                try:
+                    index_writer.close(page_num)
+                except OSError:
+                    pass
+                index_writer = None
+            self._flush(batch, page_num, status="ready", page_count=page_num, line_count=line_count,
+                        page_hashes=page_hashes, page_line_counts=page_line_counts)
+        except Exception as e:
+            if index_writer:
+                index_writer.abort()
+            self.error = e
+            self.status = "failed"
+            if isinstance(e, IngestLeaseLost):
+                # The record and its lines belong to the open that took over
+                pass
+            elif self.content_hash:
+                # Never leave a half-ingested entry in the cache
+                invalidate_document(self.document_id)
+            else:
+                update_document_progress(self.document_id, self.pages_ready, status="failed")
+        finally:
+            self._ready.set()
+
+    def _flush(self, batch: List[Dict[str, Any]], pages_ready: int, status: str = "loading", **stats):
+        if self._ingest_token:
+            # Heartbeat: a record whose owner stops flushing is taken over once the lease expires
+            renew_ingest_lease(self.document_id, self._ingest_token)
+        insert_document_lines(self.document_id, batch)
+        insert_document_terms(self.document_id, batch)
+        update_document_progress(self.document_id, pages_ready, status=status, **stats)
+        self.pages_ready = pages_ready
+        self.status = status
+
+    @property
+    def is_loading(self) -> bool:
+        return self.status == "loading"
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until ingestion finished (or failed). Returns False if the timeout expired first."""
+        return self._ready.wait(timeout)
+
+    @property
+    def index(self) -> Optional[PDFIndex]:
+        """The memory-mapped index of this document once it is ready, or None without an index file."""
+        if self.status != "ready":
+            return None
+        return open_index(index_path(self.content_hash, self.processing_type))
+
+    def invalidate(self):
+        """Drop this ingestion from the cache so the next open of the same file re-parses it."""
+        invalidate_document(self.document_id)
+
+    @instrumented("ingest")
+    def update(self, file_path: str) -> Dict[str, Any]:
+        """
+        Move this document to a new revision of its file, re-extracting only the pages whose fingerprint
+        changed. Lines of unchanged pages stay in storage and are only renumbered, and the record takes
+        the new content hash (the old revision is no longer cached). Documents ingested without page
+        fingerprints have every page re-extracted. If the new revision is already ingested, this
+        document switches to that ingestion instead. Returns the revision entry added to the record.
+
+        Assumes one writer per document: concurrent updates of the same document are not coordinated.
+        """
+        record = get_document(self.document_id)
+        if record is None or record.get("status") != "ready":
+            raise RuntimeError(f"Document {self.document_id} is not ready to be updated")
+        content_hash = hash_pdf(file_path)
+        revision = {"content_hash": content_hash, "updated_at": datetime.utcnow(),
+                    "pages_kept": 0, "pages_extracted": 0, "pages_removed": 0}
+        if content_hash == record.get("content_hash"):
+            self.file_path = file_path
+            revision["pages_kept"] = record.get("page_count", 0)
+            return revision
+        if record.get("content_hash") and find_document_ids(content_hash, self.processing_type):
+            self.file_path, self.content_hash = file_path, content_hash
+            self._load_pdf(self.budget)
+            return revision
+
+        old_count = record.get("page_count", 0)
+        old_hashes, old_counts = record.get("page_hashes"), record.get("page_line_counts")
+        new_hashes = page_fingerprints(file_path)
+        new_count = len(new_hashes) if new_hashes is not None else _count_pages(file_path)
+        if not old_hashes or not old_counts or len(old_hashes) != old_count or len(old_counts) != old_count:
+            # Pages without a fingerprint never match
+            old_hashes = [object() for _ in range(old_count)]
+        matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes or [object() for _ in range(new_count)], autojunk=False)
+        # (old index, new index, length) of each block of unchanged pages, 0-based
+        kept = [block for block in matcher.get_matching_blocks() if block[2]]
+        kept_old = {i + k for i, _, n in kept for k in range(n)}
+        kept_new = {j + k for _, j, n in kept for k in range(n)}
+        changed = [page for page in range(1, new_count + 1) if page - 1 not in kept_new]
+        removed = _page_runs([page for page in range(1, old_count + 1) if page - 1 not in kept_old])
+        extracted = extract_pages_with_budget(file_path, self.budget, changed, self.workers, content_hash) if changed else {}
+
+        new_counts = [0] * new_count
+        for i, j, n in kept:
+            new_counts[j:j + n] = old_counts[i:i + n]
+        for page in changed:
+            new_counts[page - 1] = len(extracted.get(page, []))
+        old_starts, new_starts = _line_starts(old_counts or []), _line_starts(new_counts)
+        moves = [
+            (i + 1, i + n, j - i, new_starts[j] - old_starts[i])
+            for i, j, n in kept if j != i or new_starts[j] != old_starts[i]
+        ]
+        lines = [
+            {"page_number": page, "line_num_on_page": k, "global_line_number": new_starts[page - 1] + k, "text": text}
+            for page in changed for k, text in enumerate(extracted.get(page, []), 1)
+        ]
+        # Leading pages that neither change nor move stay readable while the rows are rewritten
+        stable = kept[0][2] if kept and kept[0][:2] == (0, 0) else 0
+        revision.update(pages_kept=len(kept_new), pages_extracted=len(changed), pages_removed=old_count - len(kept_old))
+
+        # A new revision makes every process drop its cached lines of this document (see db.get_cached_document)
+        fields = {"document_path": file_path, "status": "loading", "pages_ready": stable,
+                  "revision": record.get("revision", 0) + 1, "lease_expires": time.time() + INGEST_LEASE}
+        if record.get("content_hash"):
+            fields["content_hash"] = content_hash
+        try:
+            update_document(self.document_id, fields)
+            self.file_path, self.status, self.pages_ready = file_path, "loading", stable
+            if record.get("content_hash"):
+                self.content_hash = content_hash
+            remove_index(record_index_path(record))
+            replace_document_pages(self.document_id, removed, moves, lines)
+            update_document(self.document_id, {
+                "status": "ready", "pages_ready": new_count, "page_count": new_count, "line_count": sum(new_counts),
+                "page_hashes": new_hashes, "page_line_counts": new_counts,
+                "revisions": record.get("revisions", []) + [revision],
+            })
+        except Exception:
+            self.status = "failed"
+            if record.get("content_hash"):
+                # Never leave a half-updated entry in the cache
+                invalidate_document(self.document_id)
+            raise
+        self.status, self.pages_ready = "ready", new_count
+        invalidate_line_cache(self.document_id)
+        forget_document(self.document_id)
+        return revision
 
 
 class PDFParserAgent:
     """A class to manage the PDF parsing agent with tools."""
     
-    def __init__(self, pdf_path: str, model_name: str = "ollama:llama3.2"):
+    def __init__(self, pdf_path: str, model_name: str = "ollama:llama3.2", workers: int = 1, llm=None):
         """
         Initialize the PDF parser agent.
         
         Args:
             pdf_path: Path to the PDF file
             model_name: Name of the model to use for the agent
+            workers: Number of processes used to extract pages during ingestion
+            llm: Chat model to run the agent on instead of the default one (e.g. a fake model in tests)
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
-        self.pdf_doc = PDFDocument(pdf_path)
+        self.pdf_doc = PDFDocument(pdf_path, workers=workers)
         self.model_name = model_name
+        self.llm = llm
         self.agent = self._create_agent()
     
     def _create_agent(self):
@@ -70,6 +416,7 @@ class PDFParserAgent:
         from .tools import (
             next_search_match,
             goto,
+            read_range,
             scroll_up,
             scroll_down,
             clip_memory,
@@ -80,39 +427,38 @@ class PDFParserAgent:
         global_tools = [
             make_tool_with_doc(next_search_match, self.pdf_doc),
             make_tool_with_doc(goto, self.pdf_doc),
+            make_tool_with_doc(read_range, self.pdf_doc),
             make_tool_with_doc(scroll_up, self.pdf_doc),
             make_tool_with_doc(scroll_down, self.pdf_doc),
             make_tool_with_doc(clip_memory, self.pdf_doc),
             make_tool_with_doc(use_memory, self.pdf_doc),
         ]
-        llm = ChatGoogleGenerativeAI(
-            model= "gemini-2.5-pro",
-            temperature=1.0,
-            max_retries=2,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            tool_call = True
-            )
+        from langgraph.prebuilt import create_react_agent
         return create_react_agent(
-            model=llm,
+            model=self.llm if self.llm is not None else _create_llm(),
             tools=global_tools,
-            prompt=(
-                "You are a PDF parser agent. Your job is to scan through the PDF and provide output strictly based on the user's instructions. "
-                "Use the available tools to navigate and extract content from the PDF. Use memory to store important information for later use. "
-                "Do not provide the user with anything except the PDF content in the required markdown format."
-            )
+            prompt=AGENT_PROMPT
         )
     
-    def query(self, query: str) -> Dict[str, Any]:
+    def query(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Query the PDF using the agent.
         
         Args:
             query: The query to process
+            use_cache: Serve a cached answer to the same query, model and document (see answer_cache.py)
             
         Returns:
             The agent's response
         """
-        return self.agent.invoke({"messages": [{"role": "user", "content": query}]})
+        with record_query("query", model=self.model_name):
+            if self.pdf_doc.content_hash is None:
+                self.pdf_doc.content_hash = hash_pdf(self.pdf_doc.file_path)
+            return cached_answer(
+                _answer_key(self.pdf_doc.content_hash, self.pdf_doc.processing_type, query, _llm_key(self.model_name, self.llm)),
+                lambda: self.agent.invoke({"messages": [{"role": "user", "content": query}]}),
+                use_cache,
+            )
     
     def get_page(self, page_num: int) -> str:
         """
@@ -125,7 +471,237 @@ class PDFParserAgent:
             The page content in markdown format
         """
         from .tools import render_page_markdown
-        return render_page_markdown(self.pdf_doc, self.pdf_doc.user_id, page_num)
+        with record_query("get_page"):
+            return render_page_markdown(self.pdf_doc, self.pdf_doc.user_id, page_num, max_chars=0)
+
+    def update(self, pdf_path: str) -> Dict[str, Any]:
+        """Move the agent's document to a new revision of the PDF, re-extracting only changed pages (see PDFDocument.update)."""
+        return self.pdf_doc.update(pdf_path)
+
+class AsyncPDFDocument:
+    """
+    asyncio counterpart of PDFDocument; create it with `await AsyncPDFDocument.create(...)`.
+
+    Hashing and extraction run on the default executor one page at a time, and batches are written
+    through async_db, so ingestion never blocks the event loop. Caching, progress tracking and
+    background loading behave exactly like PDFDocument.
+    """
+    def __init__(self, file_path: str, budget: ProcessBudget = ProcessBudget.LOW, user_id: str = None,
+                 workers: int = 1, batch_size: int = 1000, use_cache: bool = True, wait_timeout: float = 600):
+        self.file_path = file_path
+        self.user_id = user_id
+        self.document_id = None
+        self.processing_type = str(budget)
+        self.budget = budget
+        self.workers = workers
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.wait_timeout = wait_timeout
+        self.content_hash = None
+        self.status = "loading"
+        self.pages_ready = 0
+        self.error = None
+        self._ingest_token = None
+        self._task = None
+
+    @classmethod
+    async def create(cls, file_path: str, budget: ProcessBudget = ProcessBudget.LOW, background: bool = False, **kwargs) -> "AsyncPDFDocument":
+        doc = cls(file_path, budget, **kwargs)
+        owner = await doc._create_record()
+        doc._task = asyncio.ensure_future(doc._ingest() if owner else doc._follow())
+        if not background:
+            await doc._task
+            if doc.error is not None:
+                raise doc.error
+        return doc
+
+    async def _create_record(self) -> bool:
+        if not self.use_cache:
+            self.document_id = await async_db.insert_document_metadata(
+                document_path=self.file_path,
+                processing_type=self.processing_type,
+                user_id=self.user_id or "anonymous"
+            )
+            return True
+        if self.content_hash is None:
+            self.content_hash = await asyncio.get_running_loop().run_in_executor(None, hash_pdf, self.file_path)
+        record, owner = await async_db.claim_document(
+            document_path=self.file_path,
+            processing_type=self.processing_type,
+            user_id=self.user_id or "anonymous",
+            content_hash=self.content_hash
+        )
+        self.document_id = record["_id"]
+        if owner:
+            self._ingest_token = record["ingest_token"]
+        else:
+            self._mirror(record)
+        return owner
+
+    def _mirror(self, record: Dict[str, Any]):
+        self.status = record.get("status", "ready")
+        self.pages_ready = record.get("pages_ready", 0)
+
+    async def _follow(self):
+        try:
+            while True:
+                record = await async_db.wait_for_document(self.document_id, timeout=self.wait_timeout, on_progress=self._mirror)
+                if record is not None:
+                    self._mirror(record)
+                    return
+                if await self._create_record():
+                    return await self._ingest()
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+
+    async def _ingest(self):
+        loop = asyncio.get_running_loop()
+        pages = iter_pdf_with_budget(self.file_path, self.budget, workers=self.workers, content_hash=self.content_hash)
+        batch = []
+        page_num = 0
+        line_count = 0
+        page_line_counts = []
+        index_writer = _open_index_writer(index_path(self.content_hash, self.processing_type))
+        try:
+            page_hashes = await loop.run_in_executor(None, page_fingerprints, self.file_path)
+            while True:
+                page_lines = await loop.run_in_executor(None, next, pages, None)
+                if page_lines is None:
+                    break
+                page_num += 1
+                records = [_line_record(l) for l in page_lines]
+                batch.extend(records)
+                if index_writer:
+                    index_writer.add_page(records)
+                line_count += len(page_lines)
+                page_line_counts.append(len(page_lines))
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch, page_num)
+                    batch = []
+            if index_writer:
+                # Complete before the record turns ready, as in PDFDocument._ingest
+                try:
+                    await loop.run_in_executor(None, index_writer.close, page_num)
+                except OSError:
+                    pass
+                index_writer = None
+            await self._flush(batch, page_num, status="ready", page_count=page_num, line_count=line_count,
+                              page_hashes=page_hashes, page_line_counts=page_line_counts)
+        except Exception as e:
+            if index_writer:
+                index_writer.abort()
+            self.error = e
+            self.status = "failed"
+            if isinstance(e, IngestLeaseLost):
+                pass
+            elif self.content_hash:
+                await async_db.invalidate_document(self.document_id)
+            else:
+                await async_db.update_document_progress(self.document_id, self.pages_ready, status="failed")
+
+    async def _flush(self, batch: List[Dict[str, Any]], pages_ready: int, status: str = "loading", **stats):
+        if self._ingest_token:
+            await async_db.renew_ingest_lease(self.document_id, self._ingest_token)
+        await async_db.insert_document_lines(self.document_id, batch)
+        await async_db.insert_document_terms(self.document_id, batch)
+        await async_db.update_document_progress(self.document_id, pages_ready, status=status, **stats)
+        self.pages_ready = pages_ready
+        self.status = status
+
+    @property
+    def is_loading(self) -> bool:
+        return self.status == "loading"
+
+    async def wait_until_ready(self):
+        """Wait until ingestion finished (or failed)."""
+        await asyncio.shield(self._task)
+
+    async def invalidate(self):
+        await async_db.invalidate_document(self.document_id)
+
+
+class AsyncPDFParserAgent:
+    """
+    asyncio-native PDF parser agent: async ingestion, async tools and `aquery` via the graph's `ainvoke`.
+    Build it with `await AsyncPDFParserAgent.create(pdf_path)`.
+    """
+
+    def __init__(self, pdf_doc: AsyncPDFDocument, model_name: str = "ollama:llama3.2", llm=None):
+        self.pdf_doc = pdf_doc
+        self.model_name = model_name
+        self.llm = llm
+        self.agent = self._create_agent()
+
+    @classmethod
+    async def create(cls, pdf_path: str, model_name: str = "ollama:llama3.2", workers: int = 1, llm=None) -> "AsyncPDFParserAgent":
+        """
+        Ingest the PDF and build the agent.
+
+        Args:
+            pdf_path: Path to the PDF file
+            model_name: Name of the model to use for the agent
+            workers: Number of processes used to extract pages during ingestion
+            llm: Chat model to run the agent on instead of the default one
+        """
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        return cls(await AsyncPDFDocument.create(pdf_path, workers=workers), model_name, llm)
+
+    def _create_agent(self):
+        """Create the agent with the async versions of the tools."""
+        from .async_tools import (
+            next_search_match,
+            goto,
+            read_range,
+            scroll_up,
+            scroll_down,
+            clip_memory,
+            use_memory,
+            make_tool_with_doc
+        )
+
+        global_tools = [
+            make_tool_with_doc(next_search_match, self.pdf_doc),
+            make_tool_with_doc(goto, self.pdf_doc),
+            make_tool_with_doc(read_range, self.pdf_doc),
+            make_tool_with_doc(scroll_up, self.pdf_doc),
+            make_tool_with_doc(scroll_down, self.pdf_doc),
+            make_tool_with_doc(clip_memory, self.pdf_doc),
+            make_tool_with_doc(use_memory, self.pdf_doc),
+        ]
+        from langgraph.prebuilt import create_react_agent
+        return create_react_agent(
+            model=self.llm if self.llm is not None else _create_llm(),
+            tools=global_tools,
+            prompt=AGENT_PROMPT
+        )
+
+    async def aquery(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Query the PDF using the agent without blocking the event loop.
+
+        Args:
+            query: The query to process
+            use_cache: Serve a cached answer to the same query, model and document (see answer_cache.py)
+
+        Returns:
+            The agent's response
+        """
+        with record_query("query", model=self.model_name):
+            if self.pdf_doc.content_hash is None:
+                self.pdf_doc.content_hash = await asyncio.get_running_loop().run_in_executor(None, hash_pdf, self.pdf_doc.file_path)
+            return await acached_answer(
+                _answer_key(self.pdf_doc.content_hash, self.pdf_doc.processing_type, query, _llm_key(self.model_name, self.llm)),
+                lambda: self.agent.ainvoke({"messages": [{"role": "user", "content": query}]}),
+                use_cache,
+            )
+
+    async def aget_page(self, page_num: int) -> str:
+        """Get a specific page from the PDF in markdown format."""
+        from .async_tools import render_page_markdown
+        with record_query("get_page"):
+            return await render_page_markdown(self.pdf_doc, self.pdf_doc.user_id, page_num, max_chars=0)
 
 if __name__ == "__main__":
     # Example usage
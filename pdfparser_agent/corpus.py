@@ -0,0 +1,545 @@
+"""
+Multi-document corpora: one index and one agent over many ingested PDFs.
+
+A corpus is a directory under CORPUS_DIR holding a manifest (corpus.json: its documents and the
+shard each one lives in) and a fixed number of shard files. A shard is an SQLite database with one
+FTS5 row per page; all pages of a document go to the shard its id hashes to, so adding a document
+writes one shard and leaves the others alone. Adding a file the corpus already holds under the same
+path is a no-op when its content is unchanged, and otherwise updates the stored document in place
+(PDFDocument.update): only changed pages are re-extracted, and only pages whose fingerprint is new
+are re-indexed in the shard.
+
+Searches query every shard at once, from a pool of worker processes (workers=0: in this process),
+in two rounds so that scores are comparable across shards:
+  1. each shard reports its page count, token count and the pages containing each query term
+  2. each shard takes its best candidates by FTS5 rank and rescores them with BM25 on the summed
+     corpus-wide statistics; the per-shard lists are merged into one ranking
+Shards tokenize like search.tokenize (lowercased word characters).
+
+The corpus tools take a document selector: a document id, a file name pattern ("2023-*.pdf") or a
+list of either. CorpusAgent runs them in one react agent over the whole corpus.
+
+Assumes one writer per corpus: concurrent add() calls from several processes are not coordinated.
+"""
+
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .answer_cache import answer_key, cached_answer
+from .instrumentation import instrumented, record_query
+from .processing.pdf_processing import ProcessBudget, hash_pdf
+from .search import tokenize
+
+CORPUS_DIR = os.environ.get("CORPUS_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdfparser-agent", "corpus"))
+CORPUS_SHARDS = int(os.environ.get("CORPUS_SHARDS", "4"))
+CORPUS_WORKERS = int(os.environ.get("CORPUS_WORKERS", str(CORPUS_SHARDS)))
+# Candidates each shard rescores per requested hit
+CANDIDATES_PER_HIT = 5
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 200
+
+Selector = Union[str, Sequence[str], None]
+
+SHARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_rows (
+    id INTEGER PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    first_line INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS page_rows_document ON page_rows (document_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(text, tokenize="unicode61 remove_diacritics 0 tokenchars '_'");
+"""
+
+CORPUS_PROMPT = (
+    "You are a research agent over a corpus of PDF documents. Find relevant pages with corpus_search, list the documents "
+    "with corpus_documents, and read pages with corpus_goto or corpus_read_range, naming the document by its id or file name. "
+    "Answer strictly from the documents' content and cite the file and page of every claim."
+)
+
+
+# --- Shards (these run in worker processes, so they take and return plain values) ---
+_local = threading.local()
+
+
+def _connect_shard(path: str) -> sqlite3.Connection:
+    """This thread's open connection to a shard, kept across calls so a search pays no connection setup."""
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.pid != os.getpid():
+        # A forked worker must not reuse the connections it inherited from its parent
+        connections, _local.pid = {}, os.getpid()
+        _local.connections = connections
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SHARD_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def _match(terms: Sequence[str]) -> str:
+    """FTS5 query matching pages with any of the terms."""
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def shard_stats(path: str, terms: Sequence[str]) -> Tuple[int, int, Dict[str, int]]:
+    """(pages, tokens, {term: pages containing it}) of one shard."""
+    if not os.path.exists(path):
+        return 0, 0, {}
+    conn = _connect_shard(path)
+    pages, tokens = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM page_rows").fetchone()
+    frequencies = {
+        term: conn.execute("SELECT COUNT(*) FROM pages WHERE pages MATCH ?", (_match([term]),)).fetchone()[0]
+        for term in terms
+    }
+    return pages, tokens, frequencies
+
+
+def shard_search(path: str, terms: Sequence[str], idf: Dict[str, float], average_length: float, k: int,
+                 document_ids: Optional[Sequence[str]] = None) -> List[Tuple[float, str, int, int, str]]:
+    """
+    The shard's k best pages for terms as (score, document_id, page_number, line, text), best first.
+    line and text are the page's line with the most distinct query terms.
+    """
+    if not os.path.exists(path) or not terms or document_ids == []:
+        return []
+    where, params = "", []
+    if document_ids is not None:
+        where = f" AND r.document_id IN ({', '.join('?' for _ in document_ids)})"
+        params = list(document_ids)
+    rows = _connect_shard(path).execute(
+        "SELECT r.document_id, r.page_number, r.first_line, r.length, pages.text FROM pages "
+        f"JOIN page_rows r ON r.id = pages.rowid WHERE pages MATCH ?{where} ORDER BY pages.rank LIMIT ?",
+        [_match(terms)] + params + [k * CANDIDATES_PER_HIT]
+    ).fetchall()
+    wanted = set(terms)
+    hits = []
+    for document_id, page_number, first_line, length, text in rows:
+        lines = text.split("\n")
+        counts: Dict[str, int] = {}
+        best, best_matched = 0, 0
+        for offset, line in enumerate(lines):
+            found = [token for token in tokenize(line) if token in wanted]
+            for token in found:
+                counts[token] = counts.get(token, 0) + 1
+            if len(set(found)) > best_matched:
+                best, best_matched = offset, len(set(found))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1))
+        score = sum(idf[term] * tf * (BM25_K1 + 1) / (tf + norm) for term, tf in counts.items())
+        hits.append((score, document_id, page_number, first_line + best, lines[best]))
+    hits.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+    return hits[:k]
+
+
+def shard_index(path: str, document_id: str, pages: List[Tuple[int, int, Optional[str], str]]) -> int:
+    """
+    Make the shard hold exactly pages for the document, as (page_number, first line, fingerprint, text).
+    Rows of pages whose fingerprint is already indexed are renumbered instead of re-indexed. Returns
+    the number of pages indexed.
+    """
+    conn = _connect_shard(path)
+    with conn:
+        reusable: Dict[str, List[int]] = {}
+        stale = []
+        for row_id, fingerprint in conn.execute(
+                "SELECT id, fingerprint FROM page_rows WHERE document_id = ?", (document_id,)):
+            if fingerprint is None:
+                stale.append(row_id)
+            else:
+                reusable.setdefault(fingerprint, []).append(row_id)
+        new_pages, renumbered = [], []
+        for page_number, first_line, fingerprint, text in pages:
+            if reusable.get(fingerprint):
+                renumbered.append((page_number, first_line, reusable[fingerprint].pop()))
+            else:
+                new_pages.append((page_number, first_line, fingerprint, text))
+        stale.extend(row_id for row_ids in reusable.values() for row_id in row_ids)
+        conn.executemany("DELETE FROM pages WHERE rowid = ?", [(row_id,) for row_id in stale])
+        conn.executemany("DELETE FROM page_rows WHERE id = ?", [(row_id,) for row_id in stale])
+        conn.executemany("UPDATE page_rows SET page_number = ?, first_line = ? WHERE id = ?", renumbered)
+        for page_number, first_line, fingerprint, text in new_pages:
+            row_id = conn.execute(
+                "INSERT INTO page_rows (document_id, page_number, first_line, length, fingerprint) VALUES (?, ?, ?, ?, ?)",
+                (document_id, page_number, first_line, len(tokenize(text)), fingerprint)
+            ).lastrowid
+            conn.execute("INSERT INTO pages (rowid, text) VALUES (?, ?)", (row_id, text))
+    return len(new_pages)
+
+
+def shard_remove(path: str, document_id: str):
+    """Drop every page of the document from the shard."""
+    if not os.path.exists(path):
+        return
+    conn = _connect_shard(path)
+    with conn:
+        conn.execute("DELETE FROM pages WHERE rowid IN (SELECT id FROM page_rows WHERE document_id = ?)", (document_id,))
+        conn.execute("DELETE FROM page_rows WHERE document_id = ?", (document_id,))
+
+
+def _document_pages(document_id: str, page_hashes: Optional[List[str]]) -> List[Tuple[int, int, Optional[str], str]]:
+    """The stored lines of a document as shard_index pages."""
+    from .db import get_lines
+    pages: Dict[int, List[Dict[str, Any]]] = {}
+    for line in get_lines(document_id):
+        pages.setdefault(line["page_number"], []).append(line)
+    return [
+        (page_number, lines[0]["global_line_number"],
+         page_hashes[page_number - 1] if page_hashes and page_number <= len(page_hashes) else None,
+         "\n".join(line.get("text") or "" for line in lines))
+        for page_number, lines in sorted(pages.items())
+    ]
+
+
+# --- Corpus ---
+class Corpus:
+    """
+    A named, persistent set of ingested PDFs with a sharded full-text index over their pages.
+
+    shards is fixed when the corpus is created; reopening it takes the count from its manifest.
+    Searches fan out over a pool of workers processes, started on first use (0: query the shards
+    in this process).
+    """
+    def __init__(self, name: str = "default", root: str = None, shards: int = None, workers: int = None,
+                 budget: ProcessBudget = ProcessBudget.LOW, ingest_workers: int = 1):
+        self.name = name
+        self.path = os.path.join(root or CORPUS_DIR, name)
+        self.budget = budget
+        self.ingest_workers = ingest_workers
+        self._lock = threading.Lock()
+        self._pool = None
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest is None:
+            manifest = {"shards": shards or CORPUS_SHARDS, "documents": {}}
+        elif shards is not None and shards != manifest["shards"]:
+            raise ValueError(f"Corpus {name!r} has {manifest['shards']} shards, not {shards}")
+        self.shards = manifest["shards"]
+        # Member files by path; files with the same content share one document_id and its shard rows
+        self._members: Dict[str, Dict[str, Any]] = {entry["path"]: entry for entry in manifest["documents"].values()}
+        self.workers = min(CORPUS_WORKERS if workers is None else workers, self.shards)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the search workers."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # --- Manifest and shards ---
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "corpus.json")
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"shards": self.shards, "documents": self._members}, f, indent=1, default=str)
+            os.replace(tmp, self._manifest_path())
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def shard_path(self, shard: int) -> str:
+        return os.path.join(self.path, f"shard-{shard:02d}.sqlite3")
+
+    def _shard_of(self, document_id: str) -> int:
+        # Stable across processes, unlike hash()
+        return int(hashlib.sha256(str(document_id).encode("utf-8")).hexdigest(), 16) % self.shards
+
+    def _map(self, func, *iterables) -> List[Any]:
+        """func over the argument lists, in the worker processes when there are any."""
+        if self.workers <= 0:
+            return list(map(func, *iterables))
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self._pool.map(func, *iterables))
+
+    # --- Membership ---
+    def _select(self, selector: Selector) -> List[Dict[str, Any]]:
+        """Member entries a selector names (see resolve)."""
+        if selector is None:
+            return list(self._members.values())
+        patterns = [selector] if isinstance(selector, str) else list(selector)
+        return [
+            entry for entry in self._members.values()
+            if any(pattern == entry["document_id"] or fnmatch.fnmatch(entry["file"], pattern)
+                   or fnmatch.fnmatch(entry["path"], pattern) for pattern in patterns)
+        ]
+
+    def documents(self, selector: Selector = None) -> List[Dict[str, Any]]:
+        """Manifest entries of the member files the selector names (all of them for None), in file name order."""
+        return sorted(self._select(selector), key=lambda entry: (entry["file"], entry["path"]))
+
+    def resolve(self, selector: Selector = None) -> List[str]:
+        """
+        Ids of the documents a selector names: a document id, a glob over the file name or path, or a
+        list of those. None selects every document. Member files with the same content are one document.
+        """
+        found = []
+        for entry in self._select(selector):
+            if entry["document_id"] not in found:
+                found.append(entry["document_id"])
+        return found
+
+    def files(self, document_id: str) -> List[str]:
+        """File names of the members holding a document."""
+        return sorted(entry["file"] for entry in self._members.values() if entry["document_id"] == document_id)
+
+    def _shard_of_document(self, document_id: str) -> int:
+        return next(entry["shard"] for entry in self._members.values() if entry["document_id"] == document_id)
+
+    def fingerprint(self) -> str:
+        """Digest of the corpus contents: changes whenever a file is added, updated or removed."""
+        members = sorted((path, entry["document_id"], entry["content_hash"]) for path, entry in self._members.items())
+        return hashlib.sha256(json.dumps([str(self.budget), members]).encode("utf-8")).hexdigest()
+
+    def _release(self, entry: Dict[str, Any]):
+        """Drop a member; its document leaves the shard once no other member holds it. Caller holds _lock."""
+        del self._members[entry["path"]]
+        if not any(other["document_id"] == entry["document_id"] for other in self._members.values()):
+            shard_remove(self.shard_path(entry["shard"]), entry["document_id"])
+
+    @instrumented("ingest", "corpus_add")
+    def add(self, pdf_path: str, user_id: str = None) -> Dict[str, Any]:
+        """
+        Ingest a PDF into the corpus, or bring the member added from the same path up to date with the
+        file. A file with the same content as another member shares that member's document. Returns
+        its manifest entry with status "added", "updated" or "unchanged" and pages_indexed, the number
+        of pages written to the shard.
+        """
+        from .core import PDFDocument
+        from .db import get_document
+        path = os.path.abspath(pdf_path)
+        content_hash = hash_pdf(path)
+        with self._lock:
+            previous = self._members.get(path)
+            if previous is not None and previous["content_hash"] == content_hash:
+                return dict(previous, status="unchanged", pages_indexed=0)
+            status = "added" if previous is None else "updated"
+            same = next((entry for entry in self._members.values() if entry["content_hash"] == content_hash), None)
+            pages_indexed = 0
+            if same is not None:
+                document_id, shard = same["document_id"], same["shard"]
+                record = {"page_count": same["page_count"], "line_count": same["line_count"]}
+            else:
+                doc = None
+                shared = previous is not None and any(
+                    other["document_id"] == previous["document_id"] and other["path"] != path
+                    for other in self._members.values()
+                )
+                # A document other members still hold keeps its revision; this file gets its own ingestion
+                if previous is not None and not shared:
+                    try:
+                        doc = PDFDocument(path, self.budget, user_id=user_id, workers=self.ingest_workers,
+                                          document_id=previous["document_id"])
+                        doc.update(path)
+                    except (KeyError, RuntimeError):
+                        # The stored ingestion is gone or unusable: ingest the file afresh
+                        doc = None
+                if doc is None:
+                    doc = PDFDocument(path, self.budget, user_id=user_id, workers=self.ingest_workers)
+                document_id = str(doc.document_id)
+                record = get_document(document_id) or {}
+                shard = self._shard_of(document_id)
+                pages_indexed = shard_index(self.shard_path(shard), document_id,
+                                            _document_pages(document_id, record.get("page_hashes")))
+            if previous is not None and previous["document_id"] != document_id:
+                self._release(previous)
+            entry = {
+                "document_id": document_id,
+                "path": path,
+                "file": os.path.basename(path),
+                "content_hash": content_hash,
+                "page_count": record.get("page_count", 0),
+                "line_count": record.get("line_count", 0),
+                "shard": shard,
+                "updated_at": datetime.utcnow().isoformat(),
+            }
+            self._members[path] = entry
+            self._write_manifest()
+        return dict(entry, status=status, pages_indexed=pages_indexed)
+
+    def remove(self, selector: Selector) -> List[str]:
+        """Drop the selected member files from the corpus (their ingestions stay cached). Returns their paths."""
+        with self._lock:
+            removed = self._select(selector)
+            for entry in removed:
+                self._release(entry)
+            self._write_manifest()
+        return [entry["path"] for entry in removed]
+
+    # --- Search ---
+    def search(self, query: str, k: int = 10, documents: Selector = None) -> List[Dict[str, Any]]:
+        """
+        The k pages best matching the query's words across the corpus (or the selected documents), as
+        dicts with document_id, file, page, line (global line number of the best matching line), text
+        and score, best first.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms or not self._members:
+            return []
+        selected = None if documents is None else self.resolve(documents)
+        if selected == []:
+            return []
+        shards = range(self.shards)
+        stats = self._map(shard_stats, [self.shard_path(s) for s in shards], [terms] * self.shards)
+        total_pages = sum(pages for pages, _, _ in stats)
+        if not total_pages:
+            return []
+        average_length = sum(tokens for _, tokens, _ in stats) / total_pages
+        idf = {}
+        for term in terms:
+            df = sum(frequencies.get(term, 0) for _, _, frequencies in stats)
+            idf[term] = math.log(1 + (total_pages - df + 0.5) / (df + 0.5))
+
+        if selected is not None:
+            by_shard: Dict[int, List[str]] = {}
+            for document_id in selected:
+                by_shard.setdefault(self._shard_of_document(document_id), []).append(document_id)
+            shards = sorted(by_shard)
+        filters = [by_shard[s] if selected is not None else None for s in shards]
+        n = len(shards)
+        results = self._map(shard_search, [self.shard_path(s) for s in shards], [terms] * n, [idf] * n,
+                            [average_length] * n, [k] * n, filters)
+        hits = sorted((hit for shard_hits in results for hit in shard_hits), key=lambda hit: (-hit[0], hit[1], hit[2]))
+        return [
+            {"document_id": document_id, "file": ", ".join(self.files(document_id)), "page": page,
+             "line": line, "text": text, "score": round(score, 4)}
+            for score, document_id, page, line, text in hits[:k]
+        ]
+
+
+# --- Corpus tools ---
+def _one_document(corpus: Corpus, document: str) -> Tuple[Optional[str], Optional[str]]:
+    """(document id, None) of the single document a selector names, or (None, message) explaining why not."""
+    matches = corpus.resolve(document)
+    if not matches:
+        return None, f"No document matches {document!r}. Use corpus_documents to list them."
+    if len(matches) > 1:
+        names = ", ".join(f"{', '.join(corpus.files(m))} ({m})" for m in matches[:10])
+        return None, f"{document!r} matches {len(matches)} documents: {names}. Name one by id or file name."
+    return matches[0], None
+
+
+def _titled(corpus: Corpus, document_id: str, text: str) -> str:
+    return f"Document: {', '.join(corpus.files(document_id))} ({document_id})\n\n{text}"
+
+
+@instrumented("tool")
+def corpus_search(corpus: Corpus, user_id: str, query: str, documents: Optional[Union[str, List[str]]] = None, k: int = 10) -> str:
+    """
+    Search every document in the corpus for pages matching the query's words, ranked by relevance.
+    documents optionally restricts the search to a document id, a file name pattern like "2023-*.pdf",
+    or a list of those. Returns up to k hits with their document, page and best matching line.
+    """
+    hits = corpus.search(query, k=k, documents=documents)
+    if not hits:
+        return f"No pages match {query!r}."
+    rendered = []
+    for n, hit in enumerate(hits, 1):
+        text = hit["text"] if len(hit["text"]) <= SNIPPET_CHARS else hit["text"][:SNIPPET_CHARS] + "…"
+        rendered.append(f"{n}. {hit['file']} ({hit['document_id']}) page {hit['page']}, line {hit['line']}: {text}")
+    return "\n".join(rendered)
+
+
+@instrumented("tool")
+def corpus_documents(corpus: Corpus, user_id: str, documents: Optional[Union[str, List[str]]] = None) -> str:
+    """List the documents in the corpus (or those a document id or file name pattern selects) with their ids and page counts."""
+    entries = corpus.documents(documents)
+    if not entries:
+        return "No documents."
+    return "\n".join(f"{entry['file']} ({entry['document_id']}): {entry['page_count']} pages" for entry in entries)
+
+
+@instrumented("tool")
+def corpus_goto(corpus: Corpus, user_id: str, document: str, page: int = None, line: int = None, continuation: Optional[str] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Go to a page or line number of one document and render it in markdown. document is a document id
+    or a file name (pattern) naming exactly one document. A continuation token of a result that was
+    cut short shows the rest of it. max_chars caps the output size.
+    """
+    from .tools import goto
+    document_id, error = _one_document(corpus, document)
+    if error:
+        return error
+    return _titled(corpus, document_id, goto(document_id, user_id, page=page, line=line, continuation=continuation, max_chars=max_chars))
+
+
+@instrumented("tool")
+def corpus_read_range(corpus: Corpus, user_id: str, document: str, start_page: int = None, end_page: int = None, start_line: int = None, end_line: int = None, max_chars_per_page: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Read consecutive pages (start_page to end_page) or a span of global line numbers (start_line to
+    end_line) of one document in a single call. document is a document id or a file name (pattern)
+    naming exactly one document.
+    """
+    from .tools import read_range
+    document_id, error = _one_document(corpus, document)
+    if error:
+        return error
+    return _titled(corpus, document_id, read_range(
+        document_id, user_id, start_page=start_page, end_page=end_page, start_line=start_line, end_line=end_line,
+        max_chars_per_page=max_chars_per_page, max_chars=max_chars,
+    ))
+
+
+# --- Agent ---
+class CorpusAgent:
+    """A react agent answering queries over every document of a corpus with the corpus tools."""
+
+    def __init__(self, corpus: Corpus, model_name: str = "ollama:llama3.2", llm=None):
+        """
+        Args:
+            corpus: The corpus to answer from
+            model_name: Name of the model to use for the agent
+            llm: Chat model to run the agent on instead of the default one (e.g. a fake model in tests)
+        """
+        self.corpus = corpus
+        self.model_name = model_name
+        self.llm = llm
+        self.agent = self._create_agent()
+
+    def _create_agent(self):
+        from langgraph.prebuilt import create_react_agent
+        from .core import _create_llm
+        from .tools import make_tool_with_doc
+        tools = [make_tool_with_doc(tool, self.corpus) for tool in (corpus_search, corpus_documents, corpus_goto, corpus_read_range)]
+        return create_react_agent(
+            model=self.llm if self.llm is not None else _create_llm(),
+            tools=tools,
+            prompt=CORPUS_PROMPT
+        )
+
+    def query(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Query the corpus; answers are cached per corpus contents, query and model (see answer_cache.py)."""
+        from .core import _llm_key
+        with record_query("corpus_query", model=self.model_name):
+            return cached_answer(
+                answer_key(f"corpus:{self.corpus.fingerprint()}", query, _llm_key(self.model_name, self.llm), CORPUS_PROMPT),
+                lambda: self.agent.invoke({"messages": [{"role": "user", "content": query}]}),
+                use_cache,
+            )
@@ -0,0 +1,240 @@
+"""
+PDF download layer for doc_task.
+
+Downloads go through one pooled requests.Session and are streamed to disk in chunks, so memory use
+does not depend on the size of the PDF. Finished files land in an on-disk cache that is bounded in
+bytes with LRU eviction; a cached URL is served as-is while fresh and afterwards revalidated with
+its ETag / Last-Modified validators, so an unchanged PDF is never transferred twice.
+
+Callers never get the cache's own file: each fetch hands out a hard link to it (a copy where the
+filesystem has no hard links) that the caller deletes when done, so evicting or replacing an entry
+cannot pull a file from under an ingestion that is still reading it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DOWNLOAD_CACHE_DIR = os.environ.get(
+    "DOWNLOAD_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pdfparser-agent", "downloads")
+)
+DOWNLOAD_CACHE_BYTES = int(os.environ.get("DOWNLOAD_CACHE_BYTES", str(2 * 1024 ** 3)))
+# Seconds a cached file is served without asking the server again
+DOWNLOAD_CACHE_FRESHNESS = float(os.environ.get("DOWNLOAD_CACHE_FRESHNESS", "300"))
+DOWNLOAD_POOL_SIZE = int(os.environ.get("DOWNLOAD_POOL_SIZE", "16"))
+DOWNLOAD_TIMEOUT = float(os.environ.get("DOWNLOAD_TIMEOUT", "60"))
+CHUNK_SIZE = 1 << 16
+# Checkouts older than this were left behind by a process that died and are removed on startup
+CHECKOUT_MAX_AGE = 24 * 3600
+
+
+class DownloadError(Exception):
+    """Raised when a PDF cannot be downloaded."""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide pooled session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=DOWNLOAD_POOL_SIZE, pool_maxsize=DOWNLOAD_POOL_SIZE, max_retries=2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _stream_to_file(response: requests.Response, directory: str) -> str:
+    """Write the response body to a new temporary file in directory, chunk by chunk."""
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class DownloadCache:
+    """
+    Size-bounded LRU cache of downloaded PDFs, keyed by URL.
+
+    The index (url, size, validators, last use) is kept in index.json next to the files. It is
+    guarded by a lock within the process; concurrent processes sharing a directory may occasionally
+    download the same URL twice but never serve a partially written file, since files only appear
+    under their final name once complete.
+    """
+
+    def __init__(self, directory: str = DOWNLOAD_CACHE_DIR, max_bytes: int = DOWNLOAD_CACHE_BYTES,
+                 freshness: float = DOWNLOAD_CACHE_FRESHNESS, session: Optional[requests.Session] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.freshness = freshness
+        self.session = session
+        self._lock = threading.Lock()
+        self._checkout_dir = os.path.join(directory, "checkout")
+        os.makedirs(self._checkout_dir, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = self._read_index()
+        self._remove_stale_checkouts()
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _write_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _remove_stale_checkouts(self):
+        cutoff = time.time() - CHECKOUT_MAX_AGE
+        for name in os.listdir(self._checkout_dir):
+            path = os.path.join(self._checkout_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pdf")
+
+    def _checkout(self, key: str) -> str:
+        """A new caller-owned link to the cached file of key. Caller holds self._lock, so key cannot be evicted meanwhile."""
+        path = os.path.join(self._checkout_dir, f"{key[:16]}-{uuid.uuid4().hex}.pdf")
+        try:
+            os.link(self._path(key), path)
+        except OSError:
+            shutil.copyfile(self._path(key), path)
+        return path
+
+    def fetch(self, url: str) -> str:
+        """
+        Return a local path holding the PDF at url, downloading or revalidating as needed. The path is
+        the caller's to delete once done with it; the cached copy stays.
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and time.time() - entry["validated_at"] < self.freshness:
+                entry["last_used"] = time.time()
+                self._write_index()
+                return self._checkout(key)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        session = self.session or get_session()
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 304 and entry is not None:
+                    return self._touch(key, validated=True)
+                if response.status_code >= 500 and entry is not None:
+                    # Server failing: serve the stale copy, as when it is unreachable
+                    return self._touch(key, validated=False)
+                if response.status_code != 200:
+                    raise DownloadError(f"Failed to download PDF from {url} (HTTP {response.status_code})")
+                tmp_path = _stream_to_file(response, self.directory)
+                validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        except requests.RequestException as e:
+            if entry is not None:
+                # Server unreachable: a stale copy beats no copy
+                return self._touch(key, validated=False)
+            raise DownloadError(f"Failed to download PDF from {url}: {e}") from e
+        with self._lock:
+            os.replace(tmp_path, self._path(key))
+            now = time.time()
+            self._index[key] = dict(url=url, size=os.path.getsize(self._path(key)), validated_at=now, last_used=now, **validators)
+            self._evict(keep=key)
+            self._write_index()
+            return self._checkout(key)
+
+    def _touch(self, key: str, validated: bool) -> str:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                raise DownloadError(f"Cached copy of {key} was evicted during revalidation")
+            entry["last_used"] = time.time()
+            if validated:
+                entry["validated_at"] = entry["last_used"]
+            self._write_index()
+            return self._checkout(key)
+
+    def _evict(self, keep: str):
+        # Caller holds self._lock
+        total = sum(entry["size"] for entry in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._index.pop(key)["size"]
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def invalidate(self, url: Optional[str] = None):
+        """Drop one URL, or every entry, from the cache."""
+        with self._lock:
+            keys = [hashlib.sha256(url.encode("utf-8")).hexdigest()] if url else list(self._index)
+            for key in keys:
+                if self._index.pop(key, None) is not None:
+                    try:
+                        os.unlink(self._path(key))
+                    except OSError:
+                        pass
+            self._write_index()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_download_cache() -> DownloadCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DownloadCache()
+        return _cache
+
+
+def download_pdf(url: str, use_cache: bool = True) -> str:
+    """
+    Download url and return the local path of a file the caller owns and deletes when done: a link to
+    the cached copy (see DownloadCache.fetch), or with use_cache=False a fresh temporary file.
+    """
+    if use_cache:
+        return get_download_cache().fetch(str(url))
+    try:
+        with get_session().get(str(url), stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code != 200:
+                raise DownloadError(f"Failed to download PDF from {url} (HTTP {response.status_code})")
+            return _stream_to_file(response, tempfile.gettempdir())
+    except requests.RequestException as e:
+        raise DownloadError(f"Failed to download PDF from {url}: {e}") from e
+
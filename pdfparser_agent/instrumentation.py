@@ -0,0 +1,330 @@
+"""
+Optional instrumentation of the query hot path.
+
+While a query is recorded (record_query), every instrumented function adds its wall time to the
+query's report: tools (plus the characters they return to the model and the characters rendering
+cut to fit the budget), page rendering, db calls,
+downloads and ingestion. pymongo command monitoring adds one round-trip per server command together
+with the documents and bytes it returned. Time spent outside every instrumented call is reported as
+llm_seconds (model calls and agent framework). The finished report goes to a sink: a structured log line, a JSON-lines file or
+cumulative Prometheus text counters.
+
+With no sink configured record_query records nothing, and instrumented functions cost one context
+variable lookup per call.
+
+INSTRUMENTATION=log|json|prometheus selects a sink at startup; INSTRUMENTATION_PATH is the file the
+json and prometheus sinks write to.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+INSTRUMENTATION = os.environ.get("INSTRUMENTATION", "")
+INSTRUMENTATION_PATH = os.environ.get("INSTRUMENTATION_PATH", "")
+
+logger = logging.getLogger(__name__)
+
+_recorder = contextvars.ContextVar("pdfparser_agent_recorder", default=None)
+# Span kinds already open in this context; only the outermost span of a kind counts towards its total
+_open_kinds = contextvars.ContextVar("pdfparser_agent_open_kinds", default=frozenset())
+
+
+class QueryRecorder:
+    """Measurements of one query, aggregated per (kind, name). Safe to update from several threads."""
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.spans = {}
+        self.totals = {}
+        self.top_level_seconds = 0.0
+        self.mongo = {"round_trips": 0, "documents": 0, "bytes": 0}
+        self.truncated = {"renders": 0, "chars": 0}
+        self._lock = threading.Lock()
+
+    def add_span(self, kind: str, name: str, seconds: float, outermost: bool, top_level: bool, chars: Optional[int] = None):
+        with self._lock:
+            span = self.spans.setdefault((kind, name), {"calls": 0, "seconds": 0.0})
+            span["calls"] += 1
+            span["seconds"] += seconds
+            if chars is not None:
+                span["chars"] = span.get("chars", 0) + chars
+            if outermost:
+                self.totals[kind] = self.totals.get(kind, 0.0) + seconds
+            if top_level:
+                self.top_level_seconds += seconds
+
+    def add_command(self, documents: int, size: int):
+        with self._lock:
+            self.mongo["round_trips"] += 1
+            self.mongo["documents"] += documents
+            self.mongo["bytes"] += size
+
+    def add_truncation(self, chars: int):
+        with self._lock:
+            self.truncated["renders"] += 1
+            self.truncated["chars"] += chars
+
+    def report(self) -> Dict[str, Any]:
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        with self._lock:
+            spans = [
+                dict(kind=kind, name=name, **{k: round(v, 6) if k == "seconds" else v for k, v in stats.items()})
+                for (kind, name), stats in sorted(self.spans.items())
+            ]
+            totals = {kind: round(value, 6) for kind, value in sorted(self.totals.items())}
+            top_level_seconds = self.top_level_seconds
+            mongo = dict(self.mongo)
+            truncated = dict(self.truncated)
+        return {
+            "query": self.name,
+            **self.labels,
+            "seconds": round(seconds, 6),
+            "llm_seconds": round(max(0.0, seconds - top_level_seconds), 6),
+            # Per kind, nested calls of the same kind counted once (db time includes db calls made by tools)
+            "seconds_by_kind": totals,
+            "chars_returned": sum(span.get("chars", 0) for span in spans if span["kind"] == "tool"),
+            "truncated": truncated,
+            "mongo": mongo,
+            "spans": spans,
+        }
+
+
+def set_label(name: str, value: str):
+    """Attach a label (e.g. the answer cache outcome) to the active query's report."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.labels[name] = value
+
+
+def record_truncation(chars: int):
+    """Count chars of tool output cut by the render budget in the active query."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add_truncation(chars)
+
+
+def _enter(kind: str):
+    open_kinds = _open_kinds.get()
+    return _open_kinds.set(open_kinds | {kind}), kind not in open_kinds, not open_kinds
+
+
+def instrumented(kind: str, name: Optional[str] = None):
+    """
+    Decorator recording each call as a span of the given kind ("tool", "render", "db", ...) in the active
+    query. Works for plain and async functions; tool spans also count the characters returned.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        def finish(recorder, token, outermost, top_level, start, result):
+            _open_kinds.reset(token)
+            chars = len(result) if kind == "tool" and isinstance(result, str) else None
+            recorder.add_span(kind, label, time.perf_counter() - start, outermost, top_level, chars)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                recorder = _recorder.get()
+                if recorder is None:
+                    return await func(*args, **kwargs)
+                token, outermost, top_level = _enter(kind)
+                start, result = time.perf_counter(), None
+                try:
+                    result = await func(*args, **kwargs)
+                    return result
+                finally:
+                    finish(recorder, token, outermost, top_level, start, result)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder.get()
+            if recorder is None:
+                return func(*args, **kwargs)
+            token, outermost, top_level = _enter(kind)
+            start, result = time.perf_counter(), None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                finish(recorder, token, outermost, top_level, start, result)
+        return wrapper
+    return decorate
+
+
+# --- Sinks ---
+class LogSink:
+    """Logs each query report as one JSON line."""
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def emit(self, report: Dict[str, Any]):
+        self.log.log(self.level, json.dumps(report))
+
+
+class JSONSink:
+    """Appends each query report as one JSON line to path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, report: Dict[str, Any]):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+class PrometheusSink:
+    """
+    Cumulative counters over all reported queries in the Prometheus text exposition format.
+    render() returns the current text; with a path it is also rewritten after every query, which
+    suits node_exporter's textfile collector.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: str, labels: Dict[str, str], value: float):
+        key = (metric, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def emit(self, report: Dict[str, Any]):
+        query = {"query": report["query"]}
+        with self._lock:
+            self._add("pdfparser_agent_queries_total", query, 1)
+            self._add("pdfparser_agent_query_seconds_total", query, report["seconds"])
+            self._add("pdfparser_agent_llm_seconds_total", query, report["llm_seconds"])
+            for kind, seconds in report["seconds_by_kind"].items():
+                self._add("pdfparser_agent_kind_seconds_total", dict(query, kind=kind), seconds)
+            self._add("pdfparser_agent_chars_returned_total", query, report["chars_returned"])
+            if "answer_cache" in report:
+                self._add("pdfparser_agent_answer_cache_total", dict(query, outcome=report["answer_cache"]), 1)
+            for field, value in report["truncated"].items():
+                self._add(f"pdfparser_agent_truncated_{field}_total", query, value)
+            for field, value in report["mongo"].items():
+                self._add(f"pdfparser_agent_mongo_{field}_total", query, value)
+            for span in report["spans"]:
+                labels = {"kind": span["kind"], "name": span["name"]}
+                self._add("pdfparser_agent_span_calls_total", labels, span["calls"])
+                self._add("pdfparser_agent_span_seconds_total", labels, span["seconds"])
+            text = self._render()
+        if self.path:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+    def render(self) -> str:
+        with self._lock:
+            return self._render()
+
+    def _render(self) -> str:
+        lines = []
+        for metric in sorted({metric for metric, _ in self.counters}):
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in sorted(self.counters.items()):
+                if name == metric:
+                    label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{metric}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _sink_from_env():
+    if INSTRUMENTATION == "log":
+        return LogSink()
+    if INSTRUMENTATION == "json":
+        return JSONSink(INSTRUMENTATION_PATH or "pdfparser_agent_queries.jsonl")
+    if INSTRUMENTATION == "prometheus":
+        return PrometheusSink(INSTRUMENTATION_PATH or None)
+    if INSTRUMENTATION:
+        logger.warning("Unknown INSTRUMENTATION=%r, instrumentation disabled", INSTRUMENTATION)
+    return None
+
+
+_sink = _sink_from_env()
+
+
+def set_sink(sink):
+    """Send query reports to sink (any object with emit(report)); None disables instrumentation."""
+    global _sink
+    _sink = sink
+
+
+def get_sink():
+    return _sink
+
+
+@contextmanager
+def record_query(name: str, sink=None, **labels):
+    """
+    Record everything instrumented that runs inside the block as one query and emit its report to
+    sink (default: the configured sink). Yields the QueryRecorder, or None when there is no sink.
+    Inside an already recorded query the block simply joins it.
+    """
+    current = _recorder.get()
+    if current is not None:
+        yield current
+        return
+    sink = sink or _sink
+    if sink is None:
+        yield None
+        return
+    recorder = QueryRecorder(name, **labels)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        recorder.seconds = time.perf_counter() - recorder.started
+        try:
+            sink.emit(recorder.report())
+        except Exception:
+            logger.exception("Failed to emit instrumentation report for %s", name)
+
+
+# --- MongoDB command monitoring ---
+def _reply_documents(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "value" in reply:
+        # findAndModify
+        return 1 if reply["value"] is not None else 0
+    return 0
+
+
+def mongo_listeners():
+    """Event listeners to pass to a (Async)MongoClient so its commands are counted in the active query."""
+    import bson
+    from pymongo import monitoring
+
+    class CommandCounter(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            recorder = _recorder.get()
+            if recorder is not None:
+                recorder.add_command(_reply_documents(event.reply), len(bson.encode(event.reply)))
+
+        def failed(self, event):
+            recorder = _recorder.get()
+            if recorder is not None:
+                recorder.add_command(0, 0)
+
+    return [CommandCounter()]
@@ -0,0 +1,160 @@
+"""
+Clip memory store used by clip_memory / use_memory.
+
+A clip is a reference to a global line range of a document, never a copy of its lines; text is only
+materialized when use_memory asks for it. Each clip carries the byte size of the text it references,
+which is what the per-session and global budgets are measured in. When a session exceeds its budget
+its oldest clips are dropped; when the store exceeds the global budget whole least-recently-used
+sessions are dropped; idle sessions expire after the TTL. Optionally clips are mirrored to Mongo so
+sessions survive restarts.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CLIP_MEMORY_SESSION_BYTES = int(os.environ.get("CLIP_MEMORY_SESSION_BYTES", str(1024 ** 2)))
+CLIP_MEMORY_MAX_BYTES = int(os.environ.get("CLIP_MEMORY_MAX_BYTES", str(256 * 1024 ** 2)))
+CLIP_MEMORY_TTL = float(os.environ.get("CLIP_MEMORY_TTL", "86400"))
+CLIP_MEMORY_PERSIST = os.environ.get("CLIP_MEMORY_PERSIST", "0") == "1"
+
+SessionKey = Tuple[str, str]
+
+
+class Clip:
+    """A reference to lines start..end (inclusive) of a document and the size of their text in bytes."""
+
+    __slots__ = ("start", "end", "size", "created_at")
+
+    def __init__(self, start: int, end: int, size: int, created_at: Optional[float] = None):
+        self.start = start
+        self.end = end
+        self.size = size
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"start": self.start, "end": self.end, "size": self.size, "created_at": self.created_at}
+
+
+class _Session:
+    __slots__ = ("clips", "size", "last_used")
+
+    def __init__(self, clips: Optional[List[Clip]] = None):
+        self.clips = clips or []
+        self.size = sum(clip.size for clip in self.clips)
+        self.last_used = time.monotonic()
+
+
+class ClipMemoryStore:
+    """Thread-safe, byte-budgeted store of clip references keyed by (user_id, document_id)."""
+
+    def __init__(self, session_max_bytes: int = CLIP_MEMORY_SESSION_BYTES, max_bytes: int = CLIP_MEMORY_MAX_BYTES,
+                 ttl: float = CLIP_MEMORY_TTL, persist: bool = CLIP_MEMORY_PERSIST):
+        self.session_max_bytes = session_max_bytes
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persist = persist
+        self._sessions = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, document_id: str, start: int, end: int, size: int) -> List[Clip]:
+        """Store a clip reference. Returns the clips evicted to make room for it."""
+        key = (user_id, str(document_id))
+        clip = Clip(start, end, size)
+        stored = self._load(key)
+        with self._lock:
+            session = self._session(key, stored, create=True)
+            session.clips.append(clip)
+            session.size += clip.size
+            self._size += clip.size
+            evicted = []
+            # Over the session budget: drop this session's oldest clips, always keeping the new one
+            while session.size > self.session_max_bytes and len(session.clips) > 1:
+                old = session.clips.pop(0)
+                session.size -= old.size
+                self._size -= old.size
+                evicted.append(old)
+            self._evict_sessions(keep=key)
+        if self.persist:
+            from .db import insert_clip, delete_clips
+            insert_clip(user_id, document_id, clip.to_dict())
+            if evicted:
+                delete_clips(user_id, document_id, [c.created_at for c in evicted])
+        return evicted
+
+    def clips(self, user_id: str, document_id: str) -> List[Clip]:
+        key = (user_id, str(document_id))
+        stored = self._load(key)
+        with self._lock:
+            session = self._session(key, stored, create=False)
+            return list(session.clips) if session else []
+
+    def clear(self, user_id: str, document_id: str):
+        with self._lock:
+            session = self._sessions.pop((user_id, str(document_id)), None)
+            if session:
+                self._size -= session.size
+        if self.persist:
+            from .db import delete_clips
+            delete_clips(user_id, document_id)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _load(self, key: SessionKey) -> Optional[List[Clip]]:
+        """The persisted clips of a session that is not in memory, read without holding self._lock."""
+        if not self.persist:
+            return None
+        with self._lock:
+            if key in self._sessions:
+                return None
+        from .db import get_clips
+        return [Clip(**c) for c in get_clips(*key)]
+
+    def _session(self, key: SessionKey, stored: Optional[List[Clip]], create: bool) -> Optional[_Session]:
+        # Caller holds self._lock; stored is what _load read for the key
+        self._expire()
+        session = self._sessions.get(key)
+        if session is None and stored is not None:
+            # Kept even when empty, so a session without clips is not looked up again on every call
+            session = _Session(stored)
+            self._sessions[key] = session
+            self._size += session.size
+        if session is None and create:
+            session = _Session()
+            self._sessions[key] = session
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(key)
+        return session
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[key]
+            self._size -= session.size
+
+    def _evict_sessions(self, keep: SessionKey):
+        # Evicted sessions only leave memory; persisted copies are reloaded on next use
+        while self._size > self.max_bytes and len(self._sessions) > 1:
+            key, session = next(iter(self._sessions.items()))
+            if key == keep:
+                self._sessions.move_to_end(key)
+                continue
+            del self._sessions[key]
+            self._size -= session.size
+
+
+clip_memory_store = ClipMemoryStore()
+
+
+def text_size(lines: List[Dict[str, Any]]) -> int:
+    """Bytes of UTF-8 text (plus newlines) a list of lines materializes to."""
+    return sum(len(line["text"].encode("utf-8")) + 1 for line in lines)
@@ -0,0 +1,370 @@
+"""
+MongoDB storage backend (the default).
+
+Collections: documents (one record per ingestion), document_lines (one document per line),
+document_terms (inverted-index postings per ingestion batch) and clip_memory (persisted clips).
+"""
+
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+
+from .instrumentation import mongo_listeners
+from .memory import CLIP_MEMORY_TTL
+from .search import SearchIndex
+
+# Fields the tools read from document_lines; _id and document_id never leave the server
+LINE_PROJECTION = {"_id": 0, "page_number": 1, "line_num_on_page": 1, "global_line_number": 1, "text": 1}
+TERM_PROJECTION = {"_id": 0, "term": 1, "postings": 1}
+PAGE_ORDER = [("page_number", 1), ("line_num_on_page", 1)]
+# Moved lines pass through numbers this far up, which no page or line uses, on the way to their new place
+MOVE_OFFSET = 1 << 40
+# Stale document_terms entries deleted per request by shift_terms
+TERM_DELETE_BATCH = 1000
+
+
+def ensure_indexes(db):
+    """Create the indexes every query in this module relies on. Idempotent, called on first connection."""
+    # Page lookups and page ranges, sorted by position on the page
+    db.document_lines.create_index([("document_id", 1), ("page_number", 1), ("line_num_on_page", 1)])
+    # goto(line=...), scrolling and range reads
+    db.document_lines.create_index([("document_id", 1), ("global_line_number", 1)])
+    # Inverted-index postings, one entry per (term, ingestion batch)
+    db.document_terms.create_index([("document_id", 1), ("term", 1)])
+    # Persisted clip references, expired by Mongo after CLIP_MEMORY_TTL
+    db.clip_memory.create_index([("user_id", 1), ("document_id", 1), ("created_at", 1)])
+    db.clip_memory.create_index("stored_at", expireAfterSeconds=int(CLIP_MEMORY_TTL))
+    # At most one ingestion per (content_hash, processing_type); legacy records without a hash are exempt
+    db.documents.create_index(
+        [("content_hash", 1), ("processing_type", 1)],
+        unique=True,
+        partialFilterExpression={"content_hash": {"$exists": True}}
+    )
+
+
+def build_search_index(entries, lines):
+    """SearchIndex from document_terms entries; documents ingested before term indexing are indexed from their lines."""
+    postings = {}
+    for entry in entries:
+        postings.setdefault(entry["term"], []).extend((p, g) for p, g in entry["postings"])
+    for term_postings in postings.values():
+        # A term's entries come from different ingestion batches, in no particular order
+        term_postings.sort(key=lambda posting: posting[1])
+    return SearchIndex(postings) if postings else SearchIndex.from_lines(lines)
+
+
+class MongoStore:
+    """Storage operations behind db.py, on a pymongo Database (or anything with the same API, e.g. mongomock)."""
+
+    name = "mongo"
+    # Search postings live in document_terms, keyed by global line number
+    term_postings = True
+
+    def __init__(self, db):
+        self.db = db
+        # Where the store connected to, so async_db can reach the same database natively; None for a given database
+        self.uri = None
+        self.database_name = None
+        ensure_indexes(db)
+
+    @classmethod
+    def connect(cls, uri, database):
+        store = cls(MongoClient(uri, event_listeners=mongo_listeners())[database])
+        store.uri, store.database_name = uri, database
+        return store
+
+    # --- documents ---
+    def insert_document(self, doc):
+        return self.db.documents.insert_one(doc).inserted_id
+
+    def claim_document(self, doc, content_hash, processing_type):
+        """Atomically find or create the record for (content_hash, processing_type), inserting doc if absent."""
+        while True:
+            try:
+                return self.db.documents.find_one_and_update(
+                    {"content_hash": content_hash, "processing_type": processing_type},
+                    {"$setOnInsert": doc},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # Lost a concurrent first-open race; the winner's record is there now
+                continue
+
+    def get_document(self, document_id, fields=None):
+        projection = {field: 1 for field in fields} if fields else None
+        return self.db.documents.find_one({"_id": ObjectId(document_id)}, projection)
+
+    def find_document_ids(self, content_hash, processing_type=None):
+        query = {"content_hash": content_hash}
+        if processing_type is not None:
+            query["processing_type"] = processing_type
+        return [d["_id"] for d in self.db.documents.find(query, {"_id": 1})]
+
+    def update_document(self, document_id, fields):
+        self.db.documents.update_one({"_id": ObjectId(document_id)}, {"$set": fields})
+
+    def update_owned_document(self, document_id, ingest_token, fields):
+        """Update a loading record only while ingest_token owns it. Returns whether it did."""
+        query = {"_id": ObjectId(document_id), "ingest_token": ingest_token, "status": "loading"}
+        return self.db.documents.update_one(query, {"$set": fields}).matched_count == 1
+
+    def delete_document(self, document_id):
+        self.delete_lines(document_id)
+        self.db.documents.delete_one({"_id": ObjectId(document_id)})
+
+    def delete_lines(self, document_id):
+        self.db.document_lines.delete_many({"document_id": ObjectId(document_id)})
+        self.db.document_terms.delete_many({"document_id": ObjectId(document_id)})
+
+    # --- lines ---
+    def insert_lines(self, document_id, lines):
+        self.db.document_lines.insert_many([dict(line, document_id=document_id) for line in lines])
+
+    def _find_lines(self, document_id, filter_query=None, sort_key="global_line_number"):
+        query = {"document_id": ObjectId(document_id)}
+        if filter_query:
+            query.update(filter_query)
+        return list(self.db.document_lines.find(query, LINE_PROJECTION).sort(sort_key, 1))
+
+    def replace_pages(self, document_id, removed, moves, lines):
+        """See db.replace_document_pages. Not atomic: readers may see a mix of both revisions meanwhile."""
+        oid = ObjectId(document_id)
+        if removed:
+            self.db.document_lines.delete_many({"document_id": oid, "$or": [
+                {"page_number": {"$gte": first, "$lte": last}} for first, last in removed
+            ]})
+        # Every block is moved out of the way first, so no later block's range picks up lines moved before it
+        for first, last, page_delta, line_delta in moves:
+            self.db.document_lines.update_many(
+                {"document_id": oid, "page_number": {"$gte": first, "$lte": last}},
+                {"$inc": {"page_number": MOVE_OFFSET + page_delta, "global_line_number": MOVE_OFFSET + line_delta}}
+            )
+        if moves:
+            self.db.document_lines.update_many(
+                {"document_id": oid, "page_number": {"$gte": MOVE_OFFSET}},
+                {"$inc": {"page_number": -MOVE_OFFSET, "global_line_number": -MOVE_OFFSET}}
+            )
+        if lines:
+            self.insert_lines(oid, lines)
+
+    def get_lines(self, document_id):
+        return self._find_lines(document_id)
+
+    def get_page_lines(self, document_id, page_number):
+        return self._find_lines(document_id, {"page_number": page_number}, sort_key="line_num_on_page")
+
+    def get_page_range(self, document_id, start_page, end_page):
+        # Sorted along the page index, so the range is one index scan
+        query = {"document_id": ObjectId(document_id), "page_number": {"$gte": start_page, "$lte": end_page}}
+        return list(self.db.document_lines.find(query, LINE_PROJECTION).sort(PAGE_ORDER))
+
+    def get_line(self, document_id, global_line_number):
+        return self.db.document_lines.find_one(
+            {"document_id": ObjectId(document_id), "global_line_number": global_line_number},
+            LINE_PROJECTION
+        )
+
+    def get_line_ranges(self, document_id, ranges):
+        if len(ranges) == 1:
+            (start, end), = ranges
+            return self._find_lines(document_id, {"global_line_number": {"$gte": start, "$lte": end}})
+        return self._find_lines(document_id, {"$or": [
+            {"global_line_number": {"$gte": start, "$lte": end}} for start, end in ranges
+        ]})
+
+    def line_stats(self, document_id):
+        # Two indexed queries, no full scan
+        query = {"document_id": ObjectId(document_id)}
+        last_page = self.db.document_lines.find_one(query, {"_id": 0, "page_number": 1}, sort=[("page_number", -1)])
+        return {
+            "page_count": last_page["page_number"] if last_page else 0,
+            "line_count": self.db.document_lines.count_documents(query)
+        }
+
+    # --- search ---
+    def insert_terms(self, entries):
+        self.db.document_terms.insert_many(entries)
+
+    def shift_terms(self, document_id, removed, moves):
+        """
+        Apply replace_pages' removed ranges and moves to the postings in document_terms: postings on
+        removed pages are dropped and those on moved pages shifted. Only entries that change are
+        rewritten, unless most do: then the document's entries are replaced wholesale, which saves
+        sending every stale _id.
+        """
+        changes = {}
+        for first, last in removed:
+            changes.update((page, None) for page in range(first, last + 1))
+        for first, last, page_delta, line_delta in moves:
+            changes.update((page, (page_delta, line_delta)) for page in range(first, last + 1))
+        if not changes:
+            return
+        oid = ObjectId(document_id)
+        kept, stale, rewritten = [], [], []
+        for entry in self.db.document_terms.find({"document_id": oid}):
+            postings = []
+            for page, line in entry["postings"]:
+                change = changes.get(page, (0, 0))
+                if change is not None:
+                    postings.append([page + change[0], line + change[1]])
+            if postings == entry["postings"]:
+                kept.append(entry)
+                continue
+            stale.append(entry["_id"])
+            if postings:
+                rewritten.append({"document_id": entry["document_id"], "term": entry["term"], "postings": postings})
+        if len(stale) > len(kept):
+            self.db.document_terms.delete_many({"document_id": oid})
+            rewritten.extend({"document_id": e["document_id"], "term": e["term"], "postings": e["postings"]} for e in kept)
+        else:
+            for i in range(0, len(stale), TERM_DELETE_BATCH):
+                self.db.document_terms.delete_many({"_id": {"$in": stale[i:i + TERM_DELETE_BATCH]}})
+        if rewritten:
+            self.db.document_terms.insert_many(rewritten)
+
+    def search_index(self, document_id, cached):
+        # Postings only pay off once the lines are cached to verify candidates against
+        if cached is None:
+            return None
+        entries = self.db.document_terms.find({"document_id": ObjectId(document_id)}, TERM_PROJECTION)
+        return build_search_index(entries, cached.lines)
+
+    # --- clips ---
+    def insert_clip(self, record):
+        self.db.clip_memory.insert_one(record)
+
+    def get_clips(self, user_id, document_id):
+        return list(self.db.clip_memory.find(
+            {"user_id": user_id, "document_id": document_id},
+            {"_id": 0, "start": 1, "end": 1, "size": 1, "created_at": 1}
+        ).sort("created_at", 1))
+
+    def delete_clips(self, user_id, document_id, created_at=None):
+        query = {"user_id": user_id, "document_id": document_id}
+        if created_at is not None:
+            query["created_at"] = {"$in": list(created_at)}
+        self.db.clip_memory.delete_many(query)
+
+
+class AsyncMongoStore:
+    """
+    The MongoStore operations async_db needs, on an awaitable database: pymongo's AsyncMongoClient
+    database, or anything with the same API (e.g. the mongomock stand-in in tests/).
+    """
+
+    name = "mongo"
+    term_postings = True
+
+    def __init__(self, db):
+        self.db = db
+        self._indexes_ready = False
+
+    @classmethod
+    def connect(cls, uri, database):
+        from pymongo import AsyncMongoClient
+        return cls(AsyncMongoClient(uri, event_listeners=mongo_listeners())[database])
+
+    async def open(self):
+        """Create the indexes of ensure_indexes on first use."""
+        if self._indexes_ready:
+            return
+        await self.db.document_lines.create_index([("document_id", 1), ("page_number", 1), ("line_num_on_page", 1)])
+        await self.db.document_lines.create_index([("document_id", 1), ("global_line_number", 1)])
+        await self.db.document_terms.create_index([("document_id", 1), ("term", 1)])
+        await self.db.clip_memory.create_index([("user_id", 1), ("document_id", 1), ("created_at", 1)])
+        await self.db.clip_memory.create_index("stored_at", expireAfterSeconds=int(CLIP_MEMORY_TTL))
+        await self.db.documents.create_index(
+            [("content_hash", 1), ("processing_type", 1)],
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        )
+        self._indexes_ready = True
+
+    # --- documents ---
+    async def insert_document(self, doc):
+        return (await self.db.documents.insert_one(doc)).inserted_id
+
+    async def claim_document(self, doc, content_hash, processing_type):
+        """See MongoStore.claim_document."""
+        while True:
+            try:
+                return await self.db.documents.find_one_and_update(
+                    {"content_hash": content_hash, "processing_type": processing_type},
+                    {"$setOnInsert": doc},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                continue
+
+    async def get_document(self, document_id, fields=None):
+        projection = {field: 1 for field in fields} if fields else None
+        return await self.db.documents.find_one({"_id": ObjectId(document_id)}, projection)
+
+    async def update_document(self, document_id, fields):
+        await self.db.documents.update_one({"_id": ObjectId(document_id)}, {"$set": fields})
+
+    async def update_owned_document(self, document_id, ingest_token, fields):
+        """See MongoStore.update_owned_document."""
+        query = {"_id": ObjectId(document_id), "ingest_token": ingest_token, "status": "loading"}
+        return (await self.db.documents.update_one(query, {"$set": fields})).matched_count == 1
+
+    async def delete_document(self, document_id):
+        await self.delete_lines(document_id)
+        await self.db.documents.delete_one({"_id": ObjectId(document_id)})
+
+    async def delete_lines(self, document_id):
+        await self.db.document_lines.delete_many({"document_id": ObjectId(document_id)})
+        await self.db.document_terms.delete_many({"document_id": ObjectId(document_id)})
+
+    # --- lines ---
+    async def insert_lines(self, document_id, lines):
+        await self.db.document_lines.insert_many([dict(line, document_id=document_id) for line in lines])
+
+    async def _find_lines(self, document_id, filter_query=None, sort=(("global_line_number", 1),)):
+        query = {"document_id": ObjectId(document_id)}
+        if filter_query:
+            query.update(filter_query)
+        return await self.db.document_lines.find(query, LINE_PROJECTION).sort(list(sort)).to_list(None)
+
+    async def get_lines(self, document_id):
+        return await self._find_lines(document_id)
+
+    async def get_page_lines(self, document_id, page_number):
+        return await self._find_lines(document_id, {"page_number": page_number}, sort=[("line_num_on_page", 1)])
+
+    async def get_page_range(self, document_id, start_page, end_page):
+        return await self._find_lines(document_id, {"page_number": {"$gte": start_page, "$lte": end_page}}, sort=PAGE_ORDER)
+
+    async def get_line(self, document_id, global_line_number):
+        return await self.db.document_lines.find_one(
+            {"document_id": ObjectId(document_id), "global_line_number": global_line_number},
+            LINE_PROJECTION
+        )
+
+    async def get_line_ranges(self, document_id, ranges):
+        if len(ranges) == 1:
+            (start, end), = ranges
+            return await self._find_lines(document_id, {"global_line_number": {"$gte": start, "$lte": end}})
+        return await self._find_lines(document_id, {"$or": [
+            {"global_line_number": {"$gte": start, "$lte": end}} for start, end in ranges
+        ]})
+
+    async def line_stats(self, document_id):
+        query = {"document_id": ObjectId(document_id)}
+        last_page = await self.db.document_lines.find_one(query, {"_id": 0, "page_number": 1}, sort=[("page_number", -1)])
+        return {
+            "page_count": last_page["page_number"] if last_page else 0,
+            "line_count": await self.db.document_lines.count_documents(query)
+        }
+
+    # --- search ---
+    async def insert_terms(self, entries):
+        await self.db.document_terms.insert_many(entries)
+
+    async def search_index(self, document_id, cached):
+        if cached is None:
+            return None
+        entries = await self.db.document_terms.find({"document_id": ObjectId(document_id)}, TERM_PROJECTION).to_list(None)
+        return build_search_index(entries, cached.lines)
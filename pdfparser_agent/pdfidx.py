@@ -0,0 +1,293 @@
+"""
+Compact document index files (.pdfidx), read through mmap.
+
+A fully ingested document held as line dicts costs hundreds of bytes of Python objects per line. A
+.pdfidx file holds the same lines as one UTF-8 text buffer plus fixed-width tables, and PDFIndex
+serves page, line and range lookups by slicing the mapped file, decoding only the lines asked for.
+The mapping is read-only and backed by the OS page cache, so every process serving the same
+document shares one copy.
+
+Layout (little-endian, sections 8-byte aligned):
+    header       magic, version, line_count, page_count
+    offsets      line_count + 1 uint64: byte offset of each line in the text buffer, plus its end
+    globals      line_count uint32: global_line_number of each line, ascending
+    page_starts  page_count + 1 uint32: index of the first line of each page, plus line_count
+    text         the UTF-8 text of every line, concatenated
+
+Files are named after the content hash and processing type, so one file serves every ingestion of
+the same PDF, whichever database holds it. Ingestions without a content hash (use_cache=False, or
+records from before content hashing) get no file: their ids are only unique within one database, so
+a name built from them could collide between databases sharing PDFIDX_DIR. PDFIDX_DIR sets the
+directory; an empty PDFIDX_DIR disables index files.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional
+
+PDFIDX_DIR = os.environ.get("PDFIDX_DIR", os.path.expanduser("~/.cache/pdfparser-agent/index"))
+
+MAGIC = b"PDFIDX\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+_LITTLE_ENDIAN = array("I", [1]).tobytes()[0] == 1
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _little_endian(table: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        table = array(table.typecode, table)
+        table.byteswap()
+    return table.tobytes()
+
+
+def index_path(content_hash: Optional[str], processing_type: str) -> Optional[str]:
+    """Where the index of an ingestion lives, or None when it has none (see module docstring) or index files are disabled."""
+    if not PDFIDX_DIR or not content_hash:
+        return None
+    return os.path.join(PDFIDX_DIR, f"{content_hash}-{processing_type}.pdfidx")
+
+
+def record_index_path(record: Dict[str, Any]) -> Optional[str]:
+    return index_path(record.get("content_hash"), record.get("processing_type"))
+
+
+class PDFIndexWriter:
+    """
+    Streams pages into a .pdfidx file. Text goes straight to a spool file, so only the offset tables
+    (12 bytes per line) are held in memory. Nothing is visible at path until close() succeeds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._spool = tempfile.TemporaryFile(dir=directory)
+        self.offsets = array("Q", [0])
+        self.globals = array("I")
+        self.page_starts = array("I")
+
+    def add_page(self, lines: Iterable[Dict[str, Any]]):
+        """Append the next page: its lines in order, as document_lines records."""
+        self.page_starts.append(len(self.globals))
+        for line in lines:
+            data = line["text"].encode("utf-8")
+            self._spool.write(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+            if self.globals and line["global_line_number"] <= self.globals[-1]:
+                raise ValueError("lines must be added in ascending global_line_number order")
+            self.globals.append(line["global_line_number"])
+
+    def close(self, page_count: Optional[int] = None):
+        """Write the file. page_count may exceed the pages added when trailing pages have no text."""
+        while page_count is not None and len(self.page_starts) < page_count:
+            self.page_starts.append(len(self.globals))
+        page_starts = self.page_starts + array("I", [len(self.globals)])
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(self.globals), len(self.page_starts)).ljust(_padded(HEADER.size), b"\0"))
+                for table in (self.offsets, self.globals, page_starts):
+                    data = _little_endian(table)
+                    f.write(data.ljust(_padded(len(data)), b"\0"))
+                self._spool.seek(0)
+                while True:
+                    chunk = self._spool.read(1 << 20)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            # Readers in other processes only ever see a complete file
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        finally:
+            self._spool.close()
+
+    def abort(self):
+        self._spool.close()
+
+
+def write_index(path: str, lines: Iterable[Dict[str, Any]], page_count: Optional[int] = None):
+    """Write a .pdfidx file from document_lines records ordered by global line number."""
+    writer = PDFIndexWriter(path)
+    try:
+        page, page_lines = 1, []
+        for line in lines:
+            while line["page_number"] > page:
+                writer.add_page(page_lines)
+                page, page_lines = page + 1, []
+            page_lines.append(line)
+        writer.add_page(page_lines)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close(page_count)
+
+
+class _Lines(Sequence):
+    """Read-only sequence of line dicts over a PDFIndex, built on access."""
+
+    def __init__(self, index: "PDFIndex", start: int = 0, stop: Optional[int] = None):
+        self.index = index
+        self.start = start
+        self.stop = index.line_count if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            return _Lines(self.index, self.start + start, self.start + max(start, stop))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("line index out of range")
+        return self.index._line(self.start + i)
+
+    def __iter__(self):
+        for start in range(self.start, self.stop, 1024):
+            yield from self.index._slice(start, min(self.stop, start + 1024))
+
+
+class PDFIndex:
+    """
+    A document served from a memory-mapped .pdfidx file, with the lookup API of db.CachedDocument.
+    Line dicts are built per lookup; nothing but the mapping is kept.
+    """
+
+    # Line cache accounting: the lines live in the shared page cache, not in this process
+    resident_lines = 0
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map_tables()
+        except Exception:
+            self._mmap.close()
+            raise
+        self.search_index = None
+
+    def _map_tables(self):
+        """Check the header and the file's size against it, then map the tables. Raises ValueError on a damaged file."""
+        size = len(self._mmap)
+        if size < HEADER.size:
+            raise ValueError(f"{self.path} is truncated")
+        magic, version, self.line_count, self.page_count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} .pdfidx file")
+        if not _LITTLE_ENDIAN:
+            raise ValueError(".pdfidx files can only be mapped on little-endian machines")
+        position = _padded(HEADER.size)
+        spans = []
+        for typecode, count in (("Q", self.line_count + 1), ("I", self.line_count), ("I", self.page_count + 1)):
+            length = count * array(typecode).itemsize
+            spans.append((typecode, position, length))
+            position += _padded(length)
+        if size < position:
+            raise ValueError(f"{self.path} is truncated")
+        view = memoryview(self._mmap)
+        tables = [view[start:start + length].cast(typecode) for typecode, start, length in spans]
+        offsets, _, page_starts = tables
+        if size - position < offsets[-1] or page_starts[-1] != self.line_count:
+            for table in tables:
+                table.release()
+            view.release()
+            raise ValueError(f"{self.path} is truncated")
+        self.offsets, self.global_numbers, self.page_starts = tables
+        self._text_start = position
+
+    @property
+    def lines(self) -> Sequence:
+        return _Lines(self)
+
+    def _text(self, i: int) -> str:
+        start = self._text_start
+        return str(self._mmap[start + self.offsets[i]:start + self.offsets[i + 1]], "utf-8")
+
+    def _line(self, i: int) -> Dict[str, Any]:
+        page = bisect_right(self.page_starts, i)
+        return {
+            "page_number": page,
+            "line_num_on_page": i - self.page_starts[page - 1] + 1,
+            "global_line_number": self.global_numbers[i],
+            "text": self._text(i),
+        }
+
+    def _slice(self, i: int, j: int) -> List[Dict[str, Any]]:
+        """Lines i..j-1 (by position), decoded from one contiguous slice of the text buffer."""
+        if i >= j:
+            return []
+        offsets = self.offsets[i:j + 1].tolist()
+        data = self._mmap[self._text_start + offsets[0]:self._text_start + offsets[-1]]
+        page = bisect_right(self.page_starts, i)
+        page_start, next_start = self.page_starts[page - 1], self.page_starts[page]
+        out = []
+        for k, global_line_number in enumerate(self.global_numbers[i:j].tolist(), i):
+            while k >= next_start:
+                page += 1
+                page_start, next_start = next_start, self.page_starts[page]
+            out.append({
+                "page_number": page,
+                "line_num_on_page": k - page_start + 1,
+                "global_line_number": global_line_number,
+                "text": str(data[offsets[k - i] - offsets[0]:offsets[k - i + 1] - offsets[0]], "utf-8"),
+            })
+        return out
+
+    def page_lines(self, page_number: int) -> List[Dict[str, Any]]:
+        if not 1 <= page_number <= self.page_count:
+            return []
+        return self._slice(self.page_starts[page_number - 1], self.page_starts[page_number])
+
+    def page_range(self, start_page: int, end_page: int) -> List[Dict[str, Any]]:
+        start_page, end_page = max(start_page, 1), min(end_page, self.page_count)
+        if start_page > end_page:
+            return []
+        return self._slice(self.page_starts[start_page - 1], self.page_starts[end_page])
+
+    def line(self, global_line_number: int) -> Optional[Dict[str, Any]]:
+        i = bisect_left(self.global_numbers, global_line_number)
+        if i < self.line_count and self.global_numbers[i] == global_line_number:
+            return self._line(i)
+        return None
+
+    def line_range(self, start: int, end: int) -> List[Dict[str, Any]]:
+        return self._slice(bisect_left(self.global_numbers, start), bisect_right(self.global_numbers, end))
+
+    def stats(self) -> Dict[str, int]:
+        return {"page_count": self.page_count, "line_count": self.line_count}
+
+    def text_of(self, global_line_number: int) -> str:
+        return self._text(bisect_left(self.global_numbers, global_line_number))
+
+
+def open_index(path: Optional[str]) -> Optional[PDFIndex]:
+    """The PDFIndex at path, or None when there is no usable file there."""
+    if not path:
+        return None
+    try:
+        return PDFIndex(path)
+    except (OSError, ValueError, TypeError, struct.error):
+        return None
+
+
+def remove_index(path: Optional[str]):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
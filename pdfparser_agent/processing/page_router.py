@@ -0,0 +1,187 @@
+"""
+Page-level processor routing for ProcessBudget.
+
+Every page is profiled in the same pdfplumber pass that extracts its text (see _profile_page) and
+classified:
+    text     a usable text layer (or nothing on the page at all): pdfplumber's lines are kept
+    scanned  images but no usable text layer: needs OCR
+    mixed    a text layer next to large images such as figures or tables as pictures: needs a
+             layout-aware processor
+The budget maps the scanned and mixed classes to processors, so text-native pages never leave the
+fast path. Mixed pages already have a usable text layer, so they are only routed with
+PAGE_ROUTE_MIXED=1, and a class whose processor is still a stand-in (see pdf_processing.py) keeps
+its pdfplumber lines. Routed pages run on a thread pool (the processors are remote services) while
+the remaining pages keep streaming, and pages are still yielded in order. Each processor result is
+cached on disk by (content hash, processor and implementation, page), so re-ingesting a file never
+pays for the same page twice and a newly registered processor never serves an older one's output.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .pdf_processing import (
+    ProcessBudget,
+    _iter_pages,
+    hash_pdf,
+    process_pdf_adobeocr,
+    process_pdf_comprehend,
+    process_pdf_docint,
+    process_pdf_docint_4o_mini,
+    process_pdf_dolphin,
+    process_pdf_mistralocr,
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", os.path.expanduser("~/.cache/pdfparser-agent/pages"))
+# Routed pages processed concurrently, and how far the text pages may run ahead of a slow one
+PAGE_PROCESSOR_CONCURRENCY = int(os.environ.get("PAGE_PROCESSOR_CONCURRENCY", "8"))
+PAGE_ROUTER_WINDOW = int(os.environ.get("PAGE_ROUTER_WINDOW", "64"))
+PAGE_ROUTE_MIXED = os.environ.get("PAGE_ROUTE_MIXED", "0") == "1"
+
+# Classification thresholds
+MIN_TEXT_CHARS = int(os.environ.get("PAGE_MIN_TEXT_CHARS", "25"))
+# Characters per 1000 pt²; a page of body text has about 6, a title page about 0.3
+MIN_CHAR_DENSITY = float(os.environ.get("PAGE_MIN_CHAR_DENSITY", "0.2"))
+SCAN_IMAGE_COVERAGE = 0.6
+MIXED_IMAGE_COVERAGE = 0.2
+MAX_UNREADABLE = 0.1
+
+TEXT, SCANNED, MIXED = "text", "scanned", "mixed"
+
+PAGE_PROCESSORS: Dict[str, Callable[[str, int], List[str]]] = {
+    "adobeocr": process_pdf_adobeocr,
+    "docint_4o_mini": process_pdf_docint_4o_mini,
+    "docint": process_pdf_docint,
+    "dolphin": process_pdf_dolphin,
+    "mistralocr": process_pdf_mistralocr,
+    "comprehend": process_pdf_comprehend,
+}
+
+# Version of each registered processor's output, part of its page cache key
+PROCESSOR_VERSIONS: Dict[str, str] = {}
+
+# Page class -> processor, per budget; classes without an entry stay on pdfplumber (see active_routes)
+BUDGET_ROUTES: Dict[ProcessBudget, Dict[str, str]] = {
+    ProcessBudget.LOW: {},
+    ProcessBudget.FREE: {SCANNED: "comprehend"},
+    ProcessBudget.MEDIUM: {SCANNED: "docint_4o_mini", MIXED: "docint_4o_mini"},
+    ProcessBudget.HIGH: {SCANNED: "adobeocr", MIXED: "docint"},
+    ProcessBudget.PROFESSIONAL: {SCANNED: "dolphin", MIXED: "dolphin"},
+}
+
+
+def register_processor(name: str, func: Callable[[str, int], List[str]], version: str = ""):
+    """
+    Install func(pdf_path, page_num) -> lines as the processor called name (e.g. a real OCR client).
+    Pages are cached per implementation; change version when the same func starts returning other lines.
+    """
+    PAGE_PROCESSORS[name] = func
+    PROCESSOR_VERSIONS[name] = version
+
+
+def active_routes(budget: ProcessBudget) -> Dict[str, str]:
+    """The budget's routes that apply: mixed pages only with PAGE_ROUTE_MIXED, never to a stand-in processor."""
+    return {
+        page_class: processor for page_class, processor in BUDGET_ROUTES.get(ProcessBudget(budget), {}).items()
+        if (page_class != MIXED or PAGE_ROUTE_MIXED) and not getattr(PAGE_PROCESSORS[processor], "stub", False)
+    }
+
+
+def classify_page(profile: Dict[str, float]) -> str:
+    """TEXT, SCANNED or MIXED for a page profile from _profile_page."""
+    if profile["unreadable"] > MAX_UNREADABLE:
+        return SCANNED
+    sparse = profile["chars"] < MIN_TEXT_CHARS or profile["density"] < MIN_CHAR_DENSITY
+    if profile["image_coverage"] >= SCAN_IMAGE_COVERAGE:
+        # A page-sized image is a scan, unless an OCR text layer already covers it
+        return SCANNED if sparse else TEXT
+    if profile["image_coverage"] >= MIXED_IMAGE_COVERAGE:
+        return MIXED
+    return TEXT
+
+
+# --- Per-page result cache ---
+def _implementation(processor: str) -> str:
+    func = PAGE_PROCESSORS[processor]
+    name = f"{func.__module__}.{func.__qualname__}:{PROCESSOR_VERSIONS.get(processor, '')}"
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:12]
+
+
+def _cache_path(content_hash: str, processor: str, page_num: int) -> Optional[str]:
+    if not PAGE_CACHE_DIR or not content_hash or getattr(PAGE_PROCESSORS[processor], "stub", False):
+        return None
+    return os.path.join(PAGE_CACHE_DIR, content_hash, f"{processor}-{_implementation(processor)}-{page_num}.json")
+
+
+def _load_cached(path: Optional[str]) -> Optional[List[str]]:
+    if path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached(path: Optional[str], lines: List[str]):
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(lines, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Could not cache page result at %s", path, exc_info=True)
+
+
+def process_page(pdf_path: str, page_num: int, processor: str, content_hash: Optional[str] = None) -> List[str]:
+    """Run one processor on one page, through the per-page cache (stand-in output is never cached)."""
+    path = _cache_path(content_hash, processor, page_num)
+    lines = _load_cached(path)
+    if lines is None:
+        lines = list(PAGE_PROCESSORS[processor](pdf_path, page_num))
+        _store_cached(path, lines)
+    return lines
+
+
+def route_pages(pdf_path: str, budget: ProcessBudget, workers: int = 1, content_hash: Optional[str] = None,
+                pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Yield (page_num, lines) in page order, for every page or only the given page numbers, each page's
+    lines coming from pdfplumber or from the processor the budget routes its class to.
+    """
+    routes = active_routes(budget)
+    if not routes:
+        # Nothing to route: skip profiling altogether
+        for page_num, lines, _ in _iter_pages(pdf_path, workers, pages=pages):
+            yield page_num, lines
+        return
+    if content_hash is None and PAGE_CACHE_DIR:
+        content_hash = hash_pdf(pdf_path)
+    counts = {}
+    with ThreadPoolExecutor(max_workers=PAGE_PROCESSOR_CONCURRENCY) as executor:
+        pending = deque()
+        for page_num, lines, profile in _iter_pages(pdf_path, workers, with_profile=True, pages=pages):
+            page_class = classify_page(profile)
+            counts[page_class] = counts.get(page_class, 0) + 1
+            processor = routes.get(page_class)
+            if processor is not None:
+                lines = executor.submit(process_page, pdf_path, page_num, processor, content_hash)
+            pending.append((page_num, lines))
+            # Hand over every page that is done; wait for the oldest once the window is full
+            while pending and (len(pending) > PAGE_ROUTER_WINDOW or not isinstance(pending[0][1], Future) or pending[0][1].done()):
+                page_num, result = pending.popleft()
+                yield page_num, result.result() if isinstance(result, Future) else result
+        while pending:
+            page_num, result = pending.popleft()
+            yield page_num, result.result() if isinstance(result, Future) else result
+    logger.debug("Routed %s with budget %s: %s", pdf_path, ProcessBudget(budget).value, counts)
@@ -1,4 +1,12 @@
+import hashlib
+import logging
+import os
 from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 class ProcessBudget(str, Enum):
     HIGH = "high"
@@ -7,66 +15,259 @@ class ProcessBudget(str, Enum):
     PROFESSIONAL = "professional"
     FREE = "free"
 
-def process_pdf_adobeocr(pdf_path: str):
-    """Stub: Process PDF using Adobe OCR (placeholder)."""
-    return f"[AdobeOCR] Processed {pdf_path}"
+# Expensive per-page processors. Each takes the PDF path and a 1-based page number and returns the
+# page's text lines. These are local stand-ins; page_router.register_processor installs real ones.
+def _stub_page(name: str, pdf_path: str, page_num: int) -> List[str]:
+    return [f"[{name}] {os.path.basename(pdf_path)} page {page_num}"]
+
+def process_pdf_adobeocr(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using Adobe OCR (placeholder)."""
+    return _stub_page("AdobeOCR", pdf_path, page_num)
+
+def process_pdf_docint_4o_mini(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using DocInt 4o Mini (placeholder)."""
+    return _stub_page("DocInt 4o Mini", pdf_path, page_num)
+
+def process_pdf_docint(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using DocInt (placeholder)."""
+    return _stub_page("DocInt", pdf_path, page_num)
 
-def process_pdf_docint_4o_mini(pdf_path: str):
-    """Stub: Process PDF using DocInt 4o Mini (placeholder)."""
-    return f"[DocInt 4o Mini] Processed {pdf_path}"
+def process_pdf_dolphin(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using Dolphin (placeholder)."""
+    return _stub_page("Dolphin", pdf_path, page_num)
 
-def process_pdf_docint(pdf_path: str):
-    """Stub: Process PDF using DocInt (placeholder)."""
-    return f"[DocInt] Processed {pdf_path}"
+def process_pdf_mistralocr(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using MistralOCR (placeholder)."""
+    return _stub_page("MistralOCR", pdf_path, page_num)
 
-def process_pdf_dolphin(pdf_path: str):
-    """Stub: Process PDF using Dolphin (placeholder)."""
-    return f"[Dolphin] Processed {pdf_path}"
+def process_pdf_comprehend(pdf_path: str, page_num: int) -> List[str]:
+    """Stub: Process a page using Comprehend (placeholder)."""
+    return _stub_page("Comprehend", pdf_path, page_num)
 
-def process_pdf_mistralocr(pdf_path: str):
-    """Stub: Process PDF using MistralOCR (placeholder)."""
-    return f"[MistralOCR] Processed {pdf_path}"
+# Stand-ins are never routed to: pages keep their pdfplumber lines until a real processor is registered
+for _stub in (process_pdf_adobeocr, process_pdf_docint_4o_mini, process_pdf_docint, process_pdf_dolphin,
+              process_pdf_mistralocr, process_pdf_comprehend):
+    _stub.stub = True
 
-def process_pdf_comprehend(pdf_path: str):
-    """Stub: Process PDF using Comprehend (placeholder)."""
-    return f"[Comprehend] Processed {pdf_path}"
+def hash_pdf(pdf_path: str, block_size: int = 1 << 20) -> str:
+    """Streaming SHA-256 of the file contents, used as the content address of an ingestion."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-def process_pdf_pypdf_pdfplumber(pdf_path: str):
+def _stream_bytes(obj) -> bytes:
+    try:
+        return obj.get_data()
+    except Exception:
+        # Unsupported filters: the encoded bytes identify the stream just as well
+        return getattr(obj, "_data", b"") or b""
+
+def _digest_object(obj, digest, memo: Dict):
     """
-    Process PDF using pdfplumber. Returns a list of dicts with page_num, line_num_on_page, global_line_num, and text for each line.
+    Feed a PDF object into digest. Indirect objects are digested once per file and contribute their
+    digest, so fonts and images shared by many pages are read once; /Parent links are not followed.
     """
+    from PyPDF2.generic import IndirectObject, StreamObject
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key not in memo:
+            memo[key] = b""  # breaks reference cycles
+            sub = hashlib.sha256()
+            _digest_object(obj.get_object(), sub, memo)
+            memo[key] = sub.digest()
+        digest.update(memo[key])
+    elif isinstance(obj, dict):
+        if isinstance(obj, StreamObject):
+            digest.update(_stream_bytes(obj))
+        for name in sorted(obj):
+            if name != "/Parent":
+                digest.update(name.encode("utf-8", "replace"))
+                # dict.__getitem__ keeps indirect references unresolved, so they hit the memo
+                _digest_object(dict.__getitem__(obj, name), digest, memo)
+    elif isinstance(obj, list):
+        for item in list.__iter__(obj):
+            _digest_object(item, digest, memo)
+    else:
+        digest.update(repr(obj).encode("utf-8", "replace"))
+
+# Page attributes a page takes from its nearest /Pages ancestor when it does not set them itself
+INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+def _page_tree(node, inherited: Dict, seen: set):
+    """
+    Yield (page, inherited attributes) for every page under a page tree node, in page order. The
+    tree is walked here rather than through PdfReader.pages, whose flattening copies inherited
+    attributes into the page objects and lets one subtree's values leak into its later siblings.
+    """
+    key = (node.idnum, node.generation) if hasattr(node, "idnum") else None
+    if key is not None:
+        if key in seen:
+            return
+        seen.add(key)
+    obj = node.get_object()
+    if obj.get("/Type") == "/Page" or "/Kids" not in obj:
+        yield obj, inherited
+        return
+    scope = dict(inherited)
+    scope.update((name, dict.__getitem__(obj, name)) for name in INHERITABLE_PAGE_ATTRIBUTES if name in obj)
+    for kid in list.__iter__(obj["/Kids"]):
+        yield from _page_tree(kid, scope, seen)
+
+def _digest_page(page, inherited: Dict, memo: Dict) -> str:
+    """Digest of what a page's text is drawn from: its content streams, geometry and (inherited) resources."""
+    digest = hashlib.sha256()
+    for name in ("/Contents",) + INHERITABLE_PAGE_ATTRIBUTES:
+        digest.update(name.encode())
+        _digest_object(dict.get(page, name, inherited.get(name)), digest, memo)
+    return digest.hexdigest()[:32]
+
+def page_fingerprints(pdf_path: str) -> Optional[List[str]]:
+    """
+    One digest per page, in page order, of its content streams and the resources they use. Pages with
+    equal digests extract to the same lines, so a new revision of a file only needs its changed pages
+    re-extracted. None if the file cannot be fingerprinted (the caller then falls back to a full ingest).
+    """
+    from PyPDF2 import PdfReader
+    try:
+        memo = {}
+        root = PdfReader(pdf_path).trailer["/Root"]
+        return [_digest_page(page, inherited, memo) for page, inherited in _page_tree(dict.__getitem__(root.get_object(), "/Pages"), {}, set())]
+    except Exception:
+        logger.warning("Could not fingerprint the pages of %s", pdf_path, exc_info=True)
+        return None
+
+def _count_pages(pdf_path: str) -> int:
+    """Return the number of pages in the PDF without extracting any text."""
     import pdfplumber
-    result = []
-    global_line = 1
     with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, 1):
-            text = page.extract_text() or ""
-            lines = text.splitlines()
-            for line_num_on_page, line in enumerate(lines, 1):
-                result.append({
-                    "page_num": page_num,
-                    "line_num_on_page": line_num_on_page,
-                    "global_line_num": global_line,
-                    "text": line
-                })
-                global_line += 1
-    return result
-
-def load_pdf_with_budget(pdf_path: str, budget: ProcessBudget):
-    """
-    Load/process the PDF using the appropriate processor(s) based on the ProcessBudget.
-    Returns a string indicating which processor was used (stub).
-    """
-    return process_pdf_pypdf_pdfplumber(pdf_path);
-    if budget == ProcessBudget.HIGH:
-        return process_pdf_adobeocr(pdf_path)
-    elif budget == ProcessBudget.MEDIUM:
-        return process_pdf_docint_4o_mini(pdf_path)
-    elif budget == ProcessBudget.LOW:
-        return process_pdf_pypdf_pdfplumber(pdf_path)
-    elif budget == ProcessBudget.PROFESSIONAL:
-        return process_pdf_dolphin(pdf_path)
-    elif budget == ProcessBudget.FREE:
-        return process_pdf_comprehend(pdf_path)
-    else:
-        return process_pdf_pypdf_pdfplumber(pdf_path)
+        return len(pdf.pages)
+
+def _page_chunks(page_count: int, workers: int, chunk_size: int = None):
+    """
+    Split pages 1..page_count into contiguous (start_page, end_page) ranges, inclusive.
+    Without an explicit chunk_size, aim for ~4 chunks per worker so slow pages even out.
+    """
+    if not chunk_size:
+        chunk_size = max(1, -(-page_count // (workers * 4)))
+    return [(start, min(start + chunk_size - 1, page_count)) for start in range(1, page_count + 1, chunk_size)]
+
+def _profile_page(page, text: str) -> Dict[str, Any]:
+    """
+    Cheap facts about a page that tell whether its text layer can be trusted: characters in the
+    text layer, their density (per 1000 pt²), the fraction of the page covered by images and the
+    fraction of glyphs that did not map to text. Uses only objects extract_text already parsed.
+    """
+    area = float(page.width * page.height) or 1.0
+    covered = 0.0
+    for image in page.images:
+        width = min(image["x1"], page.width) - max(image["x0"], 0)
+        height = min(image["bottom"], page.height) - max(image["top"], 0)
+        covered += max(0.0, width) * max(0.0, height)
+    chars = len(page.chars)
+    return {
+        "chars": chars,
+        "density": chars * 1000 / area,
+        "images": len(page.images),
+        "image_coverage": min(1.0, covered / area),
+        "unreadable": (text.count("(cid:") + text.count("\ufffd")) / chars if chars else 0.0,
+    }
+
+def _extract_page(page, with_profile: bool = False):
+    text = page.extract_text() or ""
+    return text.splitlines(), _profile_page(page, text) if with_profile else None
+
+def _extract_pages(pdf_path: str, page_nums: Iterable[int], with_profile: bool = False):
+    """
+    Extract the text lines of the given pages (1-based, ascending).
+    Returns a list of (page_num, lines, profile) tuples; profile is None unless with_profile.
+    Runs inside pool workers, so it opens its own handle.
+    """
+    import pdfplumber
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num in page_nums:
+            pages.append((page_num, *_extract_page(pdf.pages[page_num - 1], with_profile)))
+    return pages
+
+def _extract_page_range(pdf_path: str, start_page: int, end_page: int, with_profile: bool = False):
+    """Extract pages start_page..end_page (1-based, inclusive); see _extract_pages."""
+    return _extract_pages(pdf_path, range(start_page, end_page + 1), with_profile)
+
+def _iter_pages(pdf_path: str, workers: int = 1, chunk_size: int = None, with_profile: bool = False,
+                pages: Optional[Iterable[int]] = None):
+    """
+    Yield (page_num, lines, profile) in page order, for every page or only the given page numbers.
+    The sequential path keeps one pdfplumber handle open; the parallel path keeps at most 2 chunks
+    per worker in flight so memory stays bounded.
+    """
+    page_nums = sorted(set(pages)) if pages is not None else list(range(1, _count_pages(pdf_path) + 1))
+    if workers <= 1 or len(page_nums) <= 1:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num in page_nums:
+                yield (page_num, *_extract_page(pdf.pages[page_num - 1], with_profile))
+        return
+    chunks = deque(page_nums[start - 1:end] for start, end in _page_chunks(len(page_nums), workers, chunk_size))
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        in_flight = deque()
+        while chunks or in_flight:
+            while chunks and len(in_flight) < workers * 2:
+                in_flight.append(executor.submit(_extract_pages, pdf_path, chunks.popleft(), with_profile))
+            # Futures are consumed in submission order, i.e. in page order
+            for page in in_flight.popleft().result():
+                yield page
+
+def _number_lines(pages):
+    """Turn (page_num, lines) pairs, in page order, into per-page lists of structured line dicts."""
+    global_line = 1
+    for page_num, lines in pages:
+        page_lines = []
+        for line_num_on_page, line in enumerate(lines, 1):
+            page_lines.append({
+                "page_num": page_num,
+                "line_num_on_page": line_num_on_page,
+                "global_line_num": global_line,
+                "text": line
+            })
+            global_line += 1
+        yield page_lines
+
+def iter_pdf_pypdf_pdfplumber(pdf_path: str, workers: int = 1, chunk_size: int = None):
+    """
+    Stream the PDF through pdfplumber page by page. Yields one list per page holding dicts with
+    page_num, line_num_on_page, global_line_num, and text (empty list for pages without text).
+    With workers > 1 the pages are extracted in a process pool; global_line_num is still assigned
+    in page order, so it is identical to the sequential run.
+    """
+    return _number_lines((page_num, lines) for page_num, lines, _ in _iter_pages(pdf_path, workers, chunk_size))
+
+def process_pdf_pypdf_pdfplumber(pdf_path: str, workers: int = 1, chunk_size: int = None):
+    """
+    Process PDF using pdfplumber. Returns a list of dicts with page_num, line_num_on_page, global_line_num, and text for each line.
+    With workers > 1 the pages are split into page-range chunks and extracted in a process pool.
+    """
+    return [line for page_lines in iter_pdf_pypdf_pdfplumber(pdf_path, workers, chunk_size) for line in page_lines]
+
+def load_pdf_with_budget(pdf_path: str, budget: ProcessBudget, workers: int = 1, content_hash: str = None):
+    """
+    Load/process the PDF with the processors the budget routes each page to (see page_router.py).
+    Returns a list of dicts with page_num, line_num_on_page, global_line_num, and text for each line.
+    """
+    return [line for page_lines in iter_pdf_with_budget(pdf_path, budget, workers, content_hash) for line in page_lines]
+
+def iter_pdf_with_budget(pdf_path: str, budget: ProcessBudget, workers: int = 1, content_hash: str = None):
+    """
+    Streaming counterpart of load_pdf_with_budget: yields the structured lines one page at a time.
+    Text-native pages come from pdfplumber; pages without a usable text layer go to the budget's
+    processors. ProcessBudget.LOW keeps every page on pdfplumber.
+    """
+    from .page_router import route_pages
+    return _number_lines(route_pages(pdf_path, budget, workers, content_hash))
+
+def extract_pages_with_budget(pdf_path: str, budget: ProcessBudget, pages: Iterable[int], workers: int = 1,
+                              content_hash: str = None) -> Dict[int, List[str]]:
+    """Text lines of the given pages only, routed like iter_pdf_with_budget; used to re-extract the changed pages of a revision."""
+    from .page_router import route_pages
+    return dict(route_pages(pdf_path, budget, workers, content_hash, pages=pages))
@@ -0,0 +1,223 @@
+"""
+Size-aware rendering of tool output.
+
+Every tool result lands in the model's context, so each render is bounded by a character budget:
+max_chars per call, else RENDER_MAX_CHARS, else RENDER_MAX_TOKENS converted at CHARS_PER_TOKEN
+(0 means unbounded). Output is cut at whole lines and the cut is reported in a footer with the number
+of lines and characters left out and a continuation token that renders the remainder on the next
+call. Tokens name what is left ("page:12:41" is page 12 from line 41 on, "lines:41:60" a line span,
+"memory:37" the clipped memory from its 37th line), so they need no server-side state.
+
+RENDER_MODE selects the layout: "framed" (the boxed markdown page) or "compact" (a one-line header
+and "line: text" rows, with no decorative frame). Rendering is a pure function of its inputs, so
+the same content, budget and mode always give the same bytes and prompt prefixes stay cacheable.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .instrumentation import record_truncation
+
+CHARS_PER_TOKEN = 4
+RENDER_MAX_CHARS = int(os.environ.get("RENDER_MAX_CHARS") or int(os.environ.get("RENDER_MAX_TOKENS", "2000")) * CHARS_PER_TOKEN)
+RENDER_MODE = os.environ.get("RENDER_MODE", "framed")
+# Lines shown above a highlighted line when the budget forces the page window to start past the top
+FOCUS_CONTEXT_LINES = 3
+
+# Characters set aside for a truncation note, and the least of a line kept when one line alone exceeds the budget
+NOTE_CHARS = 88
+MIN_LINE_CHARS = 80
+# The least budget a page of a multi-page read gets; pages that would get less are left for another call
+MIN_PAGE_CHARS = 600
+
+FRAMED, COMPACT = "framed", "compact"
+_RULE = "-" * 42
+_BLANK = "|                                        |"
+
+
+def char_budget(max_chars: Optional[int] = None) -> int:
+    """The character budget of one render; 0 means unbounded."""
+    return RENDER_MAX_CHARS if max_chars is None else max(0, max_chars)
+
+
+def _mode(mode: Optional[str]) -> str:
+    mode = mode or RENDER_MODE
+    if mode not in (FRAMED, COMPACT):
+        raise ValueError(f"Unknown render mode {mode!r}, expected {FRAMED!r} or {COMPACT!r}")
+    return mode
+
+
+def _row(line: Dict[str, Any], mode: str, marker: str = "") -> str:
+    g = line["global_line_number"]
+    prefix = f"{g}:" if mode == COMPACT else f"|{g:03}|"
+    return f"{prefix} {marker}{line['text']}"
+
+
+def _fit(rows: List[str], budget: int, overhead: int) -> int:
+    """How many leading rows fit in budget next to overhead characters. At least one, unless there are none."""
+    if not budget:
+        return len(rows)
+    used = overhead
+    for count, row in enumerate(rows):
+        used += len(row) + 1
+        if used > budget:
+            return max(count, 1)
+    return len(rows)
+
+
+def _clip_row(row: str, budget: int, overhead: int) -> str:
+    """A single row wider than the whole budget is cut rather than dropped."""
+    room = max(budget - overhead - 1, MIN_LINE_CHARS)
+    if budget and len(row) > room:
+        return row[:room - 1] + "…"
+    return row
+
+
+def _note(lines: int, chars: int, call: str, where: str) -> str:
+    return f"[{lines} {where} line{'s' if lines != 1 else ''} ({chars} chars) not shown: {call}]"
+
+
+def _cut_note(rows: List[str], start: int, stop: int, call: str, where: str) -> str:
+    return _note(stop - start, sum(len(r) + 1 for r in rows[start:stop]), call, where)
+
+
+def parse_continuation(token: str) -> Tuple[str, List[int]]:
+    """Split a continuation token into its kind and integer arguments. Raises ValueError if malformed."""
+    kind, _, rest = str(token).strip().partition(":")
+    args = [int(part) for part in rest.split(":")] if rest else []
+    expected = {"page": 2, "lines": 2, "memory": 1}
+    if expected.get(kind) != len(args):
+        raise ValueError(f"Invalid continuation token {token!r}")
+    return kind, args
+
+
+def render_page(page_num: int, total_pages: int, lines: List[Dict[str, Any]],
+                highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None,
+                highlight_total: Optional[int] = None, max_chars: Optional[int] = None,
+                mode: Optional[str] = None, continued: bool = False) -> Tuple[str, int, int]:
+    """
+    Render lines of one page. Returns (text, first, stop): lines[first:stop] are the lines shown.
+    continued marks a render that starts past the top of the page (a continuation).
+    A highlighted line is always kept in view, moving the window down the page if need be.
+    """
+    mode = _mode(mode)
+    budget = char_budget(max_chars)
+    of = f" of=\"{highlight_total}\"" if highlight_total else ""
+    rows = [
+        _row(l, mode, f"<highlight match=\"{highlight_match}\"{of}></highlight> " if highlight_lines and l["global_line_number"] in highlight_lines else "")
+        for l in lines
+    ]
+    if mode == COMPACT:
+        header = [f"Page {page_num} of {total_pages}" + (" (continued)" if continued else "")]
+        footer = []
+    else:
+        title = f"Page {page_num} of {total_pages}" + (" (cont.)" if continued else "")
+        header = [_RULE, f"|               {title}             |", _RULE, _BLANK, _BLANK, _BLANK]
+        footer = [_BLANK, _RULE]
+    # Room for the truncation notes is set aside only when the page does not fit
+    overhead = sum(len(r) + 1 for r in header + footer)
+    first, stop = 0, _fit(rows, budget, overhead)
+    if stop < len(rows):
+        overhead += NOTE_CHARS
+        stop = _fit(rows, budget, overhead)
+        focus = next((i for i, l in enumerate(lines) if highlight_lines and l["global_line_number"] in highlight_lines), None)
+        if focus is not None and focus >= stop:
+            overhead += NOTE_CHARS
+            first = max(0, focus - FOCUS_CONTEXT_LINES)
+            stop = first + _fit(rows[first:], budget, overhead)
+            if stop <= focus:
+                first = focus
+                stop = first + _fit(rows[first:], budget, overhead)
+    shown = _shown(rows, first, stop, budget, overhead)
+    out = list(header)
+    if first:
+        start_line, end_line = lines[0]["global_line_number"], lines[first - 1]["global_line_number"]
+        out.append(_cut_note(rows, 0, first, f"goto(continuation=\"lines:{start_line}:{end_line}\")", "earlier"))
+    out.extend(shown)
+    if stop < len(rows):
+        out.append(_cut_note(rows, stop, len(rows), f"goto(continuation=\"page:{page_num}:{lines[stop]['global_line_number']}\")", "more"))
+    out.extend(footer)
+    return "\n".join(out), first, stop
+
+
+def last_page_in_budget(start_page: int, end_page: int, max_chars: Optional[int] = None) -> int:
+    """The last page of start_page..end_page that a multi-page read can render; no need to fetch beyond it."""
+    budget = char_budget(max_chars)
+    if not budget:
+        return end_page
+    return min(end_page, start_page + max(budget // MIN_PAGE_CHARS, 1) - 1)
+
+
+def render_pages(pages: List[Tuple[int, List[Dict[str, Any]]]], total_pages: int, end_page: int,
+                 max_chars: Optional[int] = None, max_chars_per_page: Optional[int] = None,
+                 mode: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Render consecutive pages, given as (page_num, lines), for one read of pages up to end_page. Returns the
+    text and the lines shown. Each page is cut to max_chars_per_page (default: an even share of the budget,
+    at least MIN_PAGE_CHARS); the pages that no longer fit are listed with the call that reads them.
+    """
+    budget = char_budget(max_chars)
+    requested = end_page - pages[0][0] + 1 if pages else 0
+    share = max_chars_per_page or (max(budget // max(requested, 1), MIN_PAGE_CHARS) if budget else 0)
+    remaining = budget
+    out, shown = [], []
+    for page_num, lines in pages:
+        if budget and out and remaining < MIN_PAGE_CHARS:
+            break
+        text, first, stop = render_page(page_num, total_pages, lines, max_chars=min(share, remaining) if budget else share, mode=mode)
+        out.append(text)
+        shown.extend(lines[first:stop])
+        remaining -= len(text) + 1
+    next_page = pages[0][0] + len(out) if pages else end_page + 1
+    if next_page <= end_page:
+        span = f"page {next_page}" if next_page == end_page else f"pages {next_page}-{end_page}"
+        out.append(f"[{span} not shown: read_range(start_page={next_page}, end_page={end_page})]")
+    return "\n".join(out), shown
+
+
+def render_lines(title: str, lines: List[Dict[str, Any]], max_chars: Optional[int] = None,
+                 mode: Optional[str] = None) -> Tuple[str, int]:
+    """Render a span of lines under a title. Returns (text, shown): lines[:shown] are the lines shown."""
+    mode = _mode(mode)
+    budget = char_budget(max_chars)
+    rows = [_row(l, mode) for l in lines]
+    header = [title] if mode == COMPACT else [_RULE, f"|   {title:<37}|", _RULE]
+    footer = [] if mode == COMPACT else [_RULE]
+    overhead = sum(len(r) + 1 for r in header + footer)
+    stop = _fit(rows, budget, overhead)
+    if stop < len(rows):
+        overhead += NOTE_CHARS
+        stop = _fit(rows, budget, overhead)
+    shown = _shown(rows, 0, stop, budget, overhead)
+    out = header + shown
+    if stop < len(rows):
+        token = f"lines:{lines[stop]['global_line_number']}:{lines[-1]['global_line_number']}"
+        out.append(_cut_note(rows, stop, len(rows), f"goto(continuation=\"{token}\")", "more"))
+    out.extend(footer)
+    return "\n".join(out), stop
+
+
+def render_text(rows: List[str], offset: int = 0, max_chars: Optional[int] = None) -> str:
+    """Render plain text rows (the clipped memory) from row offset on; the continuation resumes after the last shown row."""
+    budget = char_budget(max_chars)
+    rows = rows[offset:]
+    overhead = 0
+    stop = _fit(rows, budget, overhead)
+    if stop < len(rows):
+        overhead = NOTE_CHARS
+        stop = _fit(rows, budget, overhead)
+    out = _shown(rows, 0, stop, budget, overhead)
+    if stop < len(rows):
+        out.append(_cut_note(rows, stop, len(rows), f"use_memory(continuation=\"memory:{offset + stop}\")", "more"))
+    return "\n".join(out)
+
+
+def _shown(rows: List[str], first: int, stop: int, budget: int, overhead: int) -> List[str]:
+    """rows[first:stop], a lone row clipped to the budget; counts what is left out in the active query."""
+    shown = rows[first:stop]
+    if len(shown) == 1:
+        shown = [_clip_row(shown[0], budget, overhead)]
+    omitted = sum(len(r) + 1 for r in rows[:first] + rows[stop:]) + sum(len(r) for r in rows[first:stop]) - sum(len(r) for r in shown)
+    if omitted:
+        record_truncation(omitted)
+    return shown
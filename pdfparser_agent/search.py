@@ -0,0 +1,144 @@
+"""
+Inverted-index search over document lines.
+
+Terms are lowercased word tokens. Each term maps to its postings, the (page_number, global_line_number)
+pairs of the lines containing it, in line order. The index only narrows the candidate lines; the
+match predicate itself is the same per-line check next_search_match has always used, so results
+are identical to a linear scan.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+Posting = Tuple[int, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized (lowercased) word terms."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def build_postings(lines: Iterable[Dict]) -> Dict[str, List[Posting]]:
+    """Map every term in lines to the (page_number, global_line_number) postings of the lines containing it."""
+    postings = {}
+    for line in lines:
+        posting = (line["page_number"], line["global_line_number"])
+        for term in set(tokenize(line["text"])):
+            postings.setdefault(term, []).append(posting)
+    return postings
+
+
+def line_matches(text: str, search_term: str, case_sensitive: bool = False, whole_word: bool = False) -> bool:
+    """The match predicate for a single line."""
+    if whole_word:
+        flags = 0 if case_sensitive else re.IGNORECASE
+        return re.search(r"(?<!\w)" + re.escape(search_term) + r"(?!\w)", text, flags) is not None
+    if case_sensitive:
+        return search_term in text
+    return search_term.lower() in text.lower()
+
+
+def scan_lines(lines: Iterable[Dict], search_term: str, case_sensitive: bool = False, whole_word: bool = False) -> List[Posting]:
+    """Linear-scan fallback, used when no index is available or the term has no word characters."""
+    return [
+        (l["page_number"], l["global_line_number"])
+        for l in lines
+        if line_matches(l["text"], search_term, case_sensitive, whole_word)
+    ]
+
+
+class SearchIndex:
+    """An in-memory inverted index over one document."""
+
+    def __init__(self, postings: Dict[str, List[Posting]]):
+        self.postings = postings
+        self._vocabulary = None
+        self._reversed_vocabulary = None
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Dict]) -> "SearchIndex":
+        return cls(build_postings(lines))
+
+    @property
+    def vocabulary(self) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    @property
+    def reversed_vocabulary(self) -> List[str]:
+        """Every term spelled backwards, sorted, so terms ending in a suffix are one range."""
+        if self._reversed_vocabulary is None:
+            self._reversed_vocabulary = sorted(term[::-1] for term in self.postings)
+        return self._reversed_vocabulary
+
+    def _union(self, terms: Iterable[str]) -> Dict[int, int]:
+        """Union of the postings of terms, as {global_line: page}."""
+        found = {}
+        for term in terms:
+            for page, global_line in self.postings[term]:
+                found[global_line] = page
+        return found
+
+    @staticmethod
+    def _prefixed(vocabulary: List[str], prefix: str) -> Iterable[str]:
+        """The terms of a sorted vocabulary starting with prefix."""
+        for i in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+            if not vocabulary[i].startswith(prefix):
+                break
+            yield vocabulary[i]
+
+    def _term_postings(self, predicate: Callable[[str], bool]) -> Dict[int, int]:
+        """Union of the postings of every term satisfying predicate; a pass over the whole vocabulary."""
+        return self._union(term for term in self.vocabulary if predicate(term))
+
+    def candidates(self, search_term: str, whole_word: bool = False) -> Optional[List[Posting]]:
+        """
+        Lines that can possibly match, as sorted postings, or None if the index cannot narrow the
+        search (the term has no word characters). A single whole-word term is a direct lookup; otherwise
+        the query's inner tokens must be whole terms, its first token may end a term and its last
+        token may start one: both are a range of a sorted vocabulary. Only a single-token substring
+        query takes a pass over the vocabulary, and none ever takes one over the lines.
+        """
+        tokens = tokenize(search_term)
+        if not tokens:
+            return None
+        if len(tokens) == 1 and whole_word:
+            return list(self.postings.get(tokens[0], []))
+        sets = []
+        for i, token in enumerate(tokens):
+            if whole_word or 0 < i < len(tokens) - 1:
+                found = {g: p for p, g in self.postings.get(token, [])}
+            elif len(tokens) == 1:
+                found = self._term_postings(lambda term, t=token: t in term)
+            elif i == 0:
+                found = self._union(term[::-1] for term in self._prefixed(self.reversed_vocabulary, token[::-1]))
+            else:
+                found = self._union(self._prefixed(self.vocabulary, token))
+            sets.append(found)
+        sets.sort(key=len)
+        common = sets[0]
+        for other in sets[1:]:
+            common = {g: p for g, p in common.items() if g in other}
+        return sorted((p, g) for g, p in common.items())
+
+    def search(self, search_term: str, text_of: Callable[[int], str], case_sensitive: bool = False,
+               whole_word: bool = False) -> Optional[List[Posting]]:
+        """
+        All matching lines as sorted (page_number, global_line_number) postings, or None if the caller
+        has to scan instead. text_of(global_line) supplies line text to verify candidates.
+        """
+        candidates = self.candidates(search_term, whole_word)
+        if candidates is None:
+            return None
+        tokens = tokenize(search_term)
+        if len(tokens) == 1 and whole_word and not case_sensitive and tokens[0] == search_term.lower():
+            # Exact term lookup: every posting is a match, no verification needed
+            return candidates
+        return [
+            (p, g) for p, g in candidates
+            if line_matches(text_of(g), search_term, case_sensitive, whole_word)
+        ]
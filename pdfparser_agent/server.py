@@ -0,0 +1,333 @@
+"""
+Long-running query server: `pdfparser-agent serve`.
+
+A one-shot CLI run imports the agent stack, connects to storage, opens the document and builds the
+react agent before the first token. The server pays for that once and then keeps it warm: storage is
+connected at startup, and an LRU pool holds up to SERVE_MAX_AGENTS built PDFParserAgents, keyed by
+the file (path, size and mtime, so a rewritten file gets a fresh agent) and model. Their documents
+stay in the line cache and .pdfidx mappings as usual.
+
+HTTP API, JSON in and out (stdlib ThreadingHTTPServer, no extra dependencies):
+    POST /query      {"pdf_path": ..., "query": ..., "model": ..., "use_cache": true, "timeout": 120}
+                     -> {"answer": ..., "document_id": ..., "seconds": ...}
+    POST /documents  {"pdf_path": ..., "model": ...}  ingest (or find) the document and warm its agent
+    GET  /health     pool, admission and answer cache statistics
+
+At most SERVE_CONCURRENCY queries run at once and SERVE_QUEUE more wait for a slot; any request
+beyond that is refused at once with 503 and a Retry-After header instead of piling up. Each query
+has a deadline (its "timeout", default SERVE_TIMEOUT seconds) covering the wait for a slot and the
+agent run. A query past its deadline is answered 504; a running agent cannot be interrupted, so it
+keeps its slot until it finishes and its result is dropped.
+
+The chat model comes from llm_factory(model_name) when given (`--llm module:callable` on the command
+line, e.g. a fake model for local testing), otherwise from PDFParserAgent's default.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SERVE_HOST = os.environ.get("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("SERVE_PORT", "8765"))
+SERVE_CONCURRENCY = int(os.environ.get("SERVE_CONCURRENCY", "4"))
+SERVE_QUEUE = int(os.environ.get("SERVE_QUEUE", "16"))
+SERVE_TIMEOUT = float(os.environ.get("SERVE_TIMEOUT", "120"))
+SERVE_MAX_AGENTS = int(os.environ.get("SERVE_MAX_AGENTS", "16"))
+# Largest request body accepted, in bytes
+SERVE_MAX_BODY = 1 << 20
+
+
+class Overloaded(Exception):
+    """Every running and queued slot is taken."""
+
+
+class RequestError(Exception):
+    """A request the server cannot act on; carries its HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Agent pool ---
+class AgentPool:
+    """
+    LRU pool of built agents, keyed by (file, model). Concurrent requests for an agent that is not
+    built yet wait for a single build instead of each ingesting the document and building their own.
+    """
+
+    def __init__(self, max_agents: int = SERVE_MAX_AGENTS, llm_factory: Optional[Callable[[str], Any]] = None,
+                 workers: int = 1):
+        self.max_agents = max_agents
+        self.llm_factory = llm_factory
+        self.workers = workers
+        self._agents = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "builds": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(pdf_path: str, model_name: str) -> Tuple:
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            raise RequestError(404, f"PDF not found: {pdf_path}")
+        return os.path.realpath(pdf_path), stat.st_size, stat.st_mtime_ns, model_name
+
+    def get(self, pdf_path: str, model_name: str):
+        """The warm agent for pdf_path and model_name, built on first use."""
+        key = self._key(pdf_path, model_name)
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                self.counts["hits"] += 1
+                return agent
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                agent = self._agents.get(key)
+                if agent is not None:
+                    self.counts["hits"] += 1
+                    return agent
+            try:
+                agent = self._build(pdf_path, model_name)
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            # Published and unmarked as building at once: a request in between would otherwise build it again
+            with self._lock:
+                self._agents[key] = agent
+                self._building.pop(key, None)
+                self.counts["builds"] += 1
+                while len(self._agents) > self.max_agents:
+                    self._agents.popitem(last=False)
+                    self.counts["evictions"] += 1
+            return agent
+
+    def _build(self, pdf_path: str, model_name: str):
+        from .core import PDFParserAgent
+        llm = self.llm_factory(model_name) if self.llm_factory else None
+        return PDFParserAgent(pdf_path, model_name=model_name, workers=self.workers, llm=llm)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts, agents=len(self._agents), max_agents=self.max_agents)
+
+
+# --- Query service ---
+class QueryService:
+    """Runs queries on pooled agents with bounded concurrency, a bounded wait queue and per-query deadlines."""
+
+    def __init__(self, pool: AgentPool, concurrency: int = SERVE_CONCURRENCY, queue_size: int = SERVE_QUEUE,
+                 timeout: float = SERVE_TIMEOUT, default_model: str = "ollama:llama3.2"):
+        self.pool = pool
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.default_model = default_model
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pdfparser-serve")
+        # One permit per running or queued query; released when the work ends, not when the client gives up
+        self._slots = threading.BoundedSemaphore(concurrency + queue_size)
+        self._lock = threading.Lock()
+        self.counts = {"ok": 0, "error": 0, "rejected": 0, "timeout": 0, "running": 0}
+
+    def _count(self, name: str, delta: int = 1):
+        with self._lock:
+            self.counts[name] += delta
+
+    def submit(self, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run func in a slot and return its result. Raises Overloaded or concurrent.futures.TimeoutError."""
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise Overloaded()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        def run():
+            # A query whose deadline passed while it waited for a slot is not worth starting
+            if time.monotonic() >= deadline:
+                raise FutureTimeout()
+            self._count("running")
+            try:
+                return func()
+            finally:
+                self._count("running", -1)
+
+        try:
+            future = self._executor.submit(run)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeout")
+            raise
+        except Exception:
+            self._count("error")
+            raise
+        self._count("ok")
+        return result
+
+    def query(self, pdf_path: str, query: str, model_name: Optional[str] = None, use_cache: bool = True,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
+        model_name = model_name or self.default_model
+        start = time.perf_counter()
+
+        def run():
+            agent = self.pool.get(pdf_path, model_name)
+            return agent, agent.query(query, use_cache=use_cache)
+
+        agent, result = self.submit(run, timeout)
+        from .batch import _final_message
+        return {
+            "answer": _final_message(result),
+            "document_id": str(agent.pdf_doc.document_id),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def open_document(self, pdf_path: str, model_name: Optional[str] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        agent = self.submit(lambda: self.pool.get(pdf_path, model_name or self.default_model), timeout)
+        doc = agent.pdf_doc
+        return {"document_id": str(doc.document_id), "status": doc.status, "pages_ready": doc.pages_ready}
+
+    def stats(self) -> Dict[str, Any]:
+        from .answer_cache import get_answer_cache
+        with self._lock:
+            counts = dict(self.counts)
+        cache = get_answer_cache()
+        return {
+            "queries": counts,
+            "concurrency": self.concurrency,
+            "queue": self.queue_size,
+            "pool": self.pool.stats(),
+            "answer_cache": cache.stats() if cache else None,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- HTTP ---
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "pdfparser-agent"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.info("%s " + format, self.address_string(), *args)
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVE_MAX_BODY:
+            # The body is left unread, so the connection cannot carry another request
+            self.close_connection = True
+            if length < 0:
+                raise RequestError(400, "Content-Length must be a non-negative integer")
+            raise RequestError(413, "Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise RequestError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return body
+
+    @staticmethod
+    def _field(body: Dict[str, Any], name: str) -> str:
+        value = body.get(name)
+        if not isinstance(value, str) or not value:
+            raise RequestError(400, f"{name!r} is required")
+        return value
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, dict(self.server.service.stats(), status="ok"))
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            body = self._body()
+            timeout = body.get("timeout")
+            if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+                raise RequestError(400, "'timeout' must be a positive number of seconds")
+            if self.path == "/query":
+                result = service.query(
+                    self._field(body, "pdf_path"), self._field(body, "query"), body.get("model"),
+                    use_cache=body.get("use_cache", True) is not False, timeout=timeout,
+                )
+            elif self.path == "/documents":
+                result = service.open_document(self._field(body, "pdf_path"), body.get("model"), timeout=timeout)
+            else:
+                raise RequestError(404, f"Unknown path {self.path}")
+        except RequestError as e:
+            self._send(e.status, {"error": str(e)})
+        except Overloaded:
+            self._send(503, {"error": "Server busy, retry later"}, {"Retry-After": "1"})
+        except FutureTimeout:
+            self._send(504, {"error": "Query timed out"})
+        except Exception as e:
+            logger.exception("Request to %s failed", self.path)
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, result)
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: QueryService):
+        super().__init__(address, _Handler)
+        self.service = service
+
+    def server_close(self):
+        super().server_close()
+        self.service.shutdown()
+
+
+def load_llm_factory(spec: str) -> Callable[[str], Any]:
+    """The callable named by "module:attribute"; it is called with the model name and returns a chat model."""
+    from importlib import import_module
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected module:callable, got {spec!r}")
+    return getattr(import_module(module_name), attribute)
+
+
+def make_server(host: str = SERVE_HOST, port: int = SERVE_PORT, model_name: str = "ollama:llama3.2",
+                llm_factory: Optional[Callable[[str], Any]] = None, concurrency: int = SERVE_CONCURRENCY,
+                queue_size: int = SERVE_QUEUE, timeout: float = SERVE_TIMEOUT, max_agents: int = SERVE_MAX_AGENTS,
+                workers: int = 1) -> QueryServer:
+    """A QueryServer bound to (host, port) with storage connected and the agent stack imported; port 0 picks a free port."""
+    from . import db
+    import langgraph.prebuilt  # noqa: F401  (warm the import the first agent build would pay for)
+    db.get_store()
+    pool = AgentPool(max_agents, llm_factory, workers)
+    service = QueryService(pool, concurrency, queue_size, timeout, model_name)
+    return QueryServer((host, port), service)
@@ -0,0 +1,131 @@
+"""
+Per-session navigation state shared by the tools.
+
+Sessions are keyed by (user_id, document_id, ...). State lives in bounded LRU caches with a TTL,
+so a long-running worker serving many concurrent sessions keeps a fixed memory ceiling.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+SEARCH_CURSOR_LIMIT = int(os.environ.get("SEARCH_CURSOR_LIMIT", "1024"))
+SEARCH_CURSOR_TTL = float(os.environ.get("SEARCH_CURSOR_TTL", "900"))
+# Total number of cached match postings across all cursors
+SEARCH_CURSOR_MAX_MATCHES = int(os.environ.get("SEARCH_CURSOR_MAX_MATCHES", "1000000"))
+VIEWPORT_LIMIT = int(os.environ.get("VIEWPORT_LIMIT", "4096"))
+VIEWPORT_TTL = float(os.environ.get("VIEWPORT_TTL", "3600"))
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl seconds after their last use.
+    An optional weigher bounds the summed weight of all entries in addition to their count.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_weight: Optional[int] = None,
+                 weigher: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigher = weigher or (lambda value: 1)
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, weight = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries[key] = (time.monotonic() + self.ttl, value, weight)
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        weight = self.weigher(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, weight)
+            self._weight += weight
+            self._evict()
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        """Remove every entry whose key satisfies predicate."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> Any:
+        _, value, weight = self._entries.pop(key)
+        self._weight -= weight
+        return value
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _, _) in self._entries.items() if expires < now]:
+            self._remove(key)
+        # The newest entry is always kept, even if it alone exceeds max_weight
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_weight is not None and self._weight > self.max_weight)
+        ):
+            self._remove(next(iter(self._entries)))
+
+
+# --- Search cursors ---
+class SearchCursor:
+    """The resolved matches of one search and the index of the match returned last (-1: none yet)."""
+
+    def __init__(self, matches: List[Tuple[int, int]]):
+        self.matches = matches
+        self.position = -1
+
+
+search_cursors = TTLCache(
+    SEARCH_CURSOR_LIMIT,
+    SEARCH_CURSOR_TTL,
+    max_weight=SEARCH_CURSOR_MAX_MATCHES,
+    weigher=lambda cursor: len(cursor.matches) + 1,
+)
+
+
+# --- Viewports ---
+viewports = TTLCache(VIEWPORT_LIMIT, VIEWPORT_TTL)
+
+
+def get_viewport(user_id: str, document_id: str) -> Optional[Tuple[int, int]]:
+    """The (first_line, last_line) global line span the session was shown last, or None before any navigation."""
+    return viewports.get((user_id, str(document_id)))
+
+
+def set_viewport(user_id: str, document_id: str, first_line: int, last_line: int):
+    viewports.set((user_id, str(document_id)), (first_line, last_line))
+
+
+def forget_document(document_id: str):
+    """Drop every session's search cursors and viewport on a document whose lines changed."""
+    document_id = str(document_id)
+    search_cursors.discard(lambda key: key[1] == document_id)
+    viewports.discard(lambda key: key[1] == document_id)
@@ -0,0 +1,356 @@
+"""
+Embedded SQLite storage backend (STORAGE_BACKEND=sqlite).
+
+One database file, no server: every read is a local B-tree lookup instead of a network round-trip.
+- WAL journal, so readers never block the ingesting writer and several processes can share the file
+- document_lines is a WITHOUT ROWID table keyed by (document_id, page_number, line_num_on_page):
+  the lines of a page are stored together and a page read is one contiguous range scan
+- searches that bypass the line cache go through an FTS5 trigram index, which narrows any substring
+  of three or more characters to candidate lines; candidates are verified with the same predicate as a scan
+
+Document ids are integers (AUTOINCREMENT, never reused). Records are kept as JSON next to the
+indexed columns, so new record fields need no migration.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from .memory import CLIP_MEMORY_TTL
+from .search import SearchIndex, line_matches
+
+# FTS rowids pack (document_id, global_line_number) so a document's entries form one rowid range
+_LINE_BITS = 32
+# Moved lines pass through numbers this far up, which no page or line uses, on the way to their new place
+_MOVE_OFFSET = 1 << 40
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT,
+    processing_type TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS documents_content
+    ON documents (content_hash, processing_type) WHERE content_hash IS NOT NULL;
+CREATE TABLE IF NOT EXISTS document_lines (
+    document_id INTEGER NOT NULL,
+    page_number INTEGER NOT NULL,
+    line_num_on_page INTEGER NOT NULL,
+    global_line_number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (document_id, page_number, line_num_on_page)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS document_lines_global ON document_lines (document_id, global_line_number);
+CREATE VIRTUAL TABLE IF NOT EXISTS document_lines_fts USING fts5(text, page_number UNINDEXED, tokenize = 'trigram');
+CREATE TABLE IF NOT EXISTS clip_memory (
+    user_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clip_memory_session ON clip_memory (user_id, document_id, created_at);
+CREATE INDEX IF NOT EXISTS clip_memory_created ON clip_memory (created_at);
+"""
+
+LINE_COLUMNS = "page_number, line_num_on_page, global_line_number, text"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _line(row):
+    return {"page_number": row[0], "line_num_on_page": row[1], "global_line_number": row[2], "text": row[3]}
+
+
+def _fts_range(document_id):
+    low = int(document_id) << _LINE_BITS
+    return low, low + (1 << _LINE_BITS) - 1
+
+
+class FTSIndex:
+    """SearchIndex counterpart answering searches from the FTS5 table instead of in-memory postings."""
+
+    def __init__(self, store: "SQLiteStore", document_id):
+        self.store = store
+        self.document_id = int(document_id)
+
+    def search(self, search_term, text_of=None, case_sensitive=False, whole_word=False) -> Optional[List]:
+        # Trigrams cannot narrow shorter terms: let the caller scan
+        if len(search_term) < 3:
+            return None
+        low, high = _fts_range(self.document_id)
+        rows = self.store._conn().execute(
+            "SELECT page_number, rowid - ?, text FROM document_lines_fts WHERE document_lines_fts MATCH ? AND rowid BETWEEN ? AND ?",
+            (low, '"' + search_term.replace('"', '""') + '"', low, high)
+        ).fetchall()
+        return sorted(
+            (page, global_line) for page, global_line, text in rows
+            if line_matches(text, search_term, case_sensitive, whole_word)
+        )
+
+
+class SQLiteStore:
+    """Storage operations behind db.py on one SQLite file, with a connection per thread."""
+
+    name = "sqlite"
+    # Searches go through the FTS table, which the line writes keep current
+    term_postings = False
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL makes NORMAL durable against application crashes; only an OS crash can lose the last commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- documents ---
+    def _record(self, row):
+        if row is None:
+            return None
+        record = json.loads(row[1])
+        record["_id"] = row[0]
+        return record
+
+    def insert_document(self, doc):
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "INSERT INTO documents (content_hash, processing_type, data) VALUES (?, ?, ?)",
+                (doc.get("content_hash"), doc.get("processing_type"), json.dumps(doc, default=_json_default))
+            )
+        return cursor.lastrowid
+
+    def claim_document(self, doc, content_hash, processing_type):
+        """Atomically find or create the record for (content_hash, processing_type), inserting doc if absent."""
+        doc = dict(doc, content_hash=content_hash, processing_type=processing_type)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO documents (content_hash, processing_type, data) VALUES (?, ?, ?)",
+                (content_hash, processing_type, json.dumps(doc, default=_json_default))
+            )
+            row = conn.execute(
+                "SELECT id, data FROM documents WHERE content_hash = ? AND processing_type = ?",
+                (content_hash, processing_type)
+            ).fetchone()
+        return self._record(row)
+
+    def get_document(self, document_id, fields=None):
+        if not fields:
+            row = self._conn().execute("SELECT id, data FROM documents WHERE id = ?", (int(document_id),)).fetchone()
+            return self._record(row)
+        # Like a Mongo projection: only the named fields (and _id) are decoded, absent ones are left out
+        paths = ["$." + field for field in fields]
+        columns = ", ".join("json_type(data, ?), json_extract(data, ?)" for _ in paths)
+        row = self._conn().execute(
+            f"SELECT id, {columns} FROM documents WHERE id = ?",
+            [path for path in paths for _ in range(2)] + [int(document_id)]
+        ).fetchone()
+        if row is None:
+            return None
+        record = {"_id": row[0]}
+        for n, field in enumerate(fields):
+            kind, value = row[1 + 2 * n], row[2 + 2 * n]
+            if kind in ("array", "object"):
+                record[field] = json.loads(value)
+            elif kind in ("true", "false"):
+                record[field] = kind == "true"
+            elif kind is not None:
+                record[field] = value
+        return record
+
+    def find_document_ids(self, content_hash, processing_type=None):
+        query, params = "SELECT id FROM documents WHERE content_hash = ?", [content_hash]
+        if processing_type is not None:
+            query += " AND processing_type = ?"
+            params.append(processing_type)
+        return [row[0] for row in self._conn().execute(query, params)]
+
+    def update_document(self, document_id, fields):
+        conn = self._conn()
+        with conn:
+            # json_patch merges in one statement, so concurrent updates of different fields do not race
+            conn.execute(
+                "UPDATE documents SET data = json_patch(data, ?) WHERE id = ?",
+                (json.dumps(fields, default=_json_default), int(document_id))
+            )
+            if "content_hash" in fields:
+                # The indexed column is what claim_document looks records up by
+                conn.execute("UPDATE documents SET content_hash = ? WHERE id = ?", (fields["content_hash"], int(document_id)))
+
+    def update_owned_document(self, document_id, ingest_token, fields):
+        """Update a loading record only while ingest_token owns it. Returns whether it did."""
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "UPDATE documents SET data = json_patch(data, ?) WHERE id = ? "
+                "AND json_extract(data, '$.ingest_token') IS ? AND json_extract(data, '$.status') = 'loading'",
+                (json.dumps(fields, default=_json_default), int(document_id), ingest_token)
+            )
+        return cursor.rowcount == 1
+
+    def delete_document(self, document_id):
+        with self._conn() as conn:
+            self._delete_lines(conn, document_id)
+            conn.execute("DELETE FROM documents WHERE id = ?", (int(document_id),))
+
+    def delete_lines(self, document_id):
+        with self._conn() as conn:
+            self._delete_lines(conn, document_id)
+
+    def _delete_lines(self, conn, document_id):
+        low, high = _fts_range(document_id)
+        conn.execute("DELETE FROM document_lines WHERE document_id = ?", (int(document_id),))
+        conn.execute("DELETE FROM document_lines_fts WHERE rowid BETWEEN ? AND ?", (low, high))
+
+    # --- lines ---
+    def insert_lines(self, document_id, lines):
+        document_id = int(document_id)
+        low, _ = _fts_range(document_id)
+        with self._conn() as conn:
+            conn.executemany(
+                f"INSERT INTO document_lines (document_id, {LINE_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                [(document_id, l["page_number"], l["line_num_on_page"], l["global_line_number"], l["text"]) for l in lines]
+            )
+            conn.executemany(
+                "INSERT INTO document_lines_fts (rowid, text, page_number) VALUES (?, ?, ?)",
+                [(low + l["global_line_number"], l["text"], l["page_number"]) for l in lines]
+            )
+
+    def replace_pages(self, document_id, removed, moves, lines):
+        """See db.replace_document_pages. One transaction, so readers see either revision, never a mix."""
+        document_id = int(document_id)
+        low, _ = _fts_range(document_id)
+        moved = [(first, last) for first, last, _, _ in moves]
+        with self._conn() as conn:
+            # FTS rowids are global line numbers: drop the entries of every line that goes away or moves
+            conn.executemany(
+                "DELETE FROM document_lines_fts WHERE rowid IN (SELECT ? + global_line_number FROM document_lines "
+                "WHERE document_id = ? AND page_number BETWEEN ? AND ?)",
+                [(low, document_id, first, last) for first, last in removed + moved]
+            )
+            conn.executemany(
+                "DELETE FROM document_lines WHERE document_id = ? AND page_number BETWEEN ? AND ?",
+                [(document_id, first, last) for first, last in removed]
+            )
+            # Every block is moved out of the way first, so no block lands on a key another one still holds
+            conn.executemany(
+                "UPDATE document_lines SET page_number = page_number + ?, global_line_number = global_line_number + ? "
+                "WHERE document_id = ? AND page_number BETWEEN ? AND ?",
+                [(_MOVE_OFFSET + page_delta, _MOVE_OFFSET + line_delta, document_id, first, last) for first, last, page_delta, line_delta in moves]
+            )
+            conn.execute(
+                "UPDATE document_lines SET page_number = page_number - ?, global_line_number = global_line_number - ? "
+                "WHERE document_id = ? AND page_number >= ?",
+                (_MOVE_OFFSET, _MOVE_OFFSET, document_id, _MOVE_OFFSET)
+            )
+            conn.executemany(
+                f"INSERT INTO document_lines (document_id, {LINE_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                [(document_id, l["page_number"], l["line_num_on_page"], l["global_line_number"], l["text"]) for l in lines]
+            )
+            conn.executemany(
+                "INSERT INTO document_lines_fts (rowid, text, page_number) SELECT ? + global_line_number, text, page_number "
+                "FROM document_lines WHERE document_id = ? AND page_number BETWEEN ? AND ?",
+                [(low, document_id, first + page_delta, last + page_delta) for first, last, page_delta, _ in moves]
+            )
+            conn.executemany(
+                "INSERT INTO document_lines_fts (rowid, text, page_number) VALUES (?, ?, ?)",
+                [(low + l["global_line_number"], l["text"], l["page_number"]) for l in lines]
+            )
+
+    def get_lines(self, document_id):
+        return [_line(row) for row in self._conn().execute(
+            f"SELECT {LINE_COLUMNS} FROM document_lines WHERE document_id = ? ORDER BY page_number, line_num_on_page",
+            (int(document_id),)
+        )]
+
+    def get_page_lines(self, document_id, page_number):
+        return [_line(row) for row in self._conn().execute(
+            f"SELECT {LINE_COLUMNS} FROM document_lines WHERE document_id = ? AND page_number = ? ORDER BY line_num_on_page",
+            (int(document_id), page_number)
+        )]
+
+    def get_page_range(self, document_id, start_page, end_page):
+        return [_line(row) for row in self._conn().execute(
+            f"SELECT {LINE_COLUMNS} FROM document_lines WHERE document_id = ? AND page_number BETWEEN ? AND ? "
+            "ORDER BY page_number, line_num_on_page",
+            (int(document_id), start_page, end_page)
+        )]
+
+    def get_line(self, document_id, global_line_number):
+        row = self._conn().execute(
+            f"SELECT {LINE_COLUMNS} FROM document_lines WHERE document_id = ? AND global_line_number = ?",
+            (int(document_id), global_line_number)
+        ).fetchone()
+        return _line(row) if row else None
+
+    def get_line_ranges(self, document_id, ranges):
+        where = " OR ".join("global_line_number BETWEEN ? AND ?" for _ in ranges)
+        params = [int(document_id)] + [bound for span in ranges for bound in span]
+        return [_line(row) for row in self._conn().execute(
+            f"SELECT {LINE_COLUMNS} FROM document_lines WHERE document_id = ? AND ({where}) ORDER BY global_line_number",
+            params
+        )]
+
+    def line_stats(self, document_id):
+        page_count, line_count = self._conn().execute(
+            "SELECT MAX(page_number), COUNT(*) FROM document_lines WHERE document_id = ?", (int(document_id),)
+        ).fetchone()
+        return {"page_count": page_count or 0, "line_count": line_count}
+
+    # --- search ---
+    def insert_terms(self, entries):
+        # insert_lines already fed the FTS table
+        pass
+
+    def shift_terms(self, document_id, removed, moves):
+        # replace_pages already rewrote the affected FTS rows
+        pass
+
+    def search_index(self, document_id, cached):
+        # Cached lines are searched faster in memory; FTS5 serves reads that bypass the line cache
+        if cached is not None:
+            return SearchIndex.from_lines(cached.lines)
+        return FTSIndex(self, document_id)
+
+    # --- clips ---
+    def insert_clip(self, record):
+        with self._conn() as conn:
+            # SQLite has no TTL index: expire clips past CLIP_MEMORY_TTL as new ones come in
+            conn.execute("DELETE FROM clip_memory WHERE created_at < ?", (time.time() - CLIP_MEMORY_TTL,))
+            conn.execute(
+                "INSERT INTO clip_memory (user_id, document_id, created_at, data) VALUES (?, ?, ?, ?)",
+                (record["user_id"], record["document_id"], record["created_at"], json.dumps(record, default=_json_default))
+            )
+
+    def get_clips(self, user_id, document_id):
+        rows = self._conn().execute(
+            "SELECT data FROM clip_memory WHERE user_id = ? AND document_id = ? AND created_at >= ? ORDER BY created_at",
+            (user_id, document_id, time.time() - CLIP_MEMORY_TTL)
+        )
+        return [{k: v for k, v in json.loads(row[0]).items() if k in ("start", "end", "size", "created_at")} for row in rows]
+
+    def delete_clips(self, user_id, document_id, created_at=None):
+        query, params = "DELETE FROM clip_memory WHERE user_id = ? AND document_id = ?", [user_id, document_id]
+        if created_at is not None:
+            created_at = list(created_at)
+            query += f" AND created_at IN ({', '.join('?' for _ in created_at)})"
+            params.extend(created_at)
+        with self._conn() as conn:
+            conn.execute(query, params)
@@ -0,0 +1,103 @@
+"""
+Stand-ins for testing without a real chat model or MongoDB server.
+
+fake_llm builds a chat model that needs no server, so agents, the query server and the benchmarks
+can run end to end offline:
+    pdfparser-agent serve --llm pdfparser_agent.testing:fake_llm report.pdf
+
+FAKE_LLM_MS sets its default latency per turn.
+
+AsyncDatabase is an awaitable facade over a synchronous Mongo database, so async_db (normally on
+pymongo's AsyncMongoClient) can run against mongomock:
+    import mongomock
+    from pdfparser_agent import async_db, db
+    database = mongomock.MongoClient()["pdfagent"]
+    db.set_database(database)
+    async_db.set_database(AsyncDatabase(database))
+
+mongomock is not a dependency of the package; it only has to be installed where it is used.
+"""
+
+import os
+import time
+
+FAKE_LLM_SECONDS = float(os.environ.get("FAKE_LLM_MS", "50")) / 1000
+
+
+def fake_llm(model_name=None, latency=None):
+    """A chat model that calls goto(page=1) once, then answers with the start of the tool output."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        latency: float = FAKE_LLM_SECONDS
+
+        @property
+        def _llm_type(self):
+            return "fake"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latency)
+            if isinstance(messages[-1], ToolMessage):
+                message = AIMessage("Page 1 starts with: " + messages[-1].content[:80])
+            else:
+                message = AIMessage("", tool_calls=[{"name": "goto", "args": {"user_id": "fake", "page": 1}, "id": "call1"}])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    return FakeChatModel(latency=FAKE_LLM_SECONDS if latency is None else latency)
+
+
+# --- Async Mongo stand-in ---
+class AsyncCursor:
+    """A find() cursor whose results are fetched with `await cursor.to_list(length)`."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    async def to_list(self, length=None):
+        results = list(self._cursor)
+        return results if length is None else results[:length]
+
+
+class AsyncCollection:
+    """Awaitable methods over a synchronous collection; find() returns an AsyncCursor."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    """Awaitable facade over a synchronous Mongo database (e.g. mongomock), with the API async_db uses."""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self._database[name])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return AsyncCollection(self._database[name])
@@ -2,137 +2,311 @@
 Tools for PDF parsing and navigation.
 """
 
-import tempfile
-import requests
+import inspect
+import json
+import os
+from bisect import bisect_left, bisect_right
 from typing import List, Optional, Tuple, Dict, Any
 from pydantic import BaseModel, HttpUrl
-from enum import Enum
-from langgraph.prebuilt import create_react_agent
-from .db import get_lines
+from .db import (
+    get_page_lines,
+    get_page_range,
+    get_line,
+    get_line_range,
+    get_line_ranges,
+    get_all_lines,
+    get_document_stats,
+    get_cached_document,
+    get_search_index,
+)
+from .search import scan_lines
+from .processing.pdf_processing import ProcessBudget
+from .instrumentation import instrumented, record_query
+from .rendering import last_page_in_budget, parse_continuation, render_lines, render_page, render_pages, render_text
+from .memory import clip_memory_store, text_size
+from .sessions import SearchCursor, search_cursors, get_viewport, set_viewport
 
 
-# In-memory memory, keyed by (user_id, document_id)
-clip_memory_db = {}
+def _document_id(document) -> str:
+    """Tools are bound to a PDFDocument by make_tool_with_doc but may also be called with a raw document id."""
+    return getattr(document, "document_id", document)
+
+
+def _page_not_ready(document, page_num: int) -> Optional[str]:
+    """Message for pages that a document still ingesting in the background has not stored yet."""
+    if getattr(document, "is_loading", False) and page_num > document.pages_ready:
+        return f"Page {page_num} is still being ingested ({document.pages_ready} pages ready). Try again shortly."
+    return None
 
 
 # --- Markdown Output Helper ---
-def render_page_markdown(document_id: str, user_id: str, page_num: int, highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None) -> str:
-    lines = get_lines(document_id, {"page_number": page_num})
-    total_pages = max([l["page_number"] for l in get_lines(document_id)]) if lines else 0
-    out = [f"{'-'*42}\n|               Page {page_num} of {total_pages}             |\n{'-'*42}"]
-    out.append("|                                        |\n|                                        |\n|                                        |")
-    for l in lines:
-        g = l["global_line_number"]
-        text = l["text"]
-        if highlight_lines and g in highlight_lines:
-            line = f"|{g:03}| <highlight match=\"{highlight_match}\"></highlight> {text}"
-        else:
-            line = f"|{g:03}| {text}"
-        out.append(line)
-    out.append("|                                        |\n------------------------------------------")
-    return '\n'.join(out)
+@instrumented("render")
+def _render_page(page_num: int, total_pages: int, lines: List[Dict[str, Any]], highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None, highlight_total: Optional[int] = None, max_chars: Optional[int] = None, continued: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+    """The rendered page and the lines that fit in the render budget."""
+    text, first, stop = render_page(page_num, total_pages, lines, highlight_lines, highlight_match, highlight_total, max_chars=max_chars, continued=continued)
+    return text, lines[first:stop]
+
+
+def _format_page(page_num: int, total_pages: int, lines: List[Dict[str, Any]], highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None, highlight_total: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    return _render_page(page_num, total_pages, lines, highlight_lines, highlight_match, highlight_total, max_chars)[0]
+
+
+def render_page_markdown(document_id: str, user_id: str, page_num: int, highlight_lines: Optional[List[int]] = None, highlight_match: Optional[int] = None, highlight_total: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    not_ready = _page_not_ready(document_id, page_num)
+    if not_ready:
+        return not_ready
+    document_id = _document_id(document_id)
+    lines = get_page_lines(document_id, page_num)
+    total_pages = get_document_stats(document_id)["page_count"]
+    return _format_page(page_num, total_pages, lines, highlight_lines, highlight_match, highlight_total, max_chars)
+
+
+def _move_viewport(user_id: str, document_id: str, lines: List[Dict[str, Any]]):
+    if lines:
+        set_viewport(user_id, document_id, lines[0]["global_line_number"], lines[-1]["global_line_number"])
+
+
+def _page_from(lines: List[Dict[str, Any]], start: Optional[int]) -> List[Dict[str, Any]]:
+    """The lines of a page from global line start on (all of them without start)."""
+    if start is None:
+        return lines
+    return lines[bisect_left([l["global_line_number"] for l in lines], start):]
+
+
+def _show_page(document, user_id: str, page_num: int, start: Optional[int] = None, max_chars: Optional[int] = None, **highlight) -> str:
+    """Render a page (from line start on) for a tool call and move the session's viewport onto the lines shown."""
+    not_ready = _page_not_ready(document, page_num)
+    if not_ready:
+        return not_ready
+    doc_id = _document_id(document)
+    lines = _page_from(get_page_lines(doc_id, page_num), start)
+    text, shown = _render_page(page_num, get_document_stats(doc_id)["page_count"], lines, max_chars=max_chars, continued=start is not None, **highlight)
+    _move_viewport(user_id, doc_id, shown)
+    return text
+
+
+@instrumented("render")
+def _render_span(title: str, lines: List[Dict[str, Any]], max_chars: Optional[int] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """The rendered lines and those of them that fit in the render budget."""
+    text, stop = render_lines(title, lines, max_chars)
+    return text, lines[:stop]
+
+
+def _render_lines(title: str, lines: List[Dict[str, Any]], max_chars: Optional[int] = None) -> str:
+    return _render_span(title, lines, max_chars)[0]
+
+
+def _show_lines(document_id: str, user_id: str, title: str, lines: List[Dict[str, Any]], max_chars: Optional[int] = None) -> str:
+    text, shown = _render_span(title, lines, max_chars)
+    _move_viewport(user_id, document_id, shown)
+    return text
 
 
 # --- Tool: next_search_match ---
-def next_search_match(document_id: str, user_id: str, search_term: str, match_number: Optional[int] = None) -> str:
+def _find_matches(document_id: str, search_term: str, case_sensitive: bool = False, whole_word: bool = False) -> List[Tuple[int, int]]:
+    """All matching lines as (page_number, global_line_number), via the inverted index when it is available."""
+    index = get_search_index(document_id)
+    if index is not None:
+        cached = get_cached_document(document_id)
+        matches = index.search(search_term, cached.text_of if cached else None, case_sensitive, whole_word)
+        if matches is not None:
+            return matches
+    return scan_lines(get_all_lines(document_id), search_term, case_sensitive, whole_word)
+
+
+@instrumented("tool")
+def next_search_match(document_id: str, user_id: str, search_term: str, match_number: Optional[int] = None, case_sensitive: bool = False, whole_word: bool = False) -> str:
     """
     Find the next match for a search term in the loaded PDF and render the page with the match highlighted.
+    Without match_number this returns the match after the one returned last for the same term (the first match on a new search).
+    Matching is case-insensitive substring matching unless case_sensitive or whole_word is set.
     """
-    all_lines = get_lines(document_id)
-    matches = [l for l in all_lines if search_term.lower() in l["text"].lower()]
+    key = (user_id, str(_document_id(document_id)), search_term, case_sensitive, whole_word)
+    cursor = search_cursors.get(key)
+    if cursor is None:
+        cursor = SearchCursor(_find_matches(_document_id(document_id), search_term, case_sensitive, whole_word))
+        # Matches of a document that is still ingesting are incomplete, so they are not kept
+        if not getattr(document_id, "is_loading", False):
+            search_cursors.set(key, cursor)
+    matches = cursor.matches
     if not matches:
         return "No matches found."
-    idx = match_number-1 if match_number else 0
+    idx = match_number-1 if match_number else cursor.position + 1
     if idx >= len(matches):
         return f"Only {len(matches)} matches found."
-    match = matches[idx]
-    page_num = match["page_number"]
-    global_line = match["global_line_number"]
-    return render_page_markdown(document_id, user_id, page_num, highlight_lines=[global_line], highlight_match=idx+1)
+    cursor.position = idx
+    page_num, global_line = matches[idx]
+    return _show_page(document_id, user_id, page_num, highlight_lines=[global_line], highlight_match=idx+1, highlight_total=len(matches))
 
 
 # --- Tool: goto ---
-def goto(document_id: str, user_id: str, page: int = None, line: int = None) -> str:
+@instrumented("tool")
+def goto(document_id: str, user_id: str, page: int = None, line: int = None, continuation: Optional[str] = None, max_chars: Optional[int] = None) -> str:
     """
-    Go to a specific page or line number in the PDF and render it in markdown. Takes either page or line as input.
+    Go to a specific page or line number in the PDF and render it in markdown. Takes either page or line as input,
+    or the continuation token of a result that was cut short to show the rest of it. max_chars caps the output size.
     """
+    if continuation is not None:
+        try:
+            kind, args = parse_continuation(continuation)
+        except ValueError:
+            return "Invalid continuation token."
+        if kind == "page":
+            return _show_page(document_id, user_id, args[0], start=args[1], max_chars=max_chars)
+        if kind == "lines":
+            doc_id = _document_id(document_id)
+            return _show_lines(doc_id, user_id, f"Lines {args[0]}-{args[1]}", get_line_range(doc_id, *args), max_chars)
+        return use_memory(document_id, user_id, "", continuation=continuation, max_chars=max_chars)
     if page is not None:
-        return render_page_markdown(document_id, user_id, page)
+        return _show_page(document_id, user_id, page, max_chars=max_chars)
     if line is not None:
-        all_lines = get_lines(document_id, {"global_line_number": line})
-        if all_lines:
-            l = all_lines[0]
-            return render_page_markdown(document_id, user_id, l["page_number"], highlight_lines=[line])
+        l = get_line(_document_id(document_id), line)
+        if l:
+            return _show_page(document_id, user_id, l["page_number"], highlight_lines=[line], max_chars=max_chars)
     return "Invalid target."
 
 
+# --- Tool: read_range ---
+def _range_plan(document, start_page: int, end_page: Optional[int], total_pages: int, max_chars: Optional[int]):
+    """(end_page, last page to fetch) of a read_range over pages, or an error message."""
+    end_page = min(total_pages, start_page if end_page is None else end_page)
+    if start_page < 1 or start_page > end_page:
+        return f"Invalid page range (the document has {total_pages} pages)."
+    not_ready = _page_not_ready(document, start_page)
+    if not_ready:
+        return not_ready
+    last = last_page_in_budget(start_page, end_page, max_chars)
+    if getattr(document, "is_loading", False):
+        last = min(last, document.pages_ready)
+    return end_page, last
+
+
+def _split_pages(lines: List[Dict[str, Any]], start_page: int, last_page: int) -> List[Tuple[int, List[Dict[str, Any]]]]:
+    """(page_num, lines) for every page from start_page to last_page, pages without text included."""
+    pages = {page: [] for page in range(start_page, last_page + 1)}
+    for line in lines:
+        pages[line["page_number"]].append(line)
+    return list(pages.items())
+
+
+@instrumented("render")
+def _render_pages(pages, total_pages: int, end_page: int, max_chars: Optional[int], max_chars_per_page: Optional[int]):
+    return render_pages(pages, total_pages, end_page, max_chars, max_chars_per_page)
+
+
+@instrumented("tool")
+def read_range(document_id: str, user_id: str, start_page: int = None, end_page: int = None, start_line: int = None, end_line: int = None, max_chars_per_page: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Read several pages (start_page to end_page) or a span of lines (start_line to end_line) in one call, instead of
+    one goto per page. max_chars_per_page caps the text of each page; pages that are cut end with a continuation token.
+    """
+    doc_id = _document_id(document_id)
+    if start_page is not None:
+        total_pages = get_document_stats(doc_id)["page_count"]
+        plan = _range_plan(document_id, start_page, end_page, total_pages, max_chars)
+        if isinstance(plan, str):
+            return plan
+        end_page, last = plan
+        pages = _split_pages(get_page_range(doc_id, start_page, last), start_page, last)
+        text, shown = _render_pages(pages, total_pages, end_page, max_chars, max_chars_per_page)
+        _move_viewport(user_id, doc_id, shown)
+        return text
+    if start_line is not None and end_line is not None and start_line <= end_line:
+        return _show_lines(doc_id, user_id, f"Lines {start_line}-{end_line}", get_line_range(doc_id, start_line, end_line), max_chars)
+    return "Invalid range: give start_page (and end_page) or start_line and end_line."
+
+
 # --- Tool: scroll_up ---
-def scroll_up(document_id: str, user_id: str, n: int) -> str:
+@instrumented("tool")
+def scroll_up(document_id: str, user_id: str, n: int, max_chars: Optional[int] = None) -> str:
     """
-    Scroll up n lines from the end (simulate by showing the previous n lines).
+    Scroll up n lines: show the n lines above the current view (the last n lines of the document if nothing has been viewed yet).
     """
-    all_lines = get_lines(document_id)
-    lines = all_lines[-n:] if n <= len(all_lines) else all_lines
-    out = [f"{'-'*42}\n|   Scrolled Up {n} lines                |\n{'-'*42}"]
-    for l in lines:
-        g = l["global_line_number"]
-        text = l["text"]
-        out.append(f"|{g:03}| {text}")
-    out.append("------------------------------------------")
-    return '\n'.join(out)
+    doc_id = _document_id(document_id)
+    viewport = get_viewport(user_id, doc_id)
+    if viewport is None:
+        end = get_document_stats(doc_id)["line_count"]
+    else:
+        end = viewport[0] - 1
+    if end < 1:
+        return "Already at the top of the document."
+    return _show_lines(doc_id, user_id, f"Scrolled Up {n} lines", get_line_range(doc_id, max(1, end - n + 1), end), max_chars)
 
 
 # --- Tool: scroll_down ---
-def scroll_down(document_id: str, user_id: str, n: int) -> str:
+@instrumented("tool")
+def scroll_down(document_id: str, user_id: str, n: int, max_chars: Optional[int] = None) -> str:
     """
-    Scroll down n lines from the start (simulate by showing the next n lines).
+    Scroll down n lines: show the n lines below the current view (the first n lines of the document if nothing has been viewed yet).
     """
-    all_lines = get_lines(document_id)
-    lines = all_lines[:n]
-    out = [f"{'-'*42}\n|   Scrolled Down {n} lines              |\n{'-'*42}"]
-    for l in lines:
-        g = l["global_line_number"]
-        text = l["text"]
-        out.append(f"|{g:03}| {text}")
-    out.append("------------------------------------------")
-    return '\n'.join(out)
+    doc_id = _document_id(document_id)
+    viewport = get_viewport(user_id, doc_id)
+    start = 1 if viewport is None else viewport[1] + 1
+    lines = get_line_range(doc_id, start, start + n - 1)
+    if not lines:
+        return "Already at the end of the document."
+    return _show_lines(doc_id, user_id, f"Scrolled Down {n} lines", lines, max_chars)
 
 
 # --- Tool: clip_memory ---
+@instrumented("tool")
 def clip_memory(document_id: str, user_id: str, line_num_start: int, line_num_end: int) -> str:
     """
     Clip lines from line_num_start to line_num_end and store in memory (per user/document).
     """
-    all_lines = get_lines(document_id)
-    clip = [l for l in all_lines if line_num_start <= l["global_line_number"] <= line_num_end]
-    key = (user_id, document_id)
-    if key not in clip_memory_db:
-        clip_memory_db[key] = []
-    clip_memory_db[key].append(clip)
-    return f"Clipped lines {line_num_start} to {line_num_end}."
+    clip = get_line_range(_document_id(document_id), line_num_start, line_num_end)
+    if not clip:
+        return f"No lines between {line_num_start} and {line_num_end}."
+    evicted = clip_memory_store.add(user_id, _document_id(document_id), line_num_start, line_num_end, text_size(clip))
+    return _clip_message(line_num_start, line_num_end, evicted)
+
+
+def _clip_message(start: int, end: int, evicted) -> str:
+    message = f"Clipped lines {start} to {end}."
+    if evicted:
+        dropped = ", ".join(f"{c.start}-{c.end}" for c in evicted)
+        message += f" Memory budget reached, dropped oldest clips: {dropped}."
+    return message
 
 
 # --- Tool: use_memory ---
-def use_memory(document_id: str, user_id: str, prompt: str) -> str:
+@instrumented("render")
+def _materialize_clips(clips, lines: List[Dict[str, Any]], offset: int = 0, max_chars: Optional[int] = None) -> str:
+    """Text of every clip, in clip order, cut out of the union of their lines; from text line offset on, within the render budget."""
+    numbers = [l["global_line_number"] for l in lines]
+    out = []
+    for clip in clips:
+        out.extend(l["text"] for l in lines[bisect_left(numbers, clip.start):bisect_right(numbers, clip.end)])
+    return render_text(out, offset, max_chars)
+
+
+def _memory_offset(continuation: Optional[str]) -> Optional[int]:
+    """Text line offset of a memory continuation token: 0 without one, None if it is not a memory token."""
+    if continuation is None:
+        return 0
+    try:
+        kind, args = parse_continuation(continuation)
+    except ValueError:
+        return None
+    return args[0] if kind == "memory" else None
+
+
+@instrumented("tool")
+def use_memory(document_id: str, user_id: str, prompt: str, continuation: Optional[str] = None, max_chars: Optional[int] = None) -> str:
     """
-    Use the clipped memory to answer a prompt (simulated).
+    Use the clipped memory to answer a prompt (simulated). Pass the continuation token of a cut short result to see the rest.
     """
-    key = (user_id, document_id)
-    if key not in clip_memory_db or not clip_memory_db[key]:
+    offset = _memory_offset(continuation)
+    if offset is None:
+        return "Invalid continuation token."
+    clips = clip_memory_store.clips(user_id, _document_id(document_id))
+    if not clips:
         return "No memory clipped."
-    lines = [line["text"] for clip in clip_memory_db[key] for line in clip]
-    return '\n'.join(lines)
+    lines = get_line_ranges(_document_id(document_id), [(c.start, c.end) for c in clips])
+    return _materialize_clips(clips, lines, offset, max_chars)
 
 
 # --- Tool: doc_task ---
-class ProcessBudget(str, Enum):
-    HIGH = "high"
-    MEDIUM = "medium"
-    LOW = "low"
-    PROFESSIONAL = "professional"
-    FREE = "free"
-
-
 class DocTaskConfig(BaseModel):
     pdf_url: HttpUrl
     model_name: str
@@ -148,64 +322,114 @@ def doc_task(
     model_cfg: Dict[Any, Any],
     task: str,
     process_budget_pagewise: ProcessBudget,
-    structured_output_schema: Optional[Dict[Any, Any]] = None
+    structured_output_schema: Optional[Dict[Any, Any]] = None,
+    use_cache: bool = True
 ) -> dict:
     """
     Loads the PDF from the given URL, initializes the document, and equips the agent with tools to perform the task.
-    Returns a structured output (pydantic dict) with the result.
-    """
-    # Download the PDF
-    response = requests.get(str(pdf_url))
-    if response.status_code != 200:
-        return {"error": f"Failed to download PDF from {pdf_url}"}
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(response.content)
-        tmp_pdf_path = tmp_file.name
-    
-    # Initialize the document
-    from .core import PDFDocument
-    doc = PDFDocument(tmp_pdf_path)
-    
+    Returns a structured output (pydantic dict) with the result. A cached answer to the same task, model and PDF
+    content is returned without ingesting or running the agent, unless use_cache is False.
+    """
+    from .download import DownloadError
+    with record_query("doc_task", model=model_name):
+        # Download the PDF
+        try:
+            tmp_pdf_path = _download_pdf(pdf_url)
+        except DownloadError as e:
+            return {"error": str(e)}
+
+        try:
+            from .answer_cache import cached_answer
+            from .processing.pdf_processing import hash_pdf
+
+            def run_task():
+                # Initialize the document
+                from .core import PDFDocument
+                doc = PDFDocument(tmp_pdf_path, budget=process_budget_pagewise)
+                local_agent = _build_doc_agent(doc, model_name)
+                return local_agent.invoke({
+                    "messages": [
+                        {"role": "user", "content": task}
+                    ]
+                })
+
+            key = _doc_task_key(hash_pdf(tmp_pdf_path), str(process_budget_pagewise), task, model_name, structured_output_schema)
+            return cached_answer(key, run_task, use_cache)
+        finally:
+            # Clean up temporary file
+            _remove_download(tmp_pdf_path)
+
+
+def _doc_task_key(content_hash: str, processing_type: str, task: str, model_name: str,
+                  structured_output_schema: Optional[Dict[Any, Any]] = None) -> str:
+    """
+    Answer cache key of a doc_task, made from the model and system prompt _build_doc_agent resolves;
+    the output schema counts as part of the task.
+    """
+    from .answer_cache import model_key
+    from .core import _answer_key
+    if structured_output_schema is not None:
+        task += "\n" + json.dumps(structured_output_schema, sort_keys=True)
+    model, prompt = _doc_agent_config(model_name)
+    return _answer_key(content_hash, processing_type, task, model_key(model_name, model), prompt)
+
+
+@instrumented("download")
+def _download_pdf(pdf_url: HttpUrl) -> str:
+    """Download the PDF (through the shared session and download cache) and return its local path."""
+    from .download import download_pdf
+    return download_pdf(str(pdf_url))
+
+
+def _remove_download(pdf_path: str):
+    """Delete a downloaded file (the caller's link to a cached copy, or an uncached download)."""
+    try:
+        os.unlink(pdf_path)
+    except OSError:
+        pass
+
+
+def _doc_agent_config(model_name: str) -> Tuple[str, str]:
+    """(model, system prompt) a doc_task agent runs with; its answer cache key is derived from the same pair."""
+    from .core import AGENT_PROMPT
+    return model_name, AGENT_PROMPT
+
+
+def _build_doc_agent(doc, model_name: str):
+    """Create a react agent whose navigation tools are bound to doc."""
+    from langgraph.prebuilt import create_react_agent
+    model, prompt = _doc_agent_config(model_name)
     # Bind the doc to each tool using named wrappers
     tools = [
         make_tool_with_doc(next_search_match, doc),
         make_tool_with_doc(goto, doc),
+        make_tool_with_doc(read_range, doc),
         make_tool_with_doc(scroll_up, doc),
         make_tool_with_doc(scroll_down, doc),
         make_tool_with_doc(clip_memory, doc),
         make_tool_with_doc(use_memory, doc)
     ]
-    
-    local_agent = create_react_agent(
-        model=model_name,
+    return create_react_agent(
+        model=model,
         tools=tools,
-        prompt=("You are a PDF parser agent. Your job is to scan through the PDF and provide output strictly based on the user's instructions. "
-        "Use the available tools to navigate and extract content from the PDF. Use memory to store important information for later use. "
-        "Do not provide the user with anything except the PDF content in the required markdown format.")
+        prompt=prompt
     )
-    
-    result = local_agent.invoke({
-        "messages": [
-            {"role": "user", "content": task}
-        ]
-    })
-    
-    # Clean up temporary file
-    import os
-    try:
-        os.unlink(tmp_pdf_path)
-    except:
-        pass
-    
-    return result
 
 
 # --- Tool Wrappers for Agent Registration ---
+def _bind_signature(wrapper, tool_func):
+    """Give wrapper the name, docstring and signature of tool_func minus its document argument, so the tool schema lists the real arguments."""
+    signature = inspect.signature(tool_func)
+    bound, *parameters = signature.parameters.values()
+    wrapper.__name__ = tool_func.__name__
+    wrapper.__doc__ = tool_func.__doc__
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    wrapper.__annotations__ = {name: hint for name, hint in getattr(tool_func, "__annotations__", {}).items() if name != bound.name}
+    return wrapper
+
+
 def make_tool_with_doc(tool_func, doc):
     """Create a wrapper function that binds the document to the tool."""
     def wrapper(*args, **kwargs):
         return tool_func(doc, *args, **kwargs)
-    wrapper.__name__ = tool_func.__name__
-    wrapper.__doc__ = tool_func.__doc__
-    return wrapper
\ No newline at end of file
+    return _bind_signature(wrapper, tool_func)
\ No newline at end of file
@@ -39,6 +39,7 @@ setup(
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
+            "mongomock>=4.1.0",
             "black>=22.0.0",
             "isort>=5.0.0",
             "flake8>=5.0.0",
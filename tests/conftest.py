@@ -0,0 +1,47 @@
+"""Shared fixtures: every test runs on its own SQLite store, index and page cache directories, with answer caching off."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+from synthetic_pdf import write_pdf  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    from pdfparser_agent import async_db, db, pdfidx
+    from pdfparser_agent.answer_cache import set_answer_cache
+    from pdfparser_agent.processing import page_router
+    from pdfparser_agent.sqlite_store import SQLiteStore
+    monkeypatch.setattr(pdfidx, "PDFIDX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(page_router, "PAGE_CACHE_DIR", str(tmp_path / "pages"))
+    store = SQLiteStore(str(tmp_path / "store.sqlite3"))
+    db.set_store(store)
+    async_db.set_store(None)
+    set_answer_cache(None)
+    yield store
+    db.set_store(None)
+    async_db.set_store(None)
+
+
+@pytest.fixture(params=["sqlite", "mongomock"])
+def backend(request, store):
+    """The store fixture's SQLite file, or a mongomock database behind both db and async_db."""
+    if request.param == "mongomock":
+        mongomock = pytest.importorskip("mongomock")
+        from pdfparser_agent import async_db, db
+        from pdfparser_agent.testing import AsyncDatabase
+        database = mongomock.MongoClient()["pdfagent"]
+        db.set_database(database)
+        async_db.set_database(AsyncDatabase(database))
+    return request.param
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    """(path, page texts) of a six-page synthetic PDF."""
+    path = str(tmp_path / "doc.pdf")
+    return path, write_pdf(path, 6)
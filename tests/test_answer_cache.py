@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+from pdfparser_agent import tools
+from pdfparser_agent.answer_cache import model_key
+from pdfparser_agent.core import _answer_key, _llm_key
+
+
+def test_off_by_default():
+    env = {name: value for name, value in os.environ.items() if name != "ANSWER_CACHE"}
+    code = "from pdfparser_agent.answer_cache import get_answer_cache; print(get_answer_cache())"
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    output = subprocess.run([sys.executable, "-c", code], env=env, cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "None"
+
+
+def test_model_key_covers_configuration():
+    assert model_key("m", {"model": "a", "temperature": 0}) != model_key("m", {"model": "a", "temperature": 1})
+    assert model_key("m", "openai:gpt-4o") != model_key("m", "openai:gpt-4o-mini")
+    assert _llm_key("m") == _llm_key("m", None) != model_key("m", "m")
+
+
+def test_doc_task_key_follows_agent_config(monkeypatch):
+    key = tools._doc_task_key("hash", "LOW", "task", "openai:gpt-4o")
+    assert key == _answer_key("hash", "LOW", "task", model_key("openai:gpt-4o", "openai:gpt-4o"))
+    monkeypatch.setattr(tools, "_doc_agent_config", lambda model_name: (model_name, "another prompt"))
+    assert tools._doc_task_key("hash", "LOW", "task", "openai:gpt-4o") != key
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+from pdfparser_agent import async_db, async_tools, db, pdfidx, tools
+from pdfparser_agent.core import AsyncPDFDocument, AsyncPDFParserAgent, PDFDocument
+from pdfparser_agent.testing import fake_llm
+
+
+def test_ingest_matches_sync(backend, pdf):
+    async def main():
+        doc = await AsyncPDFDocument.create(pdf[0])
+        return doc, await async_tools.goto(doc, "u", page=2, max_chars=0)
+
+    doc, page = asyncio.run(main())
+    assert doc.status == "ready" and doc.pages_ready == 6
+    # The index file is written during ingestion, not left to the first reader
+    assert os.listdir(pdfidx.PDFIDX_DIR)
+    sync_doc = PDFDocument(pdf[0])
+    assert sync_doc.document_id == doc.document_id
+    assert page == tools.goto(sync_doc, "u", page=2, max_chars=0)
+
+
+def test_insert_lines_leaves_input_untouched(backend, pdf):
+    lines = [{"page_number": 1, "line_num_on_page": 1, "global_line_number": 1, "text": "hello"}]
+
+    async def main():
+        document_id = await async_db.insert_document_metadata(pdf[0], "LOW", "u")
+        await async_db.insert_document_lines(document_id, lines)
+        return await async_db.get_lines(document_id)
+
+    stored = asyncio.run(main())
+    assert [line["text"] for line in stored] == ["hello"]
+    assert "document_id" not in lines[0]
+
+
+def test_tools(backend, pdf):
+    word = pdf[1][3][2].split()[1]
+
+    async def main():
+        doc = await AsyncPDFDocument.create(pdf[0])
+        found = await async_tools.next_search_match(doc, "u", word, case_sensitive=True)
+        pages = await async_tools.read_range(doc, "u", start_page=2, end_page=3, max_chars=0)
+        await async_tools.clip_memory(doc, "u", 1, 3)
+        memory = await async_tools.use_memory(doc, "u", "first lines")
+        stats = await async_db.get_document_stats(doc.document_id)
+        await doc.invalidate()
+        return found, pages, memory, stats, await async_db.get_document(doc.document_id)
+
+    found, pages, memory, stats, record = asyncio.run(main())
+    assert word in found
+    assert "Page 2 of 6" in pages and "Page 3 of 6" in pages
+    assert pdf[1][0][0] in memory
+    assert stats["page_count"] == 6
+    assert record is None
+
+
+def test_agent_query(pdf):
+    async def main():
+        agent = await AsyncPDFParserAgent.create(pdf[0], llm=fake_llm(latency=0))
+        return await agent.aquery("What is on page 1?", use_cache=False)
+
+    result = asyncio.run(main())
+    answer = result["messages"][-1].content
+    assert answer.startswith("Page 1 starts with:")
+
+
+def test_uncached_ingestion_has_no_index_file(pdf):
+    async def main():
+        return await AsyncPDFDocument.create(pdf[0], use_cache=False)
+
+    doc = asyncio.run(main())
+    # Its id is only unique within this database, so no file in the shared directory is named after it
+    assert not os.path.exists(pdfidx.PDFIDX_DIR) or not os.listdir(pdfidx.PDFIDX_DIR)
+    assert tools.goto(doc, "u", page=1, max_chars=0) == tools.goto(PDFDocument(pdf[0]), "u", page=1, max_chars=0)
@@ -0,0 +1,93 @@
+import io
+import json
+import shutil
+import threading
+
+import pytest
+
+from pdfparser_agent import batch, tools
+from pdfparser_agent.batch import iter_batch, load_configs, run_batch
+from pdfparser_agent.core import AGENT_PROMPT
+from pdfparser_agent.testing import fake_llm
+
+
+@pytest.fixture
+def pipeline(pdf, tmp_path, monkeypatch):
+    """Downloads copy the conftest PDF (URLs containing "missing" fail); agents run fake_llm with `latency`."""
+    downloads = iter(range(10 ** 6))
+    settings = {"latency": 0.0}
+
+    def download(url):
+        if "missing" in str(url):
+            raise FileNotFoundError(f"No PDF at {url}")
+        path = str(tmp_path / f"download-{next(downloads)}.pdf")
+        shutil.copy(pdf[0], path)
+        return path
+
+    monkeypatch.setattr(batch, "_download_pdf", download)
+    monkeypatch.setattr(tools, "_doc_agent_config", lambda model_name: (fake_llm(model_name, settings["latency"]), AGENT_PROMPT))
+    return settings
+
+
+def config(n, **changes):
+    return dict({"pdf_url": f"https://example.com/{n}.pdf", "model_name": "fake", "model_cfg": {},
+                 "task": f"task {n}", "process_budget_pagewise": "low"}, **changes)
+
+
+def test_results_and_error_rows(pipeline):
+    configs = [config(0), config(1, task=None), config(2, pdf_url="https://example.com/missing.pdf"), config(3), {"oops": 1}]
+    output = io.StringIO()
+    counts = run_batch(configs, output)
+    rows = sorted((json.loads(line) for line in output.getvalue().splitlines()), key=lambda row: row["index"])
+    assert counts == {"ok": 2, "error": 3}
+    assert [row["index"] for row in rows] == [0, 1, 2, 3, 4]
+    assert [(row["status"], row.get("stage")) for row in rows] == [
+        ("ok", None), ("error", "config"), ("error", "download"), ("ok", None), ("error", "config")]
+    assert rows[0]["output"].startswith("Page 1 starts with:") and "Page 1 of 6" in rows[0]["output"]
+    assert rows[0]["document_id"] == rows[3]["document_id"]
+    assert rows[2]["pdf_url"] == "https://example.com/missing.pdf" and "FileNotFoundError" in rows[2]["error"]
+    assert set(rows[0]["timings"]) == {"download", "ingest", "agent", "total"}
+
+
+def test_single_worker_stages_keep_input_order(pipeline):
+    results = list(iter_batch([config(n) for n in range(6)], download_concurrency=1, ingest_concurrency=1, agent_concurrency=1))
+    assert [result["index"] for result in results] == list(range(6))
+    assert [result["task"] for result in results] == [f"task {n}" for n in range(6)]
+
+
+def test_bounded_queues_hold_back_the_feed(pipeline):
+    pipeline["latency"] = 0.1
+    pulled = []
+    lock = threading.Lock()
+
+    def configs():
+        for n in range(30):
+            with lock:
+                pulled.append(n)
+            yield config(n)
+
+    results = iter_batch(configs(), download_concurrency=1, ingest_concurrency=1, agent_concurrency=1)
+    next(results)
+    # One item per worker, two per stage inbox and the one the feeder waits to put: at most 10 in flight
+    with lock:
+        in_flight = len(pulled)
+    assert 3 <= in_flight <= 11
+    assert len(list(results)) == 29
+
+
+def test_load_configs(tmp_path):
+    configs = [config(0), config(1)]
+    jsonl, array = tmp_path / "tasks.jsonl", tmp_path / "tasks.json"
+    jsonl.write_text(json.dumps(configs[0]) + "\n\n" + json.dumps(configs[1]) + "\n", encoding="utf-8")
+    array.write_text("  \n" + json.dumps(configs), encoding="utf-8")
+    assert list(load_configs(str(jsonl))) == configs
+    assert list(load_configs(str(array))) == configs
+
+
+def test_broken_config_source_raises_after_draining(pipeline, tmp_path):
+    path = tmp_path / "tasks.jsonl"
+    path.write_text(json.dumps(config(0)) + "\n" + json.dumps(config(1)) + "\n{not json\n", encoding="utf-8")
+    output = io.StringIO()
+    with pytest.raises(ValueError):
+        run_batch(load_configs(str(path)), output)
+    assert sorted(json.loads(line)["index"] for line in output.getvalue().splitlines()) == [0, 1]
@@ -0,0 +1,105 @@
+import os
+import shutil
+
+import pytest
+
+from synthetic_pdf import write_pages, write_pdf
+
+from pdfparser_agent.corpus import Corpus, shard_index, shard_search
+
+QUERIES = ["climate energy", "carbon policy risk", "ocean", "term12 term480 warming"]
+
+
+@pytest.fixture
+def files(tmp_path):
+    """{file name: page texts} of four small PDFs in tmp_path/pdfs."""
+    os.makedirs(tmp_path / "pdfs")
+    return {
+        f"doc{i}.pdf": write_pdf(str(tmp_path / "pdfs" / f"doc{i}.pdf"), 3 + i, lines_per_page=8, seed=i)
+        for i in range(4)
+    }
+
+
+def ranking(corpus, query, **kwargs):
+    return [(hit["file"], hit["page"], hit["line"], hit["text"], hit["score"]) for hit in corpus.search(query, k=20, **kwargs)]
+
+
+def test_sharded_search_ranks_like_one_shard(tmp_path, files):
+    sharded = Corpus("sharded", root=str(tmp_path), shards=3, workers=0)
+    single = Corpus("single", root=str(tmp_path), shards=1, workers=0)
+    for name in files:
+        sharded.add(str(tmp_path / "pdfs" / name))
+        single.add(str(tmp_path / "pdfs" / name))
+    assert len({entry["shard"] for entry in sharded.documents()}) > 1
+    for query in QUERIES:
+        assert ranking(sharded, query)
+        assert ranking(sharded, query) == ranking(single, query)
+        assert ranking(sharded, query, documents="doc[12].pdf") == ranking(single, query, documents="doc[12].pdf")
+
+
+def test_add_indexes_only_changed_pages(tmp_path, files):
+    corpus = Corpus("c", root=str(tmp_path), shards=2, workers=0)
+    path = str(tmp_path / "pdfs" / "doc2.pdf")
+    added = corpus.add(path)
+    assert (added["status"], added["pages_indexed"]) == ("added", 5)
+    assert corpus.add(path)["status"] == "unchanged"
+
+    texts = files["doc2.pdf"]
+    texts[3] = ["Zzqx replacement line"] + texts[3][1:]
+    texts.insert(1, ["Inserted page qqvx"])
+    write_pages(path, texts)
+    updated = corpus.add(path)
+    assert (updated["status"], updated["pages_indexed"], updated["page_count"]) == ("updated", 2, 6)
+    assert updated["document_id"] == added["document_id"]
+    # Pages that only moved are renumbered, so their hits point at the new page numbers
+    assert [(hit["page"], hit["text"]) for hit in corpus.search("zzqx")] == [(5, "Zzqx replacement line")]
+    assert [hit["page"] for hit in corpus.search(texts[2][0])][:1] == [3]
+
+    fresh = Corpus("fresh", root=str(tmp_path), shards=2, workers=0)
+    fresh.add(path)
+    for query in QUERIES + ["zzqx qqvx"]:
+        assert ranking(corpus, query) == ranking(fresh, query)
+
+
+def test_shared_content_and_selectors(tmp_path, files):
+    corpus = Corpus("c", root=str(tmp_path), shards=2, workers=0)
+    for name in files:
+        corpus.add(str(tmp_path / "pdfs" / name))
+    copy = str(tmp_path / "copy.pdf")
+    shutil.copy(str(tmp_path / "pdfs" / "doc1.pdf"), copy)
+    shared = corpus.add(copy)
+    doc1 = corpus.resolve("doc1.pdf")
+    assert shared["pages_indexed"] == 0 and [shared["document_id"]] == doc1
+    assert corpus.files(doc1[0]) == ["copy.pdf", "doc1.pdf"]
+
+    assert len(corpus.resolve()) == 4
+    assert corpus.resolve(doc1[0]) == doc1
+    assert sorted(corpus.resolve(["doc1.pdf", "copy.pdf", "doc3*"])) == sorted(doc1 + corpus.resolve("doc3.pdf"))
+    assert corpus.resolve(os.path.join(str(tmp_path), "pdfs", "*")) == corpus.resolve("doc*.pdf")
+    assert corpus.resolve("missing.pdf") == [] and corpus.search("climate", documents="missing.pdf") == []
+    assert {hit["document_id"] for hit in corpus.search("climate", k=50, documents="doc1.pdf")} == set(doc1)
+
+    # The shared document stays indexed until its last member leaves
+    word = files["doc1.pdf"][0][0].split()[0]
+    corpus.remove("doc1.pdf")
+    assert doc1[0] in {hit["document_id"] for hit in corpus.search(word, k=50)}
+    corpus.remove("copy.pdf")
+    assert doc1[0] not in {hit["document_id"] for hit in corpus.search(word, k=50)}
+    # The manifest survives reopening
+    assert Corpus("c", root=str(tmp_path), workers=0).resolve() == corpus.resolve()
+
+
+def test_shard_index_reuses_rows(tmp_path):
+    path = str(tmp_path / "shard.sqlite3")
+    pages = [(1, 1, "a", "alpha words"), (2, 3, "b", "beta words"), (3, 5, "c", "gamma words")]
+    assert shard_index(path, "d", pages) == 3
+    reordered = [(1, 1, "c", "gamma words"), (2, 3, "a", "alpha words"), (3, 5, "x", "delta words")]
+    assert shard_index(path, "d", reordered) == 1
+
+    def pages_for(term):
+        return [(page, line) for _, _, page, line, _ in shard_search(path, [term], {term: 1.0}, 2.0, 10)]
+
+    assert pages_for("gamma") == [(1, 1)]
+    assert pages_for("alpha") == [(2, 3)]
+    assert pages_for("delta") == [(3, 5)]
+    assert pages_for("beta") == []
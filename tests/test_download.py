@@ -0,0 +1,156 @@
+import os
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from pdfparser_agent.download import DownloadCache, DownloadError
+
+CHUNK = b"%PDF" + bytes(range(256)) * 256
+
+
+class Origin(ThreadingHTTPServer):
+    """
+    Serves self.files ({path: (etag, body size)}) with ETag / Last-Modified and conditional GETs;
+    an etag of None answers with the HTTP status given as the size instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), OriginHandler)
+        self.files = {}
+        self.requests = []
+
+    def url(self, path):
+        return "http://127.0.0.1:%d%s" % (self.server_address[1], path)
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        etag, size = self.server.files[self.path]
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if etag is None:
+            # Files without an ETag stand for a failing origin
+            self.send_response(size)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        # The body is generated chunk by chunk, never held whole
+        sent = 0
+        while sent < size:
+            data = CHUNK[:size - sent]
+            self.wfile.write(data)
+            sent += len(data)
+
+
+def body(size):
+    return (CHUNK * (size // len(CHUNK) + 1))[:size]
+
+
+@pytest.fixture
+def origin():
+    server = Origin()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_revalidates_with_etag(origin, tmp_path):
+    origin.files["/a.pdf"] = ('"v1"', 1000)
+    cache = DownloadCache(str(tmp_path), freshness=0, session=requests.Session())
+    first = cache.fetch(origin.url("/a.pdf"))
+    second = cache.fetch(origin.url("/a.pdf"))
+    assert read(first) == read(second) == body(1000)
+    assert origin.requests == [("/a.pdf", None), ("/a.pdf", '"v1"')]
+
+    origin.files["/a.pdf"] = ('"v2"', 2000)
+    assert read(cache.fetch(origin.url("/a.pdf"))) == body(2000)
+    # A changed file replaces the cached copy without touching links handed out earlier
+    assert read(first) == body(1000)
+
+
+def test_fresh_entry_is_not_revalidated(origin, tmp_path):
+    origin.files["/a.pdf"] = ('"v1"', 1000)
+    cache = DownloadCache(str(tmp_path), freshness=300, session=requests.Session())
+    cache.fetch(origin.url("/a.pdf"))
+    cache.fetch(origin.url("/a.pdf"))
+    assert len(origin.requests) == 1
+
+
+def test_server_error_serves_stale_copy(origin, tmp_path):
+    origin.files["/a.pdf"] = ('"v1"', 1000)
+    cache = DownloadCache(str(tmp_path), freshness=0, session=requests.Session())
+    cache.fetch(origin.url("/a.pdf"))
+    origin.files["/a.pdf"] = (None, 503)
+    assert read(cache.fetch(origin.url("/a.pdf"))) == body(1000)
+    # Not revalidated: the next fetch asks the origin again
+    origin.files["/a.pdf"] = ('"v2"', 2000)
+    assert read(cache.fetch(origin.url("/a.pdf"))) == body(2000)
+
+
+def test_errors_without_cached_copy(origin, tmp_path):
+    cache = DownloadCache(str(tmp_path), session=requests.Session())
+    for status in (404, 500):
+        origin.files["/a.pdf"] = (None, status)
+        with pytest.raises(DownloadError, match=f"HTTP {status}"):
+            cache.fetch(origin.url("/a.pdf"))
+
+
+def test_evicts_least_recently_used(origin, tmp_path):
+    for name in "abc":
+        origin.files[f"/{name}.pdf"] = (f'"{name}"', 1000)
+    cache = DownloadCache(str(tmp_path), max_bytes=2500, freshness=300, session=requests.Session())
+    cache.fetch(origin.url("/a.pdf"))
+    cache.fetch(origin.url("/b.pdf"))
+    cache.fetch(origin.url("/a.pdf"))
+    cache.fetch(origin.url("/c.pdf"))
+    assert sorted(entry["url"][-5:] for entry in cache._index.values()) == ["a.pdf", "c.pdf"]
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".pdf")]) == 2
+    cache.fetch(origin.url("/b.pdf"))
+    assert origin.requests[-1] == ("/b.pdf", None)
+
+
+def test_checkout_survives_eviction(origin, tmp_path):
+    origin.files["/a.pdf"] = ('"a"', 1000)
+    origin.files["/b.pdf"] = ('"b"', 1000)
+    cache = DownloadCache(str(tmp_path), max_bytes=1500, session=requests.Session())
+    in_use = cache.fetch(origin.url("/a.pdf"))
+    cache.fetch(origin.url("/b.pdf"))
+    assert len(cache._index) == 1
+    assert read(in_use) == body(1000)
+    os.unlink(in_use)
+
+
+def test_streams_in_constant_memory(origin, tmp_path):
+    size = 32 * 1024 * 1024
+    origin.files["/big.pdf"] = ('"big"', size)
+    cache = DownloadCache(str(tmp_path), session=requests.Session())
+    tracemalloc.start()
+    try:
+        path = cache.fetch(origin.url("/big.pdf"))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert os.path.getsize(path) == size
+    assert peak < 4 * 1024 * 1024
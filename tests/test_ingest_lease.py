@@ -0,0 +1,40 @@
+import pytest
+
+from pdfparser_agent import db
+from pdfparser_agent.core import PDFDocument
+from pdfparser_agent.processing.pdf_processing import ProcessBudget, hash_pdf
+
+
+def crashed_claim(path):
+    """The record a first open claimed and half-filled before it died, with its lease run out."""
+    record, owner = db.claim_document(path, str(ProcessBudget.LOW), "u", hash_pdf(path))
+    assert owner
+    db.insert_document_lines(record["_id"], [{"page_number": 1, "line_num_on_page": 1, "global_line_number": 1, "text": "partial"}])
+    db.update_document_progress(record["_id"], 1)
+    db.update_document(record["_id"], {"lease_expires": 0})
+    return record
+
+
+def test_expired_lease_is_taken_over(backend, pdf):
+    stale = crashed_claim(pdf[0])
+    assert db.wait_for_document(stale["_id"], timeout=1) is None
+
+    doc = PDFDocument(pdf[0], wait_timeout=1)
+    assert str(doc.document_id) == str(stale["_id"])
+    assert doc.status == "ready" and doc.pages_ready == 6
+    fresh = PDFDocument(pdf[0], use_cache=False)
+    assert db.get_lines(doc.document_id) == db.get_lines(fresh.document_id)
+
+    # The crashed owner, had it only stalled, may not write into the new ingestion
+    with pytest.raises(db.IngestLeaseLost):
+        db.renew_ingest_lease(stale["_id"], stale["ingest_token"])
+
+
+def test_live_lease_is_followed(backend, pdf):
+    record, owner = db.claim_document(pdf[0], str(ProcessBudget.LOW), "u", hash_pdf(pdf[0]))
+    again, second = db.claim_document(pdf[0], str(ProcessBudget.LOW), "u", hash_pdf(pdf[0]))
+    assert owner and not second
+    assert again["ingest_token"] == record["ingest_token"]
+    db.renew_ingest_lease(record["_id"], record["ingest_token"])
+    with pytest.raises(TimeoutError):
+        db.wait_for_document(record["_id"], timeout=0)
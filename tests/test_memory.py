@@ -0,0 +1,23 @@
+from pdfparser_agent import db
+from pdfparser_agent.memory import ClipMemoryStore
+
+
+def test_persisted_sessions_load_outside_the_lock(monkeypatch):
+    store = ClipMemoryStore(persist=True)
+    get_clips = db.get_clips
+    loads = []
+
+    def recording_get_clips(user_id, document_id):
+        loads.append(store._lock.locked())
+        return get_clips(user_id, document_id)
+
+    monkeypatch.setattr(db, "get_clips", recording_get_clips)
+    assert store.clips("u", "1") == []
+    assert store.clips("u", "1") == []
+    # The empty session is remembered, and the lookup never held the store-wide lock
+    assert loads == [False]
+
+    store.add("u", "2", 1, 3, 30)
+    reopened = ClipMemoryStore(persist=True)
+    assert [(clip.start, clip.end, clip.size) for clip in reopened.clips("u", "2")] == [(1, 3, 30)]
+    assert loads == [False, False, False]
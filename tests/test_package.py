@@ -0,0 +1,8 @@
+import pdfparser_agent
+
+
+def test_exports_resolve():
+    assert sorted(pdfparser_agent.__all__) == sorted(pdfparser_agent._EXPORTS)
+    for name in pdfparser_agent.__all__:
+        assert getattr(pdfparser_agent, name) is not None
+    assert pdfparser_agent.read_range is pdfparser_agent.tools.read_range
@@ -0,0 +1,58 @@
+import pytest
+
+from pdfparser_agent.processing import page_router
+from pdfparser_agent.processing.page_router import MIXED, SCANNED, active_routes, register_processor
+from pdfparser_agent.processing.pdf_processing import ProcessBudget, load_pdf_with_budget
+from synthetic_pdf import write_pdf
+
+
+@pytest.fixture
+def processors(monkeypatch):
+    """Restores the registered processors after the test."""
+    monkeypatch.setattr(page_router, "PAGE_PROCESSORS", dict(page_router.PAGE_PROCESSORS))
+    monkeypatch.setattr(page_router, "PROCESSOR_VERSIONS", dict(page_router.PROCESSOR_VERSIONS))
+
+
+@pytest.fixture
+def scanned_pdf(tmp_path):
+    path = str(tmp_path / "scanned.pdf")
+    write_pdf(path, 6, scanned_every=3)
+    return path
+
+
+def test_stub_processors_keep_pdfplumber_lines(processors, scanned_pdf, tmp_path):
+    assert active_routes(ProcessBudget.HIGH) == {}
+    assert load_pdf_with_budget(scanned_pdf, ProcessBudget.HIGH) == load_pdf_with_budget(scanned_pdf, ProcessBudget.LOW)
+    assert not (tmp_path / "pages").exists()
+
+
+def test_mixed_pages_are_opt_in(processors, monkeypatch):
+    register_processor("docint", lambda pdf_path, page_num: [])
+    register_processor("adobeocr", lambda pdf_path, page_num: [])
+    assert active_routes(ProcessBudget.HIGH) == {SCANNED: "adobeocr"}
+    monkeypatch.setattr(page_router, "PAGE_ROUTE_MIXED", True)
+    assert active_routes(ProcessBudget.HIGH) == {SCANNED: "adobeocr", MIXED: "docint"}
+
+
+def test_cache_is_per_implementation(processors, scanned_pdf):
+    calls = []
+
+    def ocr(pdf_path, page_num):
+        calls.append(page_num)
+        return [f"ocr page {page_num}"]
+
+    def ocr_v2(pdf_path, page_num):
+        return [f"better ocr page {page_num}"]
+
+    def texts(budget):
+        return [line["text"] for line in load_pdf_with_budget(scanned_pdf, budget) if line["page_num"] in (3, 6)]
+
+    register_processor("adobeocr", ocr)
+    assert texts(ProcessBudget.HIGH) == ["ocr page 3", "ocr page 6"]
+    assert texts(ProcessBudget.HIGH) == ["ocr page 3", "ocr page 6"]
+    assert calls == [3, 6]
+    register_processor("adobeocr", ocr_v2)
+    assert texts(ProcessBudget.HIGH) == ["better ocr page 3", "better ocr page 6"]
+    register_processor("adobeocr", ocr, version="2")
+    assert texts(ProcessBudget.HIGH) == ["ocr page 3", "ocr page 6"]
+    assert calls == [3, 6, 3, 6]
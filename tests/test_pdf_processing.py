@@ -0,0 +1,72 @@
+import pytest
+
+from pdfparser_agent import db
+from pdfparser_agent.core import PDFDocument
+from pdfparser_agent.processing.pdf_processing import (
+    ProcessBudget,
+    extract_pages_with_budget,
+    iter_pdf_pypdf_pdfplumber,
+    iter_pdf_with_budget,
+    page_fingerprints,
+)
+
+
+def write_objects(path, objects):
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def nested_tree_pdf(path, root_font):
+    """Page 1 under a /Pages node with its own /Resources, page 2 under one inheriting the root's."""
+    content = b"BT /F1 10 Tf 50 770 Td (Hello) Tj ET"
+    stream = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+    write_objects(path, [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [4 0 R 5 0 R] /Count 2 /Resources << /Font << /F1 3 0 R >> >> /MediaBox [0 0 612 792] >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /" + root_font + b" >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [6 0 R] /Count 1 /Resources << /Font << /F1 10 0 R >> >> >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [8 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 4 0 R /Contents 7 0 R >>",
+        stream,
+        b"<< /Type /Page /Parent 5 0 R /Contents 9 0 R >>",
+        stream,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+    ])
+
+
+def test_fingerprints_follow_inherited_resources(tmp_path):
+    nested_tree_pdf(str(tmp_path / "a.pdf"), b"Helvetica")
+    nested_tree_pdf(str(tmp_path / "b.pdf"), b"Times-Roman")
+    before, after = page_fingerprints(str(tmp_path / "a.pdf")), page_fingerprints(str(tmp_path / "b.pdf"))
+    assert len(before) == 2
+    # Page 1 overrides the root's resources; page 2 draws with the root's font, which changed
+    assert before[0] == after[0]
+    assert before[1] != after[1]
+    # Identical content under different resources is not mistaken for the same page
+    assert before[0] != before[1]
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(2, None), (3, 1)])
+def test_parallel_extraction_matches_serial(pdf, workers, chunk_size):
+    serial = list(iter_pdf_pypdf_pdfplumber(pdf[0]))
+    assert [[line["text"] for line in page] for page in serial] == pdf[1]
+    assert list(iter_pdf_pypdf_pdfplumber(pdf[0], workers, chunk_size)) == serial
+    assert list(iter_pdf_with_budget(pdf[0], ProcessBudget.LOW, workers)) == list(iter_pdf_with_budget(pdf[0], ProcessBudget.LOW))
+    pages = [5, 2, 3]
+    assert extract_pages_with_budget(pdf[0], ProcessBudget.LOW, pages, workers) == extract_pages_with_budget(pdf[0], ProcessBudget.LOW, pages)
+
+
+def test_parallel_ingestion_stores_the_same_lines(pdf):
+    serial = PDFDocument(pdf[0], use_cache=False)
+    parallel = PDFDocument(pdf[0], use_cache=False, workers=3, batch_size=50)
+    assert db.get_lines(parallel.document_id) == db.get_lines(serial.document_id)
+    assert db.get_document_stats(parallel.document_id) == db.get_document_stats(serial.document_id)
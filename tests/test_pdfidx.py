@@ -0,0 +1,37 @@
+import pytest
+
+from pdfparser_agent.pdfidx import HEADER, MAGIC, VERSION, PDFIndex, open_index, write_index
+
+
+def lines(pages, per_page):
+    return [
+        {"page_number": page, "line_num_on_page": k, "global_line_number": (page - 1) * per_page + k, "text": f"line {page}.{k}"}
+        for page in range(1, pages + 1) for k in range(1, per_page + 1)
+    ]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "a.pdfidx")
+    write_index(path, lines(3, 4), 3)
+    index = open_index(path)
+    assert index.stats() == {"page_count": 3, "line_count": 12}
+    assert list(index.lines) == lines(3, 4)
+    assert index.page_lines(2) == lines(3, 4)[4:8]
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:6],
+    lambda data: HEADER.pack(MAGIC, VERSION, 1000, 10) + b"\0" * 64,
+    lambda data: data[:len(data) - 3],
+    lambda data: b"",
+])
+def test_damaged_file_is_no_index(tmp_path, damage):
+    path = str(tmp_path / "a.pdfidx")
+    write_index(path, lines(3, 4), 3)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+    assert open_index(path) is None
+    with pytest.raises(ValueError):
+        PDFIndex(path)
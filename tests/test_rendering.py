@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+from pdfparser_agent import tools
+from pdfparser_agent.core import PDFDocument
+from pdfparser_agent.rendering import COMPACT, FRAMED, parse_continuation, render_lines, render_page, render_text
+
+TOKEN_RE = re.compile(r'continuation="([a-z]+:[\d:]+)"')
+ROW_RE = re.compile(r"^(\|\d{3,}\||\d+:) ")
+
+
+def lines(count, start=1, width=30):
+    return [{"page_number": 1, "line_num_on_page": n - start + 1, "global_line_number": n, "text": f"line {n} " + "x" * width}
+            for n in range(start, start + count)]
+
+
+def rows(text):
+    return [row for row in text.splitlines() if ROW_RE.match(row)]
+
+
+def follow(call, first, budget):
+    """Every piece of a result, following its continuation tokens; each piece stays within the budget."""
+    pieces = [first]
+    while True:
+        assert len(pieces[-1]) <= budget
+        found = TOKEN_RE.findall(pieces[-1])
+        if not found:
+            return pieces
+        assert len(found) == 1
+        pieces.append(call(found[0]))
+        assert len(pieces) < 100
+
+
+@pytest.mark.parametrize("mode", [FRAMED, COMPACT])
+def test_truncation_stays_in_budget(mode):
+    page = lines(40)
+    text, first, stop = render_page(3, 9, page, max_chars=500, mode=mode)
+    assert len(text) <= 500 and first == 0 and 0 < stop < 40
+    assert rows(text) == rows(render_page(3, 9, page[:stop], max_chars=0, mode=mode)[0])
+    kind, args = parse_continuation(TOKEN_RE.findall(text)[0])
+    assert (kind, args) == ("page", [3, page[stop]["global_line_number"]])
+    assert f"[{40 - stop} more lines" in text
+    # Everything fits: no note and no token
+    assert not TOKEN_RE.findall(render_page(3, 9, page, max_chars=0, mode=mode)[0])
+
+
+def test_rendering_is_deterministic():
+    page = lines(40)
+    for mode in (FRAMED, COMPACT):
+        assert render_page(1, 2, page, [20], 1, 3, max_chars=400, mode=mode) == render_page(1, 2, page, [20], 1, 3, max_chars=400, mode=mode)
+        assert render_lines("Lines 1-40", page, 300, mode) == render_lines("Lines 1-40", page, 300, mode)
+    assert render_text([l["text"] for l in page], 5, 200) == render_text([l["text"] for l in page], 5, 200)
+
+
+def test_highlight_stays_in_view():
+    page = lines(40)
+    text, first, stop = render_page(1, 1, page, highlight_lines=[35], highlight_match=1, max_chars=500)
+    assert first <= 34 < stop
+    assert "<highlight" in text and "line 35 " in text
+    assert 'goto(continuation="lines:1:' in text
+
+
+def test_single_overlong_line_is_clipped():
+    text, first, stop = render_page(1, 1, lines(1, width=2000), max_chars=500)
+    assert (first, stop) == (0, 1)
+    assert rows(text)[0].endswith("…")
+
+
+def test_invalid_tokens():
+    for token in ("page:1", "lines:a:b", "memory", "nope:1:2"):
+        with pytest.raises(ValueError):
+            parse_continuation(token)
+
+
+@pytest.fixture
+def document(pdf):
+    return PDFDocument(pdf[0])
+
+
+@pytest.mark.parametrize("mode", [FRAMED, COMPACT])
+def test_page_continuations_add_up(document, monkeypatch, mode):
+    monkeypatch.setattr("pdfparser_agent.rendering.RENDER_MODE", mode)
+    whole = tools.goto(document, "u", page=2, max_chars=0)
+    pieces = follow(lambda token: tools.goto(document, "u", continuation=token, max_chars=700),
+                    tools.goto(document, "u", page=2, max_chars=700), 700)
+    assert len(pieces) > 2
+    assert [row for piece in pieces for row in rows(piece)] == rows(whole)
+
+
+def test_line_continuations_add_up(document):
+    whole = tools.read_range(document, "u", start_line=30, end_line=130, max_chars=0)
+    pieces = follow(lambda token: tools.goto(document, "u", continuation=token, max_chars=900),
+                    tools.read_range(document, "u", start_line=30, end_line=130, max_chars=900), 900)
+    assert len(pieces) > 2
+    assert [row for piece in pieces for row in rows(piece)] == rows(whole)
+
+
+def test_memory_continuations_add_up(document):
+    # Clip memory is process-wide, so this test reads it as a user no other test clips for
+    tools.clip_memory(document, "memory-reader", 5, 60)
+    tools.clip_memory(document, "memory-reader", 100, 130)
+    whole = tools.use_memory(document, "memory-reader", "all", max_chars=0).splitlines()
+    assert len(whole) == 56 + 31
+    pieces = follow(lambda token: tools.use_memory(document, "memory-reader", "all", continuation=token, max_chars=600),
+                    tools.use_memory(document, "memory-reader", "all", max_chars=600), 600)
+    assert len(pieces) > 2
+    assert [row for piece in pieces for row in piece.splitlines() if not row.startswith("[")] == whole
+    # goto hands memory tokens on to use_memory
+    assert tools.goto(document, "memory-reader", continuation=TOKEN_RE.findall(pieces[0])[0], max_chars=600) == pieces[1]
+    assert tools.use_memory(document, "memory-reader", "all", continuation="page:1:1") == "Invalid continuation token."
+    assert tools.goto(document, "memory-reader", continuation="bogus") == "Invalid continuation token."
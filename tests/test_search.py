@@ -0,0 +1,55 @@
+import itertools
+
+import pytest
+
+from synthetic_pdf import write_pages
+
+from pdfparser_agent import db, tools
+from pdfparser_agent.core import PDFDocument
+from pdfparser_agent.search import SearchIndex, scan_lines
+
+EXTRA_LINES = ["Don't panic (really)!", "x-ray and X-Ray -- again...", "Café, cafe and CAFÉ", "a.b.c ... ?!"]
+TERMS = [
+    "climate", "Climate", "CLIMATE", "clim", "mate", "ate", "e", "term1", "term12", "erm4",
+    "climate change", "ate cha", "e c", "warming global temperature", "ing glo",
+    "x-ray", "X-Ray", "-ray", "don't", "(really)", "caf", "café", "CAFÉ",
+    "...", "--", "?!", "-", " ", "(",
+]
+
+
+@pytest.fixture
+def document(pdf, tmp_path):
+    """A stored document whose last page holds lines full of punctuation, with its lines."""
+    path = str(tmp_path / "search.pdf")
+    write_pages(path, pdf[1] + [EXTRA_LINES])
+    doc = PDFDocument(path)
+    return doc.document_id, db.get_lines(doc.document_id)
+
+
+def test_index_matches_scan(document):
+    _, lines = document
+    index = SearchIndex.from_lines(lines)
+    text = {line["global_line_number"]: line["text"] for line in lines}
+    for term, case_sensitive, whole_word in itertools.product(TERMS, (False, True), (False, True)):
+        expected = scan_lines(lines, term, case_sensitive, whole_word)
+        found = index.search(term, text.__getitem__, case_sensitive, whole_word)
+        if found is None:
+            # Only terms without a word character are left to the scan
+            assert not any(c.isalnum() or c == "_" for c in term), term
+        else:
+            assert found == expected, (term, case_sensitive, whole_word)
+    assert any(scan_lines(lines, term) for term in TERMS)
+
+
+def test_stores_match_scan(backend, document):
+    document_id, lines = document
+    for term, case_sensitive, whole_word in itertools.product(TERMS, (False, True), (False, True)):
+        expected = scan_lines(lines, term, case_sensitive, whole_word)
+        assert tools._find_matches(document_id, term, case_sensitive, whole_word) == expected, (term, case_sensitive, whole_word)
+
+
+def test_prefix_and_suffix_ranges():
+    index = SearchIndex({term: [(1, n)] for n, term in enumerate(["ab", "abc", "abd", "b", "cab", "zab"], 1)})
+    assert sorted(index._prefixed(index.vocabulary, "ab")) == ["ab", "abc", "abd"]
+    assert sorted(term[::-1] for term in index._prefixed(index.reversed_vocabulary, "ba")) == ["ab", "cab", "zab"]
+    assert list(index._prefixed(index.vocabulary, "abz")) == []
@@ -0,0 +1,109 @@
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from pdfparser_agent.server import AgentPool, make_server
+from pdfparser_agent.testing import fake_llm
+
+
+def post(url, body, timeout=30):
+    request = urllib.request.Request(url, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, dict(response.headers), json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.load(e)
+
+
+@pytest.fixture
+def serve():
+    """Starts a server with a fake model of the given latency; returns its base URL and service."""
+    servers = []
+
+    def start(latency=0.0, **kwargs):
+        server = make_server("127.0.0.1", 0, llm_factory=lambda model_name: fake_llm(model_name, latency), **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return "http://127.0.0.1:%d" % server.server_address[1], server.service
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_query(serve, pdf):
+    url, _ = serve()
+    status, _, body = post(url + "/query", {"pdf_path": pdf[0], "query": "What is on page 1?"})
+    assert status == 200
+    assert body["answer"].startswith("Page 1 starts with:")
+
+
+def test_query_past_deadline_is_504(serve, pdf):
+    url, service = serve(latency=0.5)
+    assert post(url + "/documents", {"pdf_path": pdf[0]})[0] == 200
+    status, _, body = post(url + "/query", {"pdf_path": pdf[0], "query": "slow", "timeout": 0.05})
+    assert status == 504
+    assert service.stats()["queries"]["timeout"] == 1
+
+
+def test_full_queue_is_503(serve, pdf):
+    url, service = serve(latency=0.5, concurrency=1, queue_size=0)
+    assert post(url + "/documents", {"pdf_path": pdf[0]})[0] == 200
+    running = threading.Thread(target=post, args=(url + "/query", {"pdf_path": pdf[0], "query": "first"}))
+    running.start()
+    deadline = time.monotonic() + 10
+    while service.stats()["queries"]["running"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    status, headers, _ = post(url + "/query", {"pdf_path": pdf[0], "query": "second"})
+    running.join()
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+    assert service.stats()["queries"]["rejected"] == 1
+
+
+
+@pytest.mark.parametrize("length", ["-5", "abc", "1e3"])
+def test_bad_content_length_is_400(serve, length):
+    url, _ = serve()
+    connection = http.client.HTTPConnection(url[len("http://"):], timeout=5)
+    connection.putrequest("POST", "/query")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "Content-Length" in json.load(response)["error"]
+    connection.close()
+
+
+def test_concurrent_requests_build_one_agent(pdf):
+    pool = AgentPool(llm_factory=lambda model_name: fake_llm(model_name, 0.0))
+    build = pool._build
+
+    def slow_build(*args):
+        # Widen the window in which other requests arrive while the agent is being built
+        time.sleep(0.2)
+        return build(*args)
+
+    pool._build = slow_build
+    barrier = threading.Barrier(8)
+    agents = []
+
+    def get():
+        barrier.wait()
+        agents.append(pool.get(pdf[0], "fake"))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pool.counts["builds"] == 1
+    assert pool.counts["hits"] == 7
+    assert all(agent is agents[0] for agent in agents)
+    assert pool.get(pdf[0], "fake") is agents[0]
@@ -0,0 +1,22 @@
+import time
+
+from pdfparser_agent import sqlite_store
+
+
+def test_get_document_projection(store):
+    document_id = store.insert_document({"status": "ready", "page_count": 3, "done": True, "page_hashes": ["a", "b"]})
+    assert store.get_document(document_id, fields=["page_count", "page_hashes", "done", "missing"]) == {
+        "_id": document_id, "page_count": 3, "page_hashes": ["a", "b"], "done": True,
+    }
+    assert store.get_document(document_id)["status"] == "ready"
+    assert store.get_document(document_id + 1, fields=["page_count"]) is None
+
+
+def test_clips_expire(store, monkeypatch):
+    monkeypatch.setattr(sqlite_store, "CLIP_MEMORY_TTL", 60)
+    old = {"user_id": "u", "document_id": "1", "start": 1, "end": 2, "size": 10, "created_at": time.time() - 120}
+    store.insert_clip(old)
+    assert store.get_clips("u", "1") == []
+    store.insert_clip(dict(old, start=3, created_at=time.time()))
+    assert [clip["start"] for clip in store.get_clips("u", "1")] == [3]
+    assert store._conn().execute("SELECT COUNT(*) FROM clip_memory").fetchone()[0] == 1
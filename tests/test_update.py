@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from synthetic_pdf import page_lines, write_pages, write_pdf
+
+from pdfparser_agent import db, tools
+from pdfparser_agent.core import PDFDocument
+
+LINES_PER_PAGE = 6
+
+
+def edit_inserted(texts, rng):
+    return texts[:1] + [page_lines(rng, 9)] + texts[1:]
+
+
+def edit_removed(texts, rng):
+    return texts[:2] + texts[4:]
+
+
+def edit_reordered(texts, rng):
+    return [texts[1], texts[0]] + texts[2:]
+
+
+def edit_appended(texts, rng):
+    return texts + [page_lines(rng, LINES_PER_PAGE)]
+
+
+def edit_changed(texts, rng):
+    return texts[:3] + [page_lines(rng, 4)] + texts[4:]
+
+
+def stored_lines(document_id):
+    keys = ("page_number", "line_num_on_page", "global_line_number", "text")
+    return [tuple(line[key] for key in keys) for line in db.get_lines(document_id)]
+
+
+def searches(document_id, texts):
+    words = {texts[0][0].split()[0], texts[-1][-1].split()[-1], texts[len(texts) // 2][1].split()[1]}
+    return {
+        (word, whole_word): tools._find_matches(document_id, word, whole_word=whole_word)
+        for word in sorted(words) for whole_word in (False, True)
+    }
+
+
+@pytest.mark.parametrize("edit", [edit_inserted, edit_removed, edit_reordered, edit_appended, edit_changed])
+def test_update_matches_fresh_ingest(backend, tmp_path, edit):
+    old, new = str(tmp_path / "old.pdf"), str(tmp_path / "new.pdf")
+    texts = write_pdf(old, 8, lines_per_page=LINES_PER_PAGE, seed=3)
+    new_texts = edit([list(page) for page in texts], random.Random(7))
+    write_pages(new, new_texts)
+
+    doc = PDFDocument(old)
+    db.get_cached_document(doc.document_id)
+    doc.update(new)
+    fresh = PDFDocument(new, use_cache=False)
+
+    updated, expected = db.get_document(doc.document_id), db.get_document(fresh.document_id)
+    assert (updated["page_count"], updated["line_count"]) == (expected["page_count"], expected["line_count"])
+    assert db.get_document_stats(doc.document_id) == db.get_document_stats(fresh.document_id)
+    assert stored_lines(doc.document_id) == stored_lines(fresh.document_id)
+    assert searches(doc.document_id, new_texts) == searches(fresh.document_id, new_texts)
+
+
+def test_cached_lines_follow_updates_from_other_processes(store, tmp_path):
+    old, new = str(tmp_path / "old.pdf"), str(tmp_path / "new.pdf")
+    texts = write_pdf(old, 4, lines_per_page=LINES_PER_PAGE, seed=3)
+    new_texts = [page_lines(random.Random(7), LINES_PER_PAGE)] + texts[1:]
+    write_pages(new, new_texts)
+    doc = PDFDocument(old)
+    stale = db.get_cached_document(doc.document_id)
+    doc.update(new)
+    # A process that loaded the lines before the update still holds them
+    db._cache_store(doc.document_id, stale, {"revision": 0})
+
+    assert [line["text"] for line in db.get_page_lines(doc.document_id, 1)] == new_texts[0]
+    assert db.get_cached_document(doc.document_id) is not stale